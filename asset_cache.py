@@ -0,0 +1,211 @@
+"""
+Content-addressed on-disk cache for the images and sounds the game downloads.
+
+Every fetched file is stored once under `objects/`, named by the SHA-256 of its
+bytes, and `index.json` maps each URL (and each file name, for seeded files)
+to that hash. Later launches read straight from disk. In offline mode the
+network is never touched and a missing asset is an error.
+
+Fill the cache from a directory of already downloaded files with
+
+    python asset_cache.py seed path/to/files
+
+Files are matched to URLs by name, so `AOGtJXY.jpg` serves
+`http://i.imgur.com/AOGtJXY.jpg` and `Littleroot.ogg` serves
+`https://www.dropbox.com/s/.../Littleroot.ogg?dl=1`.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+CACHE_DIR_VARIABLE = "POKEMON_ASSET_CACHE"
+OFFLINE_VARIABLE = "POKEMON_OFFLINE"
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "pokemon-game")
+
+def url_filename(url):
+    """
+    Return the last path component of `url` without its query string.
+    :param url: str
+    :return: str
+    """
+    return url.split('?')[0].split('#')[0].rstrip('/').split('/')[-1]
+
+def _replace(source, destination):
+    #Atomic rename that also overwrites on Windows when available (Python 3)
+    getattr(os, 'replace', os.rename)(source, destination)
+
+class AssetCache:
+    """
+    Stores downloaded assets on disk, keyed by URL, and serves them back.
+    """
+    def __init__(self, root = None, offline = False):
+        """
+        :param root: None or str directory of the cache
+        :param offline: bool, never use the network when True
+        """
+        self.root = os.path.abspath(os.path.expanduser(root or DEFAULT_CACHE_DIR))
+        self.offline = offline
+        self._index_path = os.path.join(self.root, "index.json")
+        self._index = self._read_index()
+
+        #The Loader fetches from several threads at once
+        self._lock = threading.Lock()
+
+        #While held, stores only update the index in memory (see hold_index())
+        self._holds = 0
+        self._index_changed = False
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Build the cache configured by the POKEMON_ASSET_CACHE and
+        POKEMON_OFFLINE environment variables.
+        :return: AssetCache
+        """
+        offline = os.environ.get(OFFLINE_VARIABLE, "") not in ("", "0")
+        return cls(os.environ.get(CACHE_DIR_VARIABLE), offline)
+
+    def _read_index(self):
+        try:
+            with open(self._index_path) as index_file:
+                index = json.load(index_file)
+        except (IOError, OSError, ValueError):
+            index = {}
+        index.setdefault("urls", {})
+        index.setdefault("files", {})
+        return index
+
+    def _write_index(self):
+        handle, path = tempfile.mkstemp(dir = self.root, suffix = ".tmp")
+        with os.fdopen(handle, "w") as index_file:
+            json.dump(self._index, index_file, indent = 1, sort_keys = True)
+        _replace(path, self._index_path)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def store(self, data, url = None, filename = None):
+        """
+        Add `data` to the cache and record it under `url` and/or `filename`.
+        :param data: bytes
+        :return: str path of the stored file
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        extension = os.path.splitext(filename or url_filename(url or ""))[1]
+        path = self._object_path(digest) + extension
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    #Another thread storing into the same bucket made it first
+                    if not os.path.isdir(directory):
+                        raise
+            handle, tmp_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+            with os.fdopen(handle, "wb") as blob:
+                blob.write(data)
+            _replace(tmp_path, path)
+
+        entry = os.path.relpath(path, self.root)
+        with self._lock:
+            if url is not None:
+                self._index["urls"][url] = entry
+            if filename is not None:
+                self._index["files"][filename] = entry
+            if self._holds:
+                self._index_changed = True
+            else:
+                self._write_index()
+        return path
+
+    def hold_index(self):
+        """
+        Keep the index in memory until the matching `release_index()`,
+        so a batch of stores writes it to disk once.
+        """
+        with self._lock:
+            self._holds += 1
+
+    def release_index(self):
+        #Writes the index if it changed once no batch holds it any more
+        with self._lock:
+            self._holds -= 1
+            if (self._holds == 0) and self._index_changed:
+                self._index_changed = False
+                self._write_index()
+
+    def path(self, url):
+        """
+        Return the local file holding `url`, or None if it is not cached.
+        :param url: str
+        :return: None or str
+        """
+        entry = (self._index["urls"].get(url)
+                 or self._index["files"].get(url_filename(url)))
+        if entry is None:
+            return None
+        path = os.path.join(self.root, entry)
+        return path if os.path.isfile(path) else None
+
+    def fetch(self, url):
+        """
+        Return the local file holding `url`, downloading it first if needed.
+        :param url: str
+        :raise: Exception if `url` is not cached and the cache is offline
+        :return: str
+        """
+        path = self.path(url)
+        if path is not None:
+            return path
+        if self.offline:
+            raise Exception("'%s' is not in the asset cache %s (offline mode)!"
+                            % (url, self.root))
+        data = urlopen(url).read()
+        return self.store(data, url = url)
+
+    def seed(self, directory):
+        """
+        Add every file of `directory` to the cache, matched to URLs by file name.
+        :param directory: str
+        :return: int number of files added
+        """
+        count = 0
+        self.hold_index()
+        try:
+            for filename in sorted(os.listdir(directory)):
+                path = os.path.join(directory, filename)
+                if os.path.isfile(path):
+                    with open(path, "rb") as source:
+                        self.store(source.read(), filename = filename)
+                    count += 1
+        finally:
+            self.release_index()
+        return count
+
+def main(argv = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Manage the local asset cache.")
+    parser.add_argument("--cache", help = "cache directory (default $%s or %s)"
+                        % (CACHE_DIR_VARIABLE, DEFAULT_CACHE_DIR))
+    commands = parser.add_subparsers(dest = "command")
+    seed = commands.add_parser("seed", help = "copy a directory of files into the cache")
+    seed.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    cache = AssetCache(args.cache or os.environ.get(CACHE_DIR_VARIABLE), offline = True)
+    if args.command == "seed":
+        print("Seeded %d files into %s" % (cache.seed(args.directory), cache.root))
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
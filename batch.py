@@ -0,0 +1,171 @@
+"""
+Many characters walking in one scene at once, stepped with NumPy.
+
+`BatchSimulation` keeps the positions, walking directions, speeds and
+latitudes of N agents in arrays and runs a tick for all of them in one
+call: the same swept collision as `collision.sweep` against the scene's
+building boxes and walkable area, then the doors, which open as an agent
+steps into their trigger volume (see `triggers.py`). It gives exactly the
+positions a `Simulation` per agent would (benchmarks/bench_batch.py checks
+it), for AI playtesting and map validation at thousands of walkers.
+
+Agents are driven like the character: set `moving` (-1 left, 1 right, 0,
+as `Simulation.moving_left`/`moving_right`), the vertical walking
+direction in `vel[:, 1]` (as `Character.walk_up`/`walk_down`) and `speed`.
+An agent going through a door to another scene leaves the batch: it is
+reported by `tick()` and no longer moves. Cameras stick to the agents, as
+the character's does by default; scenes that scroll vertically are not
+supported.
+
+Needs NumPy, which the game itself does not.
+"""
+import numpy as np
+
+from constants import WIDTH, HEIGHT, BORDERS
+from simulation import WALK_SPEED, interior_borders, interior_entry, view_bounds, world_bounds
+
+class BatchSimulation:
+    """
+    N agents in the scene `scene`, stepped together.
+    """
+    def __init__(self, scene, count):
+        """
+        All agents start where the character enters `scene`.
+        :param scene: scenes.Scene
+        :param count: int >= 0 number of agents
+        :raise: ValueError if `scene` scrolls vertically
+        """
+        self.scene = scene.name
+        self.info = scene.info
+        self.on_map = scene.name == "map"
+        self.buildings = list(scene.buildings)
+
+        #Building values are columns of shape (buildings, 1), in the order
+        #doors open, so they broadcast against rows of agents and
+        #reductions over buildings add whole rows together
+        boxes = np.array([building.borders for building in self.buildings], dtype = float).reshape(-1, 4)
+        self.upper, self.lower, self.left, self.right = [boxes[:, i:i + 1] for i in range(4)]
+        self.has_door = np.array([[building.door is not None] for building in self.buildings], dtype = bool)
+        doors = [building.door if building.door is not None else [0, 0] for building in self.buildings]
+        doors = np.array(doors, dtype = float).reshape(-1, 2)
+        self.door_left, self.door_right = doors[:, 0:1], doors[:, 1:2]
+        self.leads = np.array([[building.scene is not None] for building in self.buildings], dtype = bool)
+
+        self.view = view_bounds(self.scene, self.info, scene.image)
+        if self.view[1] != self.view[3]:
+            raise ValueError("Scene '%s' scrolls vertically!" % self.scene)
+        if self.on_map:
+            borders = list(BORDERS)
+            start = [WIDTH / 2, HEIGHT / 2]
+        else:
+            borders = interior_borders(self.info)
+            start = interior_entry(self.info)
+        latitude = self.view[2]
+        self.bounds = world_bounds(borders, self.view)
+
+        #Screen positions and horizontal camera positions, the representation `Simulation` keeps
+        self.pos = np.empty((count, 2))
+        self.pos[:] = start
+        self.latitude = np.empty(count)
+        self.latitude[:] = latitude
+        self.vel = np.zeros((count, 2))
+        self.speed = np.empty(count)
+        self.speed[:] = WALK_SPEED
+        self.moving = np.zeros(count, dtype = np.int8)
+        self.active = np.ones(count, dtype = bool)
+        self.ticks = 0
+
+        #Which door volumes each agent stands in, one row per building
+        x, y = self.world_pos()
+        self.inside = self._in_doors(x, y, self.active)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def _offset_x(self):
+        #World x coordinate of the left of each agent's screen, see `Camera.offset`
+        return self.latitude - WIDTH / 2
+
+    def world_pos(self):
+        """
+        Positions in world coordinates, see `Simulation.world_pos`.
+        :return: (x array, y array)
+        """
+        return self._offset_x() + self.pos[:, 0], self.pos[:, 1] + (self.view[1] - HEIGHT / 2)
+
+    def set_world_pos(self, x, y):
+        """
+        Move every agent to the world position (`x`[i], `y`[i]), scrolling
+        its map like `Simulation.set_world_pos`.
+        :param x: array of N floats
+        :param y: array of N floats
+        """
+        self.latitude = np.minimum(np.maximum(x, self.view[0]), self.view[2])
+        self.pos[:, 0] = x - self._offset_x()
+        self.pos[:, 1] = y - (self.view[1] - HEIGHT / 2)
+
+    def _in_doors(self, x, y, active):
+        #Same volumes as `Building.trigger`, for every agent and building
+        return (active & self.has_door & (y >= self.lower - 1) & (y <= self.lower + 1)
+                & (x >= self.door_left) & (x <= self.door_right))
+
+    def tick(self):
+        """
+        Move every active agent for one tick and open the doors it steps in front of.
+        Pairs come agent by agent in building order; an agent's doors after one
+        into another scene do not open, as with `triggers.TriggerWatch`.
+        :return: (agents, buildings) int arrays of the doors opened this tick
+        """
+        active = self.active
+        walking = active & (self.moving != 0)
+        self.vel[walking, 0] = self.moving[walking]
+
+        x, y = self.world_pos()
+        dx = np.where(active, self.vel[:, 0] * self.speed, 0)
+        dy = np.where(active, self.vel[:, 1] * self.speed, 0)
+        upper, lower, left, right = self.bounds
+        x, blocked_x = _sweep_axis(x, dx, y, self.left, self.right, self.upper, self.lower, left, right)
+        y, blocked_y = _sweep_axis(y, dy, x, self.upper, self.lower, self.left, self.right, upper, lower)
+        self.vel[blocked_x, 0] = 0
+        self.vel[blocked_y, 1] = 0
+        self.set_world_pos(x, y)
+
+        inside = self._in_doors(x, y, active)
+        hits = inside & ~self.inside
+        self.inside = inside
+        exits = hits & self.leads
+        leaving = exits.any(axis = 0)
+        last = np.where(leaving, exits.argmax(axis = 0), len(self.buildings))
+        hits &= np.arange(len(self.buildings))[:, None] <= last
+        self.active = active & ~leaving
+        self.ticks += 1
+        return np.nonzero(hits.T)
+
+    def step_n(self, n):
+        """
+        Run exactly `n` ticks.
+        :param n: int >= 0
+        :return: list of the n (agents, buildings) pairs returned by `tick()`
+        """
+        return [self.tick() for _ in range(n)]
+
+def _sweep_axis(start, delta, other, low, high, other_low, other_high, bound_low, bound_high):
+    #`collision._sweep_axis` for every agent at once. Going forward, the boxes
+    #that stop the point leave it at the smallest of their `low - 1` (never
+    #behind `start`), whatever order they are met in; backward is the mirror.
+    end = start + delta
+    forward = delta > 0
+    backward = delta < 0
+    across = (other >= other_low) & (other <= other_high)
+    hit_forward = forward & across & (start < low) & (low <= end)
+    hit_backward = backward & across & (end <= high) & (high < start)
+    stop_forward = np.where(hit_forward, np.maximum(start, low - 1), np.inf).min(axis = 0, initial = np.inf)
+    stop_backward = np.where(hit_backward, np.minimum(start, high + 1), -np.inf).max(axis = 0, initial = -np.inf)
+    end = np.where(forward, np.minimum(end, stop_forward), np.maximum(end, stop_backward))
+    blocked = hit_forward.any(axis = 0) | hit_backward.any(axis = 0)
+
+    over = forward & (end >= bound_high)
+    under = backward & (end <= bound_low)
+    end = np.where(over, np.maximum(start, bound_high - 1), end)
+    end = np.where(under, np.minimum(start, bound_low + 1), end)
+    return end, blocked | over | under
@@ -0,0 +1,160 @@
+"""
+Per-agent cost of a tick with `batch.BatchSimulation` against one
+`Simulation` per agent, and a check that both give exactly the same
+positions, velocities, latitudes and doors under the same random walks.
+
+Needs NumPy; prints a "skipped" object without it.
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_batch.py
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from scenes import SceneManager
+from simulation import Character, ImageInfo, Simulation, WALK_SPEED, RUN_SPEED
+
+SCENES = ["map", "center", "mart", "gym", "house"]
+CHECKED_AGENTS = 300
+CHECKED_TICKS = 600
+SIZES = [1000, 10000]
+TIMED_TICKS = 100
+
+def scalar_agents(scenes, name, count):
+    #One headless Simulation per agent, standing where a character enters `name`
+    agents = []
+    for i in range(count):
+        character = Character(None, ImageInfo([32, 32], [64, 64], None), "agent%d" % i)
+        simulation = Simulation.from_scenes(character, scenes, "map")
+        if name != "map":
+            simulation.enter_scene(name)
+        agents.append(simulation)
+    return agents
+
+def random_inputs(rng, count):
+    #Per agent, None or the new (horizontal direction, vertical direction, speed)
+    inputs = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            inputs.append((rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1]), rng.choice([WALK_SPEED, RUN_SPEED])))
+        else:
+            inputs.append(None)
+    return inputs
+
+def apply_scalar(simulation, change):
+    moving, vertical, speed = change
+    simulation.moving_left = moving < 0
+    simulation.moving_right = moving > 0
+    if moving == 0:
+        simulation.character.vel[0] = 0
+    simulation.character.vel[1] = vertical
+    simulation.character.speed = speed
+
+def apply_batch(batch, i, change):
+    moving, vertical, speed = change
+    batch.moving[i] = moving
+    if moving == 0:
+        batch.vel[i, 0] = 0
+    batch.vel[i, 1] = vertical
+    batch.speed[i] = speed
+
+def check(scenes, name):
+    """
+    Step CHECKED_AGENTS agents both ways and compare them after every tick.
+    :return: (bool match, int doors opened, float seconds per tick of one Simulation)
+    """
+    from batch import BatchSimulation
+
+    agents = scalar_agents(scenes, name, CHECKED_AGENTS)
+    batch = BatchSimulation(scenes.load(name), CHECKED_AGENTS)
+    buildings = batch.buildings
+    dialogs = dict((id(building.interactive), i) for i, building in enumerate(buildings))
+
+    opened = []
+    for i, simulation in enumerate(agents):
+        simulation.on_dialog = lambda dialog, i = i: opened.append((i, dialogs[id(dialog)]))
+
+    #Agents walk in through the door, as the player does
+    for i, simulation in enumerate(agents):
+        apply_scalar(simulation, (0, -1, WALK_SPEED))
+        apply_batch(batch, i, (0, -1, WALK_SPEED))
+
+    rng = random.Random(name)
+    inside = [True] * len(agents)
+    ticks = 0
+    doors = 0
+    scalar_time = 0.0
+    for _ in range(CHECKED_TICKS):
+        for i, change in enumerate(random_inputs(rng, len(agents))):
+            if change is not None and inside[i]:
+                apply_scalar(agents[i], change)
+                apply_batch(batch, i, change)
+
+        del opened[:]
+        start = time.time()
+        for i, simulation in enumerate(agents):
+            if inside[i]:
+                ticks += 1
+                simulation.tick()
+                if simulation.current_background != name:
+                    inside[i] = False
+                    opened.append((i, [building.scene for building in buildings].index(simulation.current_background)))
+        scalar_time += time.time() - start
+
+        hit_agents, hit_buildings = batch.tick()
+        if sorted(opened) != sorted(zip(hit_agents.tolist(), hit_buildings.tolist())):
+            return False, doors, scalar_time / max(ticks, 1)
+        doors += len(opened)
+
+        x, y = batch.world_pos()
+        for i, simulation in enumerate(agents):
+            if not inside[i]:
+                continue
+            if simulation.world_pos() != [x[i], y[i]] or simulation.character.vel != batch.vel[i].tolist():
+                return False, doors, scalar_time / max(ticks, 1)
+            if simulation.camera.position[0] != batch.latitude[i]:
+                return False, doors, scalar_time / max(ticks, 1)
+        if inside != batch.active.tolist():
+            return False, doors, scalar_time / max(ticks, 1)
+    return True, doors, scalar_time / max(ticks, 1)
+
+def time_batch(scenes, name, count):
+    #Seconds per agent tick of agents walking at random
+    from batch import BatchSimulation
+    import numpy as np
+
+    batch = BatchSimulation(scenes.load(name), count)
+    rng = np.random.RandomState(0)
+    batch.moving[:] = rng.choice([-1, 0, 1], count)
+    batch.vel[:, 1] = rng.choice([-1, 0, 1], count)
+    start = time.time()
+    batch.step_n(TIMED_TICKS)
+    return (time.time() - start) / (TIMED_TICKS * count)
+
+def main():
+    try:
+        import numpy
+    except ImportError:
+        print(json.dumps({"benchmark": "batch_tick", "skipped": "NumPy is not installed"}))
+        return
+
+    scenes = SceneManager()
+    for name in SCENES:
+        match, doors, scalar = check(scenes, name)
+        print(json.dumps({"benchmark": "batch_check", "scene": name, "agents": CHECKED_AGENTS,
+                          "ticks": CHECKED_TICKS, "doors": doors, "match": match,
+                          "scalar_us_per_agent_tick": round(scalar * 1e6, 3),
+                          "python": platform.python_version()}, sort_keys = True))
+        for count in SIZES:
+            print(json.dumps({"benchmark": "batch_tick", "scene": name, "agents": count,
+                              "us_per_agent_tick": round(time_batch(scenes, name, count) * 1e6, 3),
+                              "python": platform.python_version()}, sort_keys = True))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Drawing chunked worlds of growing size while the view scrolls across them.
+
+Each world is a pack of 128 pixel chunks, from 8x8 chunks (about 2x2
+screens) to 512x512 (over 130x130 screens). A 480x480 view scrolls
+diagonally across it, 4 pixels per axis per frame; the cost per frame,
+the chunks decoded per frame and the memory held (decoded chunks, and the
+peak resident size of the process) should stay flat as the world grows.
+Blank chunks are not written, so the packs take little disk space.
+
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_chunks.py
+"""
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import pygame
+
+from chunks import ChunkedWorld, write_pack, DEFAULT_CHUNK_SIZE, PIXEL_SIZE
+
+VIEW = (480, 480)
+FRAMES = 2000
+STEP = 4
+
+class SurfaceCanvas:
+    #What ChunkedWorld.draw needs of a SimpleGUICS2Pygame canvas
+    def __init__(self, size):
+        self._pygame_surface = pygame.Surface(size)
+
+def make_pack(path, chunks):
+    #Every 7th chunk has a pattern, the others are left blank
+    pattern = bytes(bytearray(i % 251 for i in range(DEFAULT_CHUNK_SIZE * DEFAULT_CHUNK_SIZE * PIXEL_SIZE)))
+    size = chunks * DEFAULT_CHUNK_SIZE
+    write_pack(path, size, size, lambda col, row: pattern if (col + row) % 7 == 0 else None)
+
+def main():
+    pygame.init()
+    directory = tempfile.mkdtemp()
+    canvas = SurfaceCanvas(VIEW)
+    try:
+        for chunks in (8, 64, 512):
+            path = os.path.join(directory, "world%d.pack" % chunks)
+            make_pack(path, chunks)
+            world = ChunkedWorld.open(path)
+            span = chunks * DEFAULT_CHUNK_SIZE - VIEW[0]
+            start = time.time()
+            for frame in range(FRAMES):
+                #Back and forth along the diagonal
+                offset = (frame * STEP) % (2 * span)
+                position = VIEW[0] / 2 + (offset if offset <= span else 2 * span - offset)
+                world.draw(canvas, [position, position], VIEW, [VIEW[0] / 2, VIEW[1] / 2])
+            elapsed = time.time() - start
+            print(json.dumps({"benchmark": "chunked_world_draw",
+                              "world_chunks": [chunks, chunks],
+                              "world_screens": round(chunks * DEFAULT_CHUNK_SIZE / float(VIEW[0]), 1),
+                              "us_per_frame": round(elapsed * 1e6 / FRAMES, 3),
+                              "decoded_per_frame": round(world.misses / float(FRAMES), 3),
+                              "cache_bytes": world.memory(),
+                              "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                              "python": platform.python_version()}, sort_keys = True))
+            world.pack.close()
+            os.remove(path)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-tick cost of building collision, linear scan versus the spatial index,
+for a character running diagonally from the middle of the area.
+
+The first sweep grows the number of buildings while keeping the number of
+buildings per screen constant (the map gets wider); the indexed cost should
+stay flat. The second sweep packs more buildings into the same area; the
+indexed cost should grow with the local density instead.
+
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_collision.py
+"""
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from simulation import ImageInfo, Character, Building, Simulation, border_control, RUN_SPEED
+from spatial import BuildingIndex
+
+TICKS = 2000
+
+def make_buildings(count, width, height, seed = 0):
+    #Random 20x20 obstacles spread over a width x height area
+    rng = random.Random(seed)
+    buildings = []
+    for _ in range(count):
+        left = rng.randint(0, width - 20)
+        upper = rng.randint(0, height - 20)
+        buildings.append(Building([upper, upper + 20, left, left + 20]))
+    return buildings
+
+def make_world(buildings, width, height):
+    info = ImageInfo([240, 240], [480, 480], None)
+    character = Character(None, ImageInfo([32, 32], [64, 64], None), "bench")
+    world = Simulation(character, {"map": buildings}, None, info)
+    #The camera scrolls over the whole width x height area
+    world.camera.bounds = [240, 240, max(240, width - 240), max(240, height - 240)]
+    return world
+
+def per_tick(run):
+    #Best of three, in microseconds per tick
+    return min(timeit.repeat(run, number = TICKS, repeat = 3)) * 1e6 / TICKS
+
+def walker(world, start, candidates):
+    #One tick of the character running diagonally from `start` against the
+    #buildings `candidates()` returns; it is put back at `start` every call
+    camera, character = world.camera, world.character
+    camera.center_on(start)
+    position = list(camera.position)
+    screen_pos = camera.to_screen(start)
+    character.speed = RUN_SPEED
+
+    def tick():
+        camera.position[0], camera.position[1] = position
+        character.pos[0], character.pos[1] = screen_pos
+        character.vel[0] = character.vel[1] = 1
+        border_control(candidates(), world)
+    return tick
+
+def measure(count, width, height):
+    buildings = make_buildings(count, width, height)
+    world = make_world(buildings, width, height)
+    index = BuildingIndex(buildings)
+    start = [width // 2, height // 2]
+    linear = walker(world, start, lambda: buildings)
+    indexed = walker(world, start, lambda: index.along(world.world_pos(), world.character.velocity()))
+    return {"buildings": count,
+            "area": [width, height],
+            "linear_us": round(per_tick(linear), 3),
+            "indexed_us": round(per_tick(indexed), 3)}
+
+def main():
+    #Constant density: 40 buildings per 480x480 screen
+    for screens in (1, 4, 16, 64):
+        result = measure(40 * screens, 480 * screens, 480)
+        result["sweep"] = "total"
+        print(json.dumps(result))
+
+    #Growing density on a single screen
+    for count in (10, 40, 160, 640):
+        result = measure(count, 480, 480)
+        result["sweep"] = "local"
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Per-call cost of the game's handlers, run headless on the stub backend.
+
+Measures `game_draw` in every scene, `border_control` over every scene's
+full building set, the trigger volumes while standing at a door and while
+walking among thousands of them, the update and drawing of a dialog, the
+layout of a dialog, the mart and inventory panels with up to thousands of
+items, the scheduler running the game's timers, the sound manager under
+key-mashing and scene changes. The
+loader is measured against real files by bench_loader.py.
+
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_game.py
+"""
+import json
+import os
+import platform
+import sys
+import timeit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, os.pardir))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import stub_simplegui
+stub_simplegui.install()
+
+import game
+from simulation import border_control
+from triggers import Trigger, TriggerIndex, TriggerWatch
+from scheduler import Scheduler
+from session import Dialog, PANEL_ROWS
+from items import Item, Catalog, Inventory, ListView
+from sounds import SoundManager
+
+SCENES = ["map", "center", "mart", "gym", "house"]
+CALLS = 2000
+
+def per_call(run, calls = CALLS):
+    #Best of three, in microseconds per call
+    return min(timeit.repeat(run, number = calls, repeat = 3)) * 1e6 / calls
+
+def result(benchmark, run, calls = CALLS, **details):
+    details["benchmark"] = benchmark
+    details["us_per_call"] = round(per_call(run, calls), 3)
+    details["python"] = platform.python_version()
+    return details
+
+def start_game():
+    #Runs the loading, the introduction and the game initialization without waiting
+    game.intro_loader.load()
+    game.add_game_assets()
+    game.game_loader.load()
+    game.intro_init()
+    game.name = "BENCH"
+    game.game_init()
+
+def bench_draw():
+    canvas = game.frame.canvas
+    for scene in SCENES:
+        game.session.simulation.enter_scene(scene)
+        game.session.dialog = None
+        canvas.reset()
+        game.game_draw(canvas)
+        calls = dict(canvas.calls)
+        yield result("game_draw", lambda: game.game_draw(canvas), scene = scene, canvas_calls = calls)
+
+def bench_border_control():
+    simulation = game.session.simulation
+    for scene in SCENES:
+        simulation.enter_scene(scene)
+        buildings = list(simulation.building_sets[scene])
+        yield result("border_control", lambda: border_control(buildings, simulation),
+                     scene = scene, buildings = len(buildings))
+
+def bench_triggers():
+    simulation = game.session.simulation
+    simulation.enter_scene("house")
+    game.session.dialog = None
+
+    #Standing in front of Ruby: she spoke when the character arrived
+    ruby = [building for building in simulation.building_sets["house"] if building.interactive][0]
+    pos = [(ruby.door[0] + ruby.door[1]) / 2, ruby.borders[1] + 1]
+    simulation.set_world_pos(pos)
+    simulation.triggers.update(simulation, simulation.world_pos())
+    game.session.dialog = None
+    yield result("triggers", lambda: simulation.triggers.update(simulation, simulation.world_pos()),
+                 note = "standing at a door", triggers = len(simulation.triggers.index))
+
+    #A grid of 10000 triggers 8 pixels apart, walked through diagonally
+    index = TriggerIndex(Trigger([y, y + 4, x, x + 4], lambda world: None, lambda world: None)
+                         for y in range(0, 800, 8) for x in range(0, 800, 8))
+    watch = TriggerWatch(index, [0, 0])
+    steps = [[i % 800, i % 800] for i in range(CALLS)]
+    position = iter(steps * 4)
+    yield result("triggers", lambda: watch.update(simulation, next(position)),
+                 note = "walking, a trigger entered or left every 4 calls", triggers = len(index))
+    simulation.enter_scene("map")
+
+def bench_dialog():
+    canvas = game.frame.canvas
+    session = game.session
+    session.start_dialog(["Welcome to the Pokemon Center!", "Come back when you have pokemon,",
+                          "and I can help them!", "Then you can battle me!"])
+
+    def dialog_handler():
+        session.update_dialog()
+        game.draw_dialog(canvas, session.dialog)
+
+    yield result("dialog_handler", dialog_handler, note = "update then draw of the dialog shown")
+    session.dialog = None
+
+    #Laid out once per dialog: every line measured, long ones wrapped
+    lines = ["This world is widely inhabited by creatures known as pokemon, and it is my job to research them.",
+             "Welcome to the Pokemon Center!", lambda: None, "Then you can battle me!"] * 4
+    yield result("dialog_layout", lambda: Dialog(lines, measure = game.measure_dialog_text),
+                 note = "%d entries, 4 wrapped" % len(lines))
+
+def bench_panels():
+    #The mart and inventory panels with the game's items and with a modded catalog,
+    #scrolled half way down
+    canvas = game.frame.canvas
+    for count in (len(game.master_items), 5000):
+        items = Catalog(Item("Item %d" % i, (("health", "capture", "revive")[i % 3], i), 100 + i, 0)
+                        for i in range(count))
+        inventory = Inventory((item.name, 1 + i % 99) for i, item in enumerate(items))
+        view = ListView(PANEL_ROWS)
+        view.move(count // 2, count)
+        yield result("mart_panel", lambda: game.draw_mart(canvas, items, view), items = count)
+        yield result("inventory_panel", lambda: game.draw_inventory(canvas, inventory, view), items = count)
+        yield result("inventory_add_remove", lambda: (inventory.add("Item 1"), inventory.remove("Item 1")),
+                     items = count)
+
+def bench_scheduler():
+    #The walk and loader timers on a clock advancing one 60 fps frame per call
+    clock = [0.0]
+    scheduler = Scheduler(lambda: clock[0])
+    for interval in (150, 100):
+        scheduler.every(interval, lambda: None).start()
+
+    def frame():
+        clock[0] += 1 / 60.0
+        scheduler.run_due()
+
+    yield result("scheduler", frame, note = "2 timers, one 60 fps frame per call")
+    yield result("scheduler", scheduler.run_due, note = "2 timers, none due")
+
+def bench_sounds():
+    #The A button mashed 20 times a second, on its own manager with a fake clock;
+    #its length given, then read from the sound like the game does
+    for length, note in ((0.2, "length given"), (None, "length read from the sound")):
+        clock = [0.0]
+        sounds = SoundManager(lambda: clock[0])
+        sounds.add_effect("A-button", stub_simplegui.StubSound("A-button"), "ui", length = length)
+
+        def press():
+            clock[0] += 0.05
+            sounds.play("A-button")
+
+        details = result("sound_play", press,
+                         note = "A button pressed every 50 ms, 2 voices of 0.2 s, " + note)
+        details["dropped_ratio"] = round(sounds.dropped / float(sounds.played + sounds.dropped), 3)
+        yield details
+    yield result("sound_update", sounds.update, note = "no music fading")
+
+def bench_map_change():
+    simulation = game.session.simulation
+    simulation.enter_scene("map")
+
+    def round_trip():
+        simulation.enter_scene("center")
+        simulation.enter_scene("map")
+
+    yield result("map_change", round_trip, calls = CALLS // 2,
+                 note = "enter_scene center then map, scenes already loaded")
+
+def main():
+    start_game()
+    for benchmark in (bench_draw, bench_border_control, bench_triggers, bench_dialog, bench_panels,
+                      bench_scheduler, bench_sounds, bench_map_change):
+        for measurement in benchmark():
+            print(json.dumps(measurement, sort_keys = True))
+
+if __name__ == "__main__":
+    main()
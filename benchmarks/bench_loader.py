@@ -0,0 +1,101 @@
+"""
+Cost of `Loader.load()` with one and several workers, against local files
+and against a simulated network.
+
+Generates images of the size of the game's maps, seeds them into a
+temporary offline `AssetCache` and loads them through SimpleGUICS2Pygame,
+so nothing touches the network. Local files are decoded as fast as the
+workers can; the network is simulated by a cache that waits `LATENCY`
+seconds before serving each file, like a download would, which is where
+several workers pay off. Needs Pygame and SimpleGUICS2Pygame; prints a
+"skipped" object without them.
+
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_loader.py
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+IMAGES = 24
+IMAGE_SIZE = (480, 480)
+REPEAT = 3
+
+#Seconds the simulated network takes to serve each file
+LATENCY = 0.05
+
+def make_files(directory, count):
+    import pygame
+
+    for i in range(count):
+        surface = pygame.Surface(IMAGE_SIZE)
+        surface.fill((i * 10 % 256, 80, 160))
+        pygame.image.save(surface, os.path.join(directory, "bench%d.png" % i))
+    return ["http://example.com/bench%d.png" % i for i in range(count)]
+
+def time_load(frame, cache, urls, workers):
+    from loader import Loader, load_image
+
+    background = load_image(urls[0], cache)
+    best = None
+    for _ in range(REPEAT):
+        loader = Loader(frame, 480, lambda: None, background, cache = cache, workers = workers)
+        for url in urls:
+            loader.add_image(url)
+        start = time.time()
+        loader.load()
+        elapsed = time.time() - start
+        assert loader.get_nb_images_loaded() == len(urls)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    try:
+        import SimpleGUICS2Pygame.simpleguics2pygame as simplegui
+    except ImportError:
+        print(json.dumps({"benchmark": "loader_load", "skipped": "SimpleGUICS2Pygame is not installed"}))
+        return
+
+    from asset_cache import AssetCache
+
+    class SlowCache(AssetCache):
+        #Serves every file after LATENCY seconds, as if downloading it
+        def fetch(self, url):
+            time.sleep(LATENCY)
+            return AssetCache.fetch(self, url)
+
+    root = tempfile.mkdtemp()
+    try:
+        files = os.path.join(root, "files")
+        os.mkdir(files)
+        urls = make_files(files, IMAGES)
+        cache = AssetCache(os.path.join(root, "cache"), offline = True)
+        cache.seed(files)
+        slow_cache = SlowCache(cache.root, offline = True)
+
+        frame = simplegui.create_frame("bench", 480, 480)
+        for latency, source in ((0, cache), (LATENCY, slow_cache)):
+            for workers in (1, 4, 8):
+                seconds = time_load(frame, source, urls, workers)
+                print(json.dumps({"benchmark": "loader_load",
+                                  "images": IMAGES,
+                                  "image_size": list(IMAGE_SIZE),
+                                  "latency_ms": int(latency * 1000),
+                                  "workers": workers,
+                                  "ms_per_image": round(seconds * 1000.0 / IMAGES, 3),
+                                  "python": platform.python_version()}, sort_keys = True))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
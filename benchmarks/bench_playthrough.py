@@ -0,0 +1,47 @@
+"""
+Throughput of `playthrough.run_all()` with more and more worker processes,
+running copies of playthroughs/tour.json (every building in town).
+
+The speedup over one worker should stay close to the number of workers,
+up to the number of CPUs.
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_playthrough.py
+"""
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import playthrough
+
+RUNS_PER_WORKER = 16
+SCRIPT = os.path.join(ROOT, "playthroughs", "tour.json")
+
+def main():
+    cpus = multiprocessing.cpu_count()
+    counts = sorted(set([1, 2, 4, 8, cpus]))
+    base = None
+    with open(os.devnull, "w") as report:
+        for workers in counts:
+            runs = RUNS_PER_WORKER * workers
+            start = time.time()
+            results = playthrough.run_all([SCRIPT] * runs, workers, report)
+            rate = runs / (time.time() - start)
+            base = rate if base is None else base
+            print(json.dumps({"benchmark": "playthrough_pool",
+                              "workers": workers,
+                              "cpus": cpus,
+                              "runs": runs,
+                              "ok": all(result["ok"] for result in results),
+                              "runs_per_second": round(rate, 2),
+                              "speedup": round(rate / base, 2),
+                              "python": platform.python_version()}, sort_keys = True))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Saving and loading games as the inventory and the flags grow.
+
+A headless session carries from 10 to 10000 different items and as many
+flags. For each size: the capture of a snapshot and the hand-over to the
+autosaver (what the frame loop pays), the encoding, the atomic write to
+disk (what the autosaver's thread pays), the decoding and the whole
+`Snapshot.load`, with the size of the file. Loading the hot fields does
+not depend on the size; only the inventory and flag tables grow.
+
+Prints one JSON object per measurement.
+
+    python benchmarks/bench_saves.py
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from scenes import SceneManager
+from session import GameSession
+from saves import Snapshot, Autosaver, write
+
+SIZES = (10, 100, 1000, 10000)
+
+def per_call(run, calls):
+    #Best of three, in microseconds per call
+    return min(timeit.repeat(run, number = calls, repeat = 3)) * 1e6 / calls
+
+def main():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "save.bin")
+    scenes = SceneManager()
+    try:
+        for size in SIZES:
+            session = GameSession("BENCH", scenes, [])
+            for i in range(size):
+                session.character.inventory.add("Item %d" % i, 1 + i % 99)
+                session.flags["flag %d" % i] = i
+            snapshot = Snapshot.capture(session)
+            data = snapshot.to_bytes()
+            calls = max(10, 20000 // size)
+            autosaver = Autosaver(path)
+            #The autosaver goes last, its thread would slow the others down
+            measurements = [("capture", lambda: Snapshot.capture(session), calls),
+                            ("encode", snapshot.to_bytes, calls),
+                            ("write", lambda: write(path, snapshot), 20),
+                            ("decode", lambda: Snapshot.from_bytes(data), calls),
+                            ("load", lambda: Snapshot.load(path), calls),
+                            ("autosave_call", lambda: autosaver.save(Snapshot.capture(session)), calls)]
+            for benchmark, run, count in measurements:
+                print(json.dumps({"benchmark": "save_" + benchmark,
+                                  "inventory": size,
+                                  "flags": size,
+                                  "bytes": len(data),
+                                  "us_per_call": round(per_call(run, count), 3),
+                                  "python": platform.python_version()}, sort_keys = True))
+            autosaver.close()
+            loaded = Snapshot.load(path)
+            assert (loaded.item_names, loaded.item_counts, loaded.flags) == \
+                (snapshot.item_names, snapshot.item_counts, snapshot.flags)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
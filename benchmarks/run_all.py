@@ -0,0 +1,52 @@
+"""
+Runs every benchmark in this directory and writes their results as one
+JSON document, to keep and compare between releases.
+
+    python benchmarks/run_all.py --output results.json
+
+Each bench_*.py runs in its own interpreter, since bench_game.py replaces
+the SimpleGUI backend for the whole process.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run(script):
+    #Returns the JSON lines printed by `script`
+    output = subprocess.check_output([sys.executable, script])
+    results = []
+    for line in output.decode("utf-8").splitlines():
+        line = line.strip()
+        if line.startswith("{"):
+            results.append(json.loads(line))
+    return results
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Run all the benchmarks.")
+    parser.add_argument("--output", help = "file to write the results to (default: standard output)")
+    args = parser.parse_args(argv)
+
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "benchmarks": {}}
+    for script in sorted(glob.glob(os.path.join(BENCHMARKS_DIR, "bench_*.py"))):
+        name = os.path.splitext(os.path.basename(script))[0]
+        report["benchmarks"][name] = run(script)
+
+    text = json.dumps(report, indent = 1, sort_keys = True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
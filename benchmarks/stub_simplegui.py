@@ -0,0 +1,184 @@
+"""
+A stand-in `simplegui` module for running the game without a window.
+
+`install()` registers it under the name `simplegui`, which the game and the
+loader try before SimpleGUICS2Pygame. Frames never open, timers never fire,
+sounds are silent (lasting SOUND_LENGTH seconds) and images are placeholders of a fixed size. The canvas
+does not draw anything: it counts the calls made to it, so benchmarks can
+report how much drawing work a frame asks for.
+"""
+import sys
+import types
+
+#Same codes as CodeSkulptor
+KEY_MAP = dict([(chr(code).lower(), code) for code in range(ord('A'), ord('Z') + 1)]
+               + [(chr(code), code) for code in range(ord('0'), ord('9') + 1)]
+               + [('space', 32), ('left', 37), ('up', 38), ('right', 39), ('down', 40)])
+
+#Size given to every image, large enough for the biggest map
+IMAGE_SIZE = (960, 480)
+
+#Seconds every sound lasts
+SOUND_LENGTH = 0.2
+
+class RecordingCanvas:
+    """
+    Canvas counting the calls to each of its drawing methods.
+    """
+    def __init__(self):
+        self.calls = {}
+
+    def _count(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+    def reset(self):
+        self.calls = {}
+
+    def draw_image(self, image, center_source, width_height_source, center_dest, width_height_dest, rotation = 0):
+        self._count("draw_image")
+
+    def draw_text(self, text, point, font_size, font_color, font_face = 'serif'):
+        self._count("draw_text")
+
+    def draw_line(self, point1, point2, line_width, line_color):
+        self._count("draw_line")
+
+    def draw_polyline(self, point_list, line_width, line_color):
+        self._count("draw_polyline")
+
+    def draw_polygon(self, point_list, line_width, line_color, fill_color = None):
+        self._count("draw_polygon")
+
+    def draw_circle(self, center_point, radius, line_width, line_color, fill_color = None):
+        self._count("draw_circle")
+
+    def draw_point(self, point, color):
+        self._count("draw_point")
+
+class _Canvas:
+    #The private part of SimpleGUICS2Pygame's canvas that `loader.Loader` uses
+    def __init__(self, frame):
+        self._frame = frame
+        self._draw_handler = None
+
+    def _draw(self):
+        if self._draw_handler is not None:
+            self._draw_handler(self._frame.canvas)
+
+class StubFrame:
+    """
+    Frame keeping its handlers so they can be called directly.
+    """
+    def __init__(self, title, width, height):
+        self.title = title
+        self.size = (width, height)
+        self.canvas = RecordingCanvas()
+        self._canvas = _Canvas(self)
+        self.draw_handler = None
+        self.keydown_handler = None
+        self.keyup_handler = None
+        self.running = False
+
+    def set_draw_handler(self, handler):
+        self.draw_handler = handler
+        self._canvas._draw_handler = handler
+
+    def set_keydown_handler(self, handler):
+        self.keydown_handler = handler
+
+    def set_keyup_handler(self, handler):
+        self.keyup_handler = handler
+
+    def set_canvas_background(self, color):
+        pass
+
+    def add_input(self, text, handler, width):
+        return None
+
+    def add_button(self, text, handler, width = None):
+        return None
+
+    def add_label(self, text, width = None):
+        return None
+
+    def get_canvas_textwidth(self, text, size, face = 'serif'):
+        return int(len(text) * size * 0.6)
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+class StubTimer:
+    """
+    Timer that never fires on its own; call `handler` to simulate it.
+    """
+    def __init__(self, interval, handler):
+        self.interval = interval
+        self.handler = handler
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def is_running(self):
+        return self.running
+
+class StubImage:
+    def __init__(self, url):
+        self.url = url
+
+    def get_width(self):
+        return IMAGE_SIZE[0]
+
+    def get_height(self):
+        return IMAGE_SIZE[1]
+
+class StubSound:
+    def __init__(self, url):
+        self.url = url
+        self.volume = 1.0
+        self.playing = False
+
+    def play(self):
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def rewind(self):
+        self.playing = False
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def _get_length(self):
+        #Seconds, like SimpleGUICS2Pygame
+        return SOUND_LENGTH
+
+def create_frame(title, width, height, control_width = 200):
+    return StubFrame(title, width, height)
+
+def create_timer(interval, handler):
+    return StubTimer(interval, handler)
+
+def load_image(url):
+    return StubImage(url)
+
+def load_sound(url):
+    return StubSound(url)
+
+def install():
+    """
+    Register this module as `simplegui`. Call it before importing the game.
+    :return: module
+    """
+    module = types.ModuleType("simplegui")
+    for name in ("KEY_MAP", "create_frame", "create_timer", "load_image", "load_sound"):
+        setattr(module, name, globals()[name])
+    sys.modules["simplegui"] = module
+    return module
@@ -0,0 +1,84 @@
+"""
+The camera: which part of the world the screen shows.
+
+The camera's position is the world point shown at the middle of the
+screen. It follows a target, the character, in both axes and stays within
+its bounds, the positions that keep the screen inside the scene. With
+`smoothing` it eases towards the target instead of sticking to it: the
+way left shrinks by the same factor per second however time is cut into
+steps, so the camera moves the same at any frame or tick rate. Positions
+are floats; scrolling by a fraction of a pixel is kept, not rounded away.
+
+`to_screen()` and `to_world()` convert between the two coordinate
+systems: drawing is in screen coordinates, collisions and triggers in
+world coordinates (see `simulation.Simulation.world_pos`).
+"""
+import math
+
+class Camera:
+    """
+    A view of the size of the screen, following a target within bounds.
+    """
+    def __init__(self, screen_size, bounds, smoothing = 0):
+        """
+        Starts at the top right of its bounds.
+        :param screen_size: [width, height] of the screen
+        :param bounds: [left, top, right, bottom] range of the position
+        :param smoothing: (int or float) >= 0 seconds to cover about two
+                          thirds (1 - 1/e) of the way to the target, 0 to stick to it
+        """
+        self.screen_size = screen_size
+        self.bounds = list(bounds)
+        self.smoothing = smoothing
+        self.position = [bounds[2], bounds[1]]
+        self.velocity = [0.0, 0.0]
+
+    def clamp(self, pos):
+        """
+        :param pos: [x, y] world position
+        :return: [x, y], the closest position within the bounds
+        """
+        left, top, right, bottom = self.bounds
+        return [min(max(pos[0], left), right), min(max(pos[1], top), bottom)]
+
+    def center_on(self, target):
+        #Moves straight to `target`, as far as the bounds allow
+        self.position = self.clamp(target)
+        self.velocity = [0.0, 0.0]
+
+    def follow(self, target, dt):
+        """
+        Move towards `target` for `dt` seconds.
+        :param target: [x, y] world position
+        :param dt: (int or float) > 0 seconds
+        """
+        goal = self.clamp(target)
+        if self.smoothing <= 0:
+            moved = goal
+        else:
+            factor = 1 - math.exp(-dt / float(self.smoothing))
+            position = self.position
+            moved = [position[0] + (goal[0] - position[0]) * factor,
+                     position[1] + (goal[1] - position[1]) * factor]
+        self.velocity = [(moved[0] - self.position[0]) / dt, (moved[1] - self.position[1]) / dt]
+        self.position = moved
+
+    def offset(self):
+        #World position of the top left corner of the screen
+        return [self.position[0] - self.screen_size[0] / 2, self.position[1] - self.screen_size[1] / 2]
+
+    def to_screen(self, pos):
+        """
+        :param pos: [x, y] world position
+        :return: [x, y] screen position
+        """
+        offset = self.offset()
+        return [pos[0] - offset[0], pos[1] - offset[1]]
+
+    def to_world(self, pos):
+        """
+        :param pos: [x, y] screen position
+        :return: [x, y] world position
+        """
+        offset = self.offset()
+        return [offset[0] + pos[0], offset[1] + pos[1]]
@@ -0,0 +1,240 @@
+"""
+Chunked worlds: maps far larger than the screen, cut into square chunks
+stored in one pack file that is memory-mapped rather than read.
+
+A pack is a fixed header followed by every chunk, row by row, each one
+`chunk_size` x `chunk_size` raw RGB pixels (chunks at the right and
+bottom edges are padded). Chunk (col, row) therefore starts at
+
+    HEADER.size + (row * cols + col) * chunk_size * chunk_size * 3
+
+and reading it is a slice of the mapping: nothing is parsed and the
+operating system pages in only what is read. A `ChunkedWorld` decodes the
+chunks a view needs into surfaces kept in an LRU of a fixed number of
+chunks, so memory stays the same however big the world is.
+
+A scene uses a pack by naming it instead of an image (see scenes.py):
+
+    {"chunks": "overworld.pack", "size": [480, 480], "buildings": [...]}
+
+Packs are made from an image, or from any function producing chunks:
+
+    python chunks.py <image> <pack> [--chunk-size 128]
+
+Drawing needs the Pygame surfaces of SimpleGUICS2Pygame, like renderer.py;
+on any other canvas a chunked world is not drawn.
+"""
+import mmap
+import struct
+from collections import OrderedDict
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+MAGIC = b"PKCH"
+VERSION = 1
+
+#Magic, version, chunk size, world width, world height
+HEADER = struct.Struct("<4sHHII")
+
+#Bytes per pixel (RGB)
+PIXEL_SIZE = 3
+
+DEFAULT_CHUNK_SIZE = 128
+
+#Chunks decoded at once: a 480x480 view of 128 pixel chunks touches 25,
+#the rest keeps the chunks just left behind
+DEFAULT_CACHE_CHUNKS = 64
+
+def write_pack(path, width, height, read_chunk, chunk_size = DEFAULT_CHUNK_SIZE):
+    """
+    Write a pack of a `width` x `height` world.
+    The file is sized first and only the chunks given are written, so
+    blank areas cost no disk space where the file system allows it.
+    :param path: str
+    :param width: int > 0 pixels
+    :param height: int > 0 pixels
+    :param read_chunk: function (col, row) -> None for a black chunk, or bytes
+                       of chunk_size * chunk_size RGB pixels
+    :param chunk_size: int > 0 pixels
+    :raise: ValueError if a chunk has the wrong size
+    """
+    cols, rows = _grid(width, height, chunk_size)
+    chunk_bytes = chunk_size * chunk_size * PIXEL_SIZE
+    with open(path, "wb") as pack:
+        pack.write(HEADER.pack(MAGIC, VERSION, chunk_size, width, height))
+        pack.truncate(HEADER.size + cols * rows * chunk_bytes)
+        for row in range(rows):
+            for col in range(cols):
+                data = read_chunk(col, row)
+                if data is None:
+                    continue
+                if len(data) != chunk_bytes:
+                    raise ValueError("Chunk (%d, %d) is %d bytes instead of %d!" % (col, row, len(data), chunk_bytes))
+                pack.seek(HEADER.size + (row * cols + col) * chunk_bytes)
+                pack.write(data)
+
+def pack_image(image_path, path, chunk_size = DEFAULT_CHUNK_SIZE):
+    """
+    Write the pack of an image file.
+    :param image_path: str, any format Pygame loads
+    :param path: str
+    :param chunk_size: int > 0 pixels
+    """
+    image = pygame.image.load(image_path)
+    width, height = image.get_size()
+
+    def read_chunk(col, row):
+        chunk = pygame.Surface((chunk_size, chunk_size))
+        chunk.blit(image, (-col * chunk_size, -row * chunk_size))
+        return pygame.image.tostring(chunk, "RGB")
+
+    write_pack(path, width, height, read_chunk, chunk_size)
+
+def _grid(width, height, chunk_size):
+    #Columns and rows of chunks covering the world
+    return (width + chunk_size - 1) // chunk_size, (height + chunk_size - 1) // chunk_size
+
+class ChunkPack:
+    """
+    The chunks of a pack file, read through a memory mapping.
+    """
+    def __init__(self, path):
+        """
+        :param path: str
+        :raise: ValueError if the file is not a pack
+        """
+        self.path = path
+        with open(path, "rb") as pack:
+            self._map = mmap.mmap(pack.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.chunk_size, self.width, self.height = HEADER.unpack_from(self._map, 0)
+        if (magic != MAGIC) or (version != VERSION):
+            self._map.close()
+            raise ValueError("'%s' is not a version %d chunk pack!" % (path, VERSION))
+        self.cols, self.rows = _grid(self.width, self.height, self.chunk_size)
+        self.chunk_bytes = self.chunk_size * self.chunk_size * PIXEL_SIZE
+        if len(self._map) < HEADER.size + self.cols * self.rows * self.chunk_bytes:
+            self._map.close()
+            raise ValueError("'%s' is truncated!" % path)
+
+    def chunk(self, col, row):
+        """
+        :param col: int, 0 <= col < cols
+        :param row: int, 0 <= row < rows
+        :return: bytes of the RGB pixels of the chunk, row by row
+        """
+        offset = HEADER.size + (row * self.cols + col) * self.chunk_bytes
+        return self._map[offset:offset + self.chunk_bytes]
+
+    def close(self):
+        self._map.close()
+
+class ChunkedWorld:
+    """
+    Draws views of a ChunkPack, decoding the chunks they show on demand.
+    Used in place of the image of a scene.
+    """
+    def __init__(self, pack, max_chunks = DEFAULT_CACHE_CHUNKS):
+        """
+        :param pack: ChunkPack
+        :param max_chunks: int > 0 decoded chunks kept
+        """
+        self.pack = pack
+        self.max_chunks = max_chunks
+        self.hits = 0
+        self.misses = 0
+        self._chunks = OrderedDict()
+
+    @classmethod
+    def open(cls, path, max_chunks = DEFAULT_CACHE_CHUNKS):
+        return cls(ChunkPack(path), max_chunks)
+
+    def get_width(self):
+        return self.pack.width
+
+    def get_height(self):
+        return self.pack.height
+
+    def memory(self):
+        #Bytes of the decoded chunks (32 bits per pixel)
+        return len(self._chunks) * self.pack.chunk_size * self.pack.chunk_size * 4
+
+    def in_view(self, center, size):
+        """
+        :param center: [x, y] world position of the middle of the view
+        :param size: [width, height] of the view
+        :return: list of the (col, row) of the chunks the view shows
+        """
+        chunk_size = self.pack.chunk_size
+        left = int(center[0] - size[0] / 2.0) // chunk_size
+        top = int(center[1] - size[1] / 2.0) // chunk_size
+        right = (int(center[0] + size[0] / 2.0) - 1) // chunk_size
+        bottom = (int(center[1] + size[1] / 2.0) - 1) // chunk_size
+        return [(col, row)
+                for row in range(max(top, 0), min(bottom, self.pack.rows - 1) + 1)
+                for col in range(max(left, 0), min(right, self.pack.cols - 1) + 1)]
+
+    def chunk(self, col, row):
+        """
+        :return: pygame.Surface of the chunk, decoded on a miss
+        """
+        key = (col, row)
+        surface = self._chunks.pop(key, None)
+        if surface is None:
+            self.misses += 1
+            size = self.pack.chunk_size
+            surface = pygame.image.frombuffer(self.pack.chunk(col, row), (size, size), "RGB")
+            if pygame.display.get_surface() is not None:
+                #Converted once to the screen format, for fast blits
+                surface = surface.convert()
+            if len(self._chunks) >= self.max_chunks:
+                self._chunks.popitem(last = False)
+        else:
+            self.hits += 1
+        self._chunks[key] = surface
+        return surface
+
+    def draw(self, canvas, center, size, dest_center):
+        """
+        Draw the view of the world centered on `center` like
+        `canvas.draw_image(image, center, size, dest_center, size)`.
+        :param canvas: simplegui.Canvas
+        :param center: [x, y] world position of the middle of the view
+        :param size: [width, height] of the view
+        :param dest_center: [x, y] canvas position of the middle of the view
+        """
+        target = getattr(canvas, '_pygame_surface', None)
+        if (target is None) or (pygame is None):
+            return
+        chunk_size = self.pack.chunk_size
+        offset_x = dest_center[0] - center[0]
+        offset_y = dest_center[1] - center[1]
+
+        #Chunks stick out of the view: they are clipped to it, and to the
+        #region being redrawn, which the ones outside are not even decoded for
+        previous = target.get_clip()
+        clip = previous.clip(pygame.Rect(int(dest_center[0] - size[0] / 2.0), int(dest_center[1] - size[1] / 2.0),
+                                         int(size[0]), int(size[1])))
+        target.set_clip(clip)
+        try:
+            for col, row in self.in_view(center, size):
+                position = (int(offset_x + col * chunk_size), int(offset_y + row * chunk_size))
+                if clip.colliderect(position + (chunk_size, chunk_size)):
+                    target.blit(self.chunk(col, row), position)
+        finally:
+            target.set_clip(previous)
+
+def main(argv = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Cut an image into a chunk pack.")
+    parser.add_argument("image", help = "image file")
+    parser.add_argument("pack", help = "pack file to write")
+    parser.add_argument("--chunk-size", type = int, default = DEFAULT_CHUNK_SIZE, help = "chunk size in pixels")
+    args = parser.parse_args(argv)
+    pack_image(args.image, args.pack, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Swept collision of a point (the character's feet) against axis-aligned boxes.
+
+The point is moved one axis at a time and stops one pixel short of the first
+box in its way, so nothing can be skipped over however large the step is.
+"""
+
+def sweep(pos, vel, boxes, bounds = None):
+    """
+    Move `pos` by `vel` and return where it ends up.
+    Boxes use the `Building.borders` layout, [upper, lower, left, right],
+    with the edges being part of the box.
+    :param pos: [x, y]
+    :param vel: [dx, dy] displacement for this tick, of any size
+    :param boxes: list of [upper, lower, left, right]
+    :param bounds: None or [upper, lower, left, right], the point stays strictly inside
+    :return: ([x, y], blocked_x, blocked_y)
+    """
+    x, y = pos
+    blocked_x = blocked_y = False
+    if vel[0]:
+        x, blocked_x = _sweep_axis(x, vel[0], y, boxes, bounds, 2, 3, 0, 1)
+    if vel[1]:
+        y, blocked_y = _sweep_axis(y, vel[1], x, boxes, bounds, 0, 1, 2, 3)
+    return [x, y], blocked_x, blocked_y
+
+def _sweep_axis(start, delta, other, boxes, bounds, low, high, other_low, other_high):
+    #Moves along one axis; `low`/`high` index the box edges on that axis
+    end = start + delta
+    blocked = False
+    if delta > 0:
+        for box in boxes:
+            if start < box[low] <= end and box[other_low] <= other <= box[other_high]:
+                end = max(start, box[low] - 1)
+                blocked = True
+        if bounds is not None and end >= bounds[high]:
+            end = max(start, bounds[high] - 1)
+            blocked = True
+    else:
+        for box in boxes:
+            if end <= box[high] < start and box[other_low] <= other <= box[other_high]:
+                end = min(start, box[high] + 1)
+                blocked = True
+        if bounds is not None and end <= bounds[low]:
+            end = min(start, bounds[low] + 1)
+            blocked = True
+    return end, blocked
@@ -0,0 +1,8 @@
+"""
+Values shared by the game, the headless simulation and the loader
+"""
+WIDTH = 480
+HEIGHT = 480
+
+#Walkable area of the overworld in screen coordinates: upper, lower, left, right
+BORDERS = [35, 407, 59, 422]
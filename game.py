@@ -1,873 +1,410 @@
+import argparse
+import json
+import os
 import random
+import time
 try:
     import simplegui
 except ImportError:
     import SimpleGUICS2Pygame.simpleguics2pygame as simplegui
+
+from constants import WIDTH, HEIGHT
+from simulation import ImageInfo, TICK
+from loader import Loader, load_image, load_sound
+from asset_cache import AssetCache
+from text_cache import TextCache
+from renderer import DirtyRenderer
+from scenes import SceneManager
+from session import GameSession, Dialog
+from items import Item
+from chunks import ChunkedWorld
+from profiler import FrameProfiler
+from scheduler import Scheduler
+from sounds import SoundManager
+from saves import Snapshot, Autosaver
+from replay import InputRecorder, Recording, Replayer, IdleTimer, compare, \
+    KEY_DOWN, KEY_UP, MOVEMENT_TIMER, DIALOG_UPDATE
    
 
-WIDTH = 480
-HEIGHT = 480
-BORDERS = [35, 407, 59, 422]
 intro_end = False
-current_volume = 1.0
-moving_left = False
-moving_right = False
-
-class ImageInfo:
-    """
-    Processes image information
-    """
-    def __init__(self, center, size, image, animated = False, lifespan = 0):
-        self.center = center
-        self.size = size
-        self.image = image
 
-    def get_center(self):
-        return self.center
-
-    def get_size(self):
-        return self.size
-                          
-    def draw(self, canvas, location):
-        canvas.draw_image(self.image, self.center, self.size, location, self.size)
-
-class Loader:
-    """
-    Slightly modified version of simplegui_lib_loader (December 12, 2013)
-    Credit to Olivier Pirson for the base structure.
-    http://www.opimedia.be/
-    
-    Help to load images and sounds from Internet
-    and wait finished.
-    With SimpleGUICS2Pygame,
-    `SimpleGUICS2Pygame.load_image()` and `SimpleGUICS2Pygame.load_sound()`
-    wait automatically until loading is completed.
-    But in CodeSkulptor, the browser load images and sounds asynchronously.
-    (With SimpleGUI it is **impossible to verify that the sounds are loaded**.
-    So `Loader` begin load sounds, and next begin load images.
-    It wait each image is loaded,
-    and considers that all downloads are completed.)
-    """
-
-    _interval = 100
-    """
-    Interval in ms betweed two check.
-    """
-
-    def __init__(self, frame, progression_bar_width,
-                 after_function, background_screen = None, max_waiting=5000):
-        """
-        Set an empty loader.
-        :param frame: simplegui.Frame
-        :param progression_bar_width: (int or float) >= 0
-        :param after_function: function () -> *
-        :param max_waiting: (int or float) >= 0
-        """
-        assert (isinstance(progression_bar_width, int)
-                or isinstance(progression_bar_width, float)), \
-            type(progression_bar_width)
-        assert progression_bar_width >= 0, progression_bar_width
-
-        # assert callable(after_function), type(after_function)
-
-        self._frame = frame
-        self._progression_bar_width = progression_bar_width
-        self._after_function = after_function
-        self._max_waiting = max_waiting
-        self.background_screen = background_screen
-        self._images = {}
-        self._sounds = {}
-
-        self.__max_waiting_remain_started = False
-
-    def _draw_loading(self, canvas):
-        """
-        Draw waiting message on the canvas
-        when images and sounds loading.
-        :param canvas: simplegui.Canvas
-        """
-        nb = self.get_nb_images() + self.get_nb_sounds()
-
-        size = 30
-        
-        canvas.draw_image(self.background_screen, [WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT], [WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT])
-        if (self._progression_bar_width > 0) and (nb > 0):
-            percent = (self.get_nb_images_loaded()
-                       + self.get_nb_sounds_loaded())*100.0/nb
-
-            y = 450
-            canvas.draw_line((0, y),
-                             (self._progression_bar_width, y), 20, 'White')
-            if percent > 0:
-                canvas.draw_line((0, y),
-                                 (self._progression_bar_width*percent/100.0,
-                                  y),
-                                 20, 'Green')
-
-        canvas.draw_text('Loading... %d%%' % int(percent),
-                         (10, 430),
-                         size, 'White')
-
-        if self.__max_waiting_remain_started:
-            nb = int(round(self.__max_waiting_remain/1000.0))
-            canvas.draw_text('Abort after %d second%s...'
-                             % (nb, ('s' if nb > 1
-                                     else '')),
-                             (10, 50 + size*2*3.0/4),
-                             size, 'White')
-                             
-
-
-    def add_image(self, url, name=None):
-        """
-        Add an image from `url`
-        and give it a name.
-        **Execute `Loader.load()` before use images.**
-        If `name` == `None`
-        then "filename" of url is used.
-        Example:
-        If `url` == `'http://commondatastorage.googleapis.com/codeskulptor-assets/lathrop/asteroid_blue.png'`
-           and `name` == `None`
-        then `'asteroid_blue.png'` is used.
-        :param url: str
-        :param name: None or str
-        :param wait: bool
-        """
-        assert isinstance(url, str), type(url)
-        assert (name is None) or isinstance(name, str), type(name)
-
-        self._images[(url.split('/')[-1] if name is None
-                      else name)] = url
-
-    def add_sound(self, url, name=None):
-        """
-        Add a sound from `url`
-        and give it a `name`.
-        **Execute `Loader.load()` before use sounds.**
-        If `name` == `None`
-        then "filename" of `url` is used.
-        Example:
-        If `url` == `'http://commondatastorage.googleapis.com/codeskulptor-assets/Epoq-Lepidoptera.ogg'`
-           and `name` == `None`
-        then `'Epoq-Lepidoptera.ogg'` is used.
-        :param url: str
-        :param name: None or str
-        :param wait: bool
-        """
-        assert isinstance(url, str), type(url)
-        assert (name is None) or isinstance(name, str), type(name)
-
-        self._sounds[(url.split('/')[-1] if name is None
-                      else name)] = url
-
-    def get_image(self, name):
-        """
-        If an image named `name` exist
-        then return it,
-        else return `None`
-        :param name: str
-        :raise: Exception if Loader.load() was not executed
-                since the addition of this image.
-        :return: None or simplegui.Image
-        """
-        assert isinstance(name, str), type(name)
-
-        image = self._images.get(name)
-
-        if isinstance(image, str):
-            raise Exception(
-                "load() not executed since the addition of the image '%s'!"
-                % name)
-
-        return image
-
-    def get_nb_images(self):
-        """
-        Return the number of images (loaded or not).
-        :return: int >= 0
-        """
-        return len(self._images)
-
-    def get_nb_images_loaded(self):
-        """
-        Return the number of loaded images.
-        It is the number of begin loading by `Loader.load()`
-        **and** fully completed.
-        :return: int >= 0
-        """
-        return len([None for name in self._images
-                    if ((not isinstance(self._images[name], str))
-                        and (self._images[name].get_width() > 0))])
-
-    def get_nb_sounds(self):
-        """
-        Return the number of sounds (loaded or not).
-        :return: int >= 0
-        """
-        return len(self._sounds)
-
-    def get_nb_sounds_loaded(self):
-        """
-        Return the number of loaded sounds.
-        It is the number of begin loading by `Loader.load()`,
-        **but not necessarily completed**.
-        Because with SimpleGUI of CodeSkulptor
-        it is **impossible to verify that the sounds are loaded**.
-        :return: int >= 0
-        """
-        return len([None for name in self._sounds
-                    if not isinstance(self._sounds[name], str)])
-
-    def get_sound(self, name):
-        """
-        If a sound named `name` exist
-        then return it,
-        else return `None`
-        :param name: str
-        :raise: Exception if load() was not executed
-                since the addition of this sound.
-        :return: None or simplegui.Sound
-        """
-        assert isinstance(name, str), type(name)
-
-        sound = self._sounds.get(name)
-
-        if isinstance(sound, str):
-            raise Exception(
-                "load() not executed since the addition of the sound '%s'!"
-                % name)
-
-        return sound
-
-    def load(self):
-        """
-        **Start loading** of all images and sounds added
-        since last `Loader.load()` execution.
-        * In standard Python with SimpleGUICS2Pygame:
-        draw a progression bar on canvas
-        and wait until the loading is finished.
-        * In SimpleGUI of CodeSkulptor: *don't* wait.
-        """
-        try:
-            from simplegui import load_image, load_sound
-
-            SIMPLEGUICS2PYGAME = False
-        except ImportError:
-            from SimpleGUICS2Pygame.simpleguics2pygame import load_image, \
-                load_sound
-
-            SIMPLEGUICS2PYGAME = True
-
-        self._SIMPLEGUICS2PYGAME = SIMPLEGUICS2PYGAME
-
-        if SIMPLEGUICS2PYGAME:
-            handler_saved = self._frame._canvas._draw_handler
-            self._frame._canvas._draw_handler = self._draw_loading
-
-        for name in self._sounds:
-            if SIMPLEGUICS2PYGAME:
-                self._frame._canvas._draw()
-            if isinstance(self._sounds[name], str):
-                self._sounds[name] = load_sound(self._sounds[name])
-
-        for name in self._images:
-            if SIMPLEGUICS2PYGAME:
-                self._frame._canvas._draw()
-            if isinstance(self._images[name], str):
-                self._images[name] = load_image(self._images[name])
-
-        if SIMPLEGUICS2PYGAME:
-            self._frame._canvas._draw()
-            self._frame._canvas._draw_handler = handler_saved
-
-    def pause_sounds(self):
-        """
-        Pause all sounds.
-        """
-        for name in self._sounds:
-            if not isinstance(self._sounds[name], str):
-                self._sounds[name].pause()
-
-    def wait_loaded(self):
-        """
-        Draw a progression bar on canvas
-        and wait until all images and sounds are fully loaded.
-        Then execute `self._after_function`.
-        After `self._max_waiting` milliseconds,
-        abort and execute `self._after_function`.
-        See details in `get_nb_sounds_loaded()` documentation.
-        """
-        if (((self.get_nb_images_loaded() == self.get_nb_images())
-             and (self.get_nb_sounds_loaded() == self.get_nb_sounds()))
-                or (self._max_waiting <= 0)):
-            self._after_function()
-            return
-
-        def check_if_loaded():
-            """
-            If all images and sounds are loaded
-            then stop waiting and execute `self._after_function`.
-            """
-            self.__max_waiting_remain -= Loader._interval
-
-            if (((self.get_nb_images_loaded() == self.get_nb_images())
-                 and (self.get_nb_sounds_loaded() == self.get_nb_sounds()))
-                    or (self.__max_waiting_remain <= 0)):
-                self.__max_waiting_remain = 0
-                self.__timer.stop()
-                self._frame.set_draw_handler(lambda canvas: None)
-
-                del self.__timer
-
-                self._after_function()
-
-        self.__max_waiting_remain_started = True
-        self.__max_waiting_remain = self._max_waiting
-
-        try:
-            from simplegui import create_timer
-        except ImportError:
-            from SimpleGUICS2Pygame.simpleguics2pygame import create_timer
-
-        self._frame.set_draw_handler(self._draw_loading)
-        self.__timer = create_timer(Loader._interval, check_if_loaded)
-        self.__timer.start()
-
-class Character:
-    """
-    Enables character movement and proper image display
+#Effects play from voice pools; the music cross-fades when a scene with its own is entered
+sounds = SoundManager()
+music_scene = None
+
+#Rendered lines of text are reused until they change
+text_cache = TextCache()
+
+def measure_dialog_text(text):
+    #Glyph offsets of a dialog line, to wrap it to the textbox
+    return text_cache.offsets(text, 14, "monospace")
+
+#Input recording (--record) and replay (--replay), see main()
+record_path = None
+recorder = None
+replaying = False
+replayer = None
+replay_start = 0
+
+#Saved game resumed and autosaved to with --save, see main()
+save_path = None
+resume = None
+autosaver = None
+AUTOSAVE_INTERVAL = 30000
+
+#Per-phase frame timings, shown with the P key and written on exit with --profile
+profiler = FrameProfiler()
+profile_path = None
+overlay_shown = False
+overlay_lines = []
+overlay_refreshed = 0
+OVERLAY_REFRESH = 0.5
+
+def recorded(source):
     """
-    def __init__(self, tiled_image, image_info, name, inventory = []):
-        self.tiled_image = tiled_image
-        self.image_info = image_info
-        self.row_number = 0
-        self.image_center = image_info.get_center()
-        self.image_size = image_info.get_size()
-        self.pos = [WIDTH / 2, HEIGHT / 2]
-        self.vel = [0, 0]
-        self.col = 0
-        self.name = name
-        self.inventory = inventory
-    def walk_down(self):
-            self.row_number = 0
-            self.vel[1] = 1
-    def walk_left(self):
-        self.row_number = 1
-        self.vel[0] = -1
-    def walk_right(self):
-        self.row_number = 2
-        self.vel[0] = 1
-        
-    def walk_up(self):
-        self.row_number = 3
-        self.vel[1] = -1
-            
-    def draw(self, canvas):
-        #Ensures the proper subset of the tiled image is shown based on character direction
-        canvas.draw_image(self.tiled_image, [self.image_center[0] + self.image_size[0] * self.col,
-                                             self.image_center[1] + self.image_size[1] * self.row_number],
-                          self.image_size,
-                          self.pos, [self.image_size[0] / 1.5, self.image_size[1] / 1.5])
-
-    def update(self):
-        #Keeps track of map borders and updates character position
-        """
-        The map borders are hardcoded seperately from the 'Building' class because
-        inversing the top and the bottom borders in the class to make up for the lack
-        of box shape prevents the 'if' statements from finding longitudes at which the 
-        character / moving object is BETWEEN. No choice but to hardcode.
-        """
-        global borders
-        if self.pos[1] == BORDERS[0] or self.pos[1] == BORDERS[1]:
-            self.vel[1] = 0
-            if self.pos[1] == BORDERS[0]:
-                self.pos[1] += 1
-            elif self.pos[1] == BORDERS[1]:
-                self.pos[1] -= 1
-        if self.pos[0] == BORDERS[2] or self.pos[0] == BORDERS[3]:
-            self.vel[1] = 0
-            if self.pos[0] == BORDERS[2]:
-                self.pos[0] += 1
-            elif self.pos[0] == BORDERS[3]:
-                self.pos[0] -= 1
-                
-        self.pos[0] += self.vel[0]
-        self.pos[1] += self.vel[1]
-
-class Building:
-    """
-    Prevents the character from walking on top of buildings, trees, etc.
-    """
-    def __init__(self, borders, map_end = False, door = None, interactive = None, map_change_info = []):
-        global character
-        self.borders = borders #upper = self.borders[0], lower = self.borders[1], left = self.borders[2], right = self.borders[3]
-        self.moving_object = character
-        self.interactive = interactive
-        self.map_end = map_end
-        self.door = door
-        self.map_change_info = map_change_info #map_change_info[0] = map ; map_change_info[1] = map_info ; map_change_info[2] = map_string
-        
-    def border_control(self):
-        global latitude
-        if not self.map_end:
-            if (latitude == self.borders[2]) and (self.moving_object.pos[1] >= self.borders[0] and self.moving_object.pos[1] <= self.borders[1]):
-                self.moving_object.vel[0] = 0
-                latitude -= 1
-                
-            if (latitude == self.borders[3]) and (self.moving_object.pos[1] >= self.borders[0] and self.moving_object.pos[1] <= self.borders[1]):
-                self.moving_object.vel[0] = 0
-                latitude += 1
-                
-            if (self.moving_object.pos[1] == self.borders[0]) and (latitude >= self.borders[2]) and (latitude <= self.borders[3]):  
-                self.moving_object.vel[1] = 0
-                self.moving_object.pos[1] -= 1   
-            
-            if (self.moving_object.pos[1] == self.borders[1]) and (latitude >= self.borders[2]) and (latitude <= self.borders[3]):  
-                self.moving_object.vel[1] = 0
-                self.moving_object.pos[1] += 1             
-           
-        else:
-            if self.moving_object.pos[0] == self.borders[2] and (self.moving_object.pos[1] >= self.borders[0] and self.moving_object.pos[1] <= self.borders[1]):
-                self.moving_object.vel[0] = 0
-                self.moving_object.pos[0] -= 1
-                
-            if (self.moving_object.pos[0] == self.borders[3]) and (self.moving_object.pos[1] >= self.borders[0] and self.moving_object.pos[1] <= self.borders[1]):
-                self.moving_object.vel[0] = 0
-                self.moving_object.pos[0] += 1
-                
-            if (self.moving_object.pos[1] == self.borders[0]) and (self.moving_object.pos[0] >= self.borders[2]) and (self.moving_object.pos[0] <= self.borders[3]):  
-                self.moving_object.vel[1] = 0
-                self.moving_object.pos[1] -= 1
-
-            if (self.moving_object.pos[1] == self.borders[1]) and (self.moving_object.pos[0] >= self.borders[2]) and (self.moving_object.pos[0] <= self.borders[3]):  
-                self.moving_object.vel[1] = 0
-                self.moving_object.pos[1] += 1
-                
-    def doors(self):
-        #Sets the doors of buildings to change maps or to initiate a dialogue sequence
-        global latitude, background_image, background_info, current_background, current_dialog, dialog, dialog_place, l1_textscroller, l2_textscroller
-        
-        #If the center of the map walking into a door/event sequence
-        if not self.map_end and self.door != None:			
-            if (self.moving_object.pos[1] == (self.borders[1] + 1) or self.moving_object.pos[1] == (self.borders[1] - 1)) and (latitude >= self.door[0]) and (latitude <= self.door[1]):  
-				
-				#If not a person, change the map; otherwise initiate a dialog sequence
-				if self.interactive == None:
-					map_change(self.map_change_info[0], self.map_change_info[2], self.map_change_info[1], self.moving_object)
-				else:
-					current_dialog = Dialog(self.interactive)
-		
-		#If at the edge of the map walking into a door/event sequence			
-        elif self.door != None:
-            if (self.moving_object.pos[1] == (self.borders[1] + 1) or self.moving_object.pos[1] == (self.borders[1] - 1)) and (self.moving_object.pos[0] >= self.door[0]) and (self.moving_object.pos[0] <= self.door[1]):  
-                
-                #If not a person, change the map; otherwise initiate a dialog sequence
-                if self.interactive == None:
-                    map_change(self.map_change_info[0], self.map_change_info[2], self.map_change_info[1], self.moving_object)
-                else:
-					current_dialog = Dialog(self.interactive)
-				
-class Dialog:
-    """
-	Implements the usage of messages and dialogue throughout the game.
+    Decorator recording each call of a handler while a recording is running.
+    :param source: int event source of replay
     """
-    def __init__(self, dialog_list):
-		global dialog_place, l1_textscroller, l2_textscroller, dialog
-		self.dialog = dialog_list
-		dialog = True
-		for i in range(len(self.dialog)):
-			if type(self.dialog[i]) is str:
-				self.dialog[i] = self.dialog[i].upper()
- 
-    def dialog_handler(self, canvas):
-		global dialog_place, l1_textscroller, l2_textscroller, name_choose, textbox_info, text_timer
-		if dialog_place < len(self.dialog):
-			textbox_info.draw(canvas, [WIDTH / 2, 400])
-			text_timer.start()
-			if type(self.dialog[dialog_place]) is str:
-				canvas.draw_text(self.dialog[dialog_place][0:l1_textscroller], [30, 390], 14, "Black", "monospace")
-			else:
-				self.dialog[dialog_place]()
-		else:
-			text_timer.stop()
-		if dialog_place + 1 < len(self.dialog): 
-			if type(self.dialog[dialog_place]) is str:
-				canvas.draw_text(self.dialog[dialog_place + 1][0:l2_textscroller], [30, 415], 14, "Black", "monospace")
-			else:
-				self.dialog[dialog_place]()
-
-class Item:
-	def __init__(self, name, effect, price, base_level):
-		self.name = name
-		self.price = price
-		self.effect = effect
-		self.base_level = base_level
-	def __str__(self):
-		return self.name
-	def use(self, pokemon):
-		pass
-		#pokemon.effect[0] += effect[1]	
-def border_control(building_set):
-    #Calls border controls in the Building Limits Class
-    for item in building_set:
-        item.border_control()
-        item.doors()
-
-def map_change(map, map_string, map_info, moving_object):
-    #Changes the background map
-    global outside_location, latitude, background_image, background_info, current_background, BORDERS
-    current_background = map_string
-    background_image = map
-    background_info = map_info
-    if map_string == "map":
-        latitude = background_info.center[0] + background_info.size[0]
-        if outside_location[1] == 240:
-            latitude = outside_location[0]
-            moving_object.pos[1] = outside_location[2]
-        else:
-            moving_object.pos[0] = outside_location[1]
-            moving_object.pos[1] = outside_location[2]
-        BORDERS = [35, 407, 59, 422]
+    def decorator(handler):
+        def call(*args):
+            if recorder is not None:
+                recorder.record(source, args[0] if args else 0)
+            return handler(*args)
+        return call
+    return decorator
+
+#Every timer of the game runs from the draw handler
+scheduler = Scheduler()
+
+def create_timer(interval, handler):
+    #During a replay the recorded timer events call the handlers instead
+    if replaying:
+        return IdleTimer()
+    return scheduler.every(interval, handler)
+
+def load_scene_image(url):
+    #Only scene_manager keeps scene images, so evicting a scene frees its image
+    return load_image(url, asset_cache)
+
+def load_scene_music(url):
+    #Like load_scene_image, for the "music" of a scene
+    return load_sound(url, asset_cache)
+
+def update_music(scene):
+    #Cross-fades to the music of `scene` when it has some, once per scene change
+    global music_scene
+    if scene != music_scene:
+        music_scene = scene
+        loaded = scene_manager.get(scene)
+        if (loaded is not None) and (loaded.music is not None):
+            sounds.play_music(loaded.music)
+
+#Only the parts of the screen that changed are redrawn during the game
+renderer = DirtyRenderer(WIDTH, HEIGHT)
+SCREEN_RECT = (0, 0, WIDTH, HEIGHT)
+
+#Seconds the camera takes to catch up about two thirds of the way with the character
+CAMERA_SMOOTHING = 0.08
+TEXTBOX_RECT = (10, 358, 460, 84)
+PANEL_RECT = (296, 16, 168, 448)
+
+def add_dialog_assets(loader):
+    #The textbox and the A button, used by the introduction and by the game's dialogs
+    loader.add_image("http://i.imgur.com/mCAOj2C.jpg", "textbox_image")
+    loader.add_sound("https://www.dropbox.com/s/i2rvb057eb0c3ed/A-Button.ogg?dl=1", "A-button")
+
+def dialog_assets_init(loader):
+    #Sets up the assets of add_dialog_assets() once `loader` has loaded them
+    global textbox_info
+    textbox_info = ImageInfo([460 / 2, 83 / 2], [460, 83], loader.get_image("textbox_image"))
+    sounds.add_effect("A-button", loader.get_sound("A-button"), "ui")
+
+def draw_dialog(canvas, current):
+    #Draws the two lines of a Dialog being shown; only draws, so it can be called any number of times per frame
+    dialog_place = current.dialog_place
+    if dialog_place < len(current.dialog):
+        textbox_info.draw(canvas, [WIDTH / 2, 400])
+        if type(current.dialog[dialog_place]) is str:
+            text_cache.draw_prefix(canvas, current.dialog[dialog_place], current.l1_textscroller, [30, 390], 14, "Black", "monospace")
+    if dialog_place + 1 < len(current.dialog):
+        if type(current.dialog[dialog_place + 1]) is str:
+            text_cache.draw_prefix(canvas, current.dialog[dialog_place + 1], current.l2_textscroller, [30, 415], 14, "Black", "monospace")
+
+def draw_background(canvas, image, center, size, dest_center):
+    #Draws the part of a scene's image centered on `center`; chunked worlds only decode the chunks in view
+    if isinstance(image, ChunkedWorld):
+        image.draw(canvas, center, size, dest_center)
     else:
-		BORDERS[0] = (HEIGHT / 2) - background_info.get_center()[1] + 80
-		BORDERS[1] = background_info.get_center()[1] + (HEIGHT / 2)
-		BORDERS[2] = (WIDTH / 2) - background_info.get_center()[0] + 3
-		BORDERS[3] = (WIDTH / 2) + background_info.get_center()[0] - 3
-		outside_location = [latitude, moving_object.pos[0], moving_object.pos[1]]
-		moving_object.pos = [WIDTH / 2, background_info.center[1] + (HEIGHT / 2) - 20]
-                     
+        canvas.draw_image(image, center, size, dest_center, size)
+
+def draw_panel(canvas, title, view, length, row_text, value_x):
+    #Draws a list panel; only the visible rows are laid out, so long lists cost the same
+    canvas.draw_polygon([(300, 20), (460, 20), (460, 460), (300, 460)], 6, "Black", "White")
+    text_cache.draw(canvas, title, (310, 45), 20, "Black", 'monospace')
+    rows = view.visible(length)
+    for row, i in enumerate(rows):
+        label, value = row_text(i)
+        text_cache.draw(canvas, label, (310, 70 + 20 * row), 14, "Black", 'monospace')
+        text_cache.draw(canvas, value, (value_x, 70 + 20 * row), 14, "Black", 'monospace')
+    return rows
+
+def draw_inventory(canvas, inventory, view):
+    names = inventory.names
+    draw_panel(canvas, "INVENTORY:", view, len(names),
+               lambda i: (names[i], str(inventory.counts[names[i]])), 430)
+
+def draw_mart(canvas, items, view):
+    rows = draw_panel(canvas, "Mart:", view, len(items),
+                      lambda i: (str(items[i]), str(items[i].price)), 415)
+    if rows:
+        y = 55 + (view.cursor - rows[0]) * 20
+        canvas.draw_polygon([(310, y), (450, y), (450, y + 20), (310, y + 20)], 4, "Black")
+
+@recorded(KEY_DOWN)
 def game_key_down(key):
-    #Key down handler; primarily controls movement.
-    global latitude, moving_left, moving_right, dialog, dialog_place, l1_textscroller, l2_textscroller, inventory_shown, buying, mart_scroll_position, master_items
-    if dialog and key != simplegui.KEY_MAP['space']:
-		dialog = False
-    if key == simplegui.KEY_MAP['space'] and dialog:
-        dialog_place += 2
-        l1_textscroller = 1
-        l2_textscroller = 0
-    if not dialog:
-		dialog_place = 0
-		l1_textscroller = 1
-		l2_textscroller = 0   
-    if buying:
-		if key == simplegui.KEY_MAP['x']:
-			buying = False
-		if key == simplegui.KEY_MAP['up']: #and mart_scroll_position > 0:
-			mart_scroll_position -= 1
-		if key == simplegui.KEY_MAP['down']: # and mart_scroll_position < len(master_items) -1:
-			mart_scroll_position += 1 
-    else:
-		if key == simplegui.KEY_MAP['i']:
-			inventory_shown = True
-		if key == simplegui.KEY_MAP['left']:
-			moving_left = True
-			timer.start()
-		elif key == simplegui.KEY_MAP['right']:
-			moving_right = True
-			timer.start()
-		elif key == simplegui.KEY_MAP['up']:
-			character.walk_up()
-			timer.start()
-		elif key == simplegui.KEY_MAP['down']:
-			character.walk_down()  
-			timer.start() 
-
+    #Key down handler; the P key is for the window, every other key goes to the session
+    global overlay_shown
+    if key == simplegui.KEY_MAP['p']:
+        #Shows the profiler overlay, profiling while it is shown (or always with --profile)
+        overlay_shown = not overlay_shown
+        profiler.enabled = overlay_shown or (profile_path is not None)
+        return
+    session.key_down(key)
+
+@recorded(KEY_UP)
 def game_key_up(key):
-    #Stops walking animation and stops movement.
-    global moving_left, moving_right, inventory_shown
-    if key == simplegui.KEY_MAP['i']:
-		inventory_shown = False
-    if key == simplegui.KEY_MAP['left']:
-        moving_left = False
-        timer.stop()
-        character.vel[0] = 0
-    if key == simplegui.KEY_MAP['right']:
-        moving_right = False
-        timer.stop()
-        character.vel[0] = 0
-    if key == simplegui.KEY_MAP['up'] or key == simplegui.KEY_MAP['down']:
-        character.vel[1] = 0
-        timer.stop()
-        
+    session.key_up(key)
+
+@recorded(MOVEMENT_TIMER)
+@profiler.timed("movement_timer")
 def movement_timer():
-    #Controls walking animation
-    character.col += 1
-    if character.col == 4:
-        character.col = 0
-        
+    session.animate_walk()
+
 def within(inp, number, num_range):
-	return inp > number - num_range and inp < number + num_range
+    return inp > number - num_range and inp < number + num_range
 
 def choose_name():
-	global name_choose
-	name_choose = True
-	
-def mart_buying():
-	global buying, mart_line_counter, mart_scroll_position
-	mart_line_counter = 0
-	mart_scroll_position = 0
-	buying = True
-	
+    global name_choose
+    name_choose = True
+
 def change_volume(new_vol):
     #Input handler for the volume changer
-    global current_sound, current_volume
-    current_volume = float(new_vol) / 10
-    current_sound.set_volume(current_volume)
+    sounds.set_master_volume(float(new_vol) / 10)
+
+@recorded(DIALOG_UPDATE)
+def update_dialog():
+    session.update_dialog()
 
 def game_draw(canvas):
-    #Decides between map scrolling and character movement based on character position.
-    #Also controls display of text and images
-    global latitude, moving_left, moving_right, current_background, dialog, current_dialog, text_timer, dialog_place, inventory_shown, buying, master_items
-    global mart_scroll_position, mart_line_counter
-    #Displays the current map and coordinates
-    if current_background == "map":    
-        canvas.draw_image(background_image, [latitude, background_info.center[1]], 
-                          background_info.get_size(), background_info.get_center(), background_info.get_size())
+    #Advances the session by the time since the last frame, then draws what changed.
+    #Drawing only reads from the session; all movement happens in session.step()
+    global last_frame_time, overlay_lines, overlay_refreshed
+    simulation = session.simulation
+    character = session.character
+    profiler.begin_frame()
+    now = time.time()
+    started = profiler.start()
+    scheduler.run_due(now)
+    profiler.stop("timers", started)
+    started = profiler.start()
+    if replayer is not None:
+        #A replay feeds the recorded events, dialog updates included, as the ticks go by
+        replayer.advance_to(int((now - replay_start) / TICK))
+        if replayer.done() and simulation.ticks >= replayer.recording.end_tick:
+            frame.stop()
     else:
-        background_info.draw(canvas, [WIDTH / 2, HEIGHT / 2])
-    
-    canvas.draw_text("Pos: (" + str(character.pos[0]) + ", " + str(character.pos[1]) + ") , Latitude: " + str(latitude), [125, 460], 28, "White")
-    
-    #Draws and updates the location and orientation of the character
+        simulation.step(now - last_frame_time)
+        if session.dialog is not None:
+            update_dialog()
+    last_frame_time = now
+    update_music(simulation.current_background)
+    sounds.update(now)
+    profiler.stop("simulation", started)
+
+    #The overlay numbers change every frame; refreshing them slowly keeps them readable
+    if overlay_shown and (now - overlay_refreshed >= OVERLAY_REFRESH):
+        overlay_refreshed = now
+        camera = simulation.camera.position
+        overlay_lines = (["Pos: (" + str(character.pos[0]) + ", " + str(character.pos[1]) + ") , Camera: (" + str(camera[0]) + ", " + str(camera[1]) + ")"]
+                         + profiler.overlay_lines())
+
+    #Declares what is on screen; the renderer redraws whatever changed since the last frame
+    display_size = character.sprites.display_size
+    renderer.track("view", SCREEN_RECT, (simulation.current_background, tuple(simulation.camera.position)))
+    renderer.track("character", [character.pos[0] - display_size[0] / 2, character.pos[1] - display_size[1] / 2] + display_size,
+                   (character.col, character.row_number))
+    if overlay_shown:
+        renderer.track("overlay", [0, 0, WIDTH, 8 + 14 * len(overlay_lines)], tuple(overlay_lines))
+    current = session.dialog
+    if current is not None:
+        renderer.track("dialog", TEXTBOX_RECT, (id(current), current.dialog_place, current.l1_textscroller, current.l2_textscroller))
+    if session.inventory_shown:
+        renderer.track("panel", PANEL_RECT, ("inventory", character.inventory.version, session.inventory_view.top))
+    if session.buying:
+        renderer.track("panel", PANEL_RECT, ("mart", session.mart_view.top, session.mart_view.cursor))
+    started = profiler.start()
+    renderer.render(canvas, draw_scene)
+    profiler.stop("render", started)
+    profiler.end_frame()
+
+def draw_scene(canvas):
+    #Draws the whole scene; the renderer clips it to the regions that changed
+    #Displays the current map
+    simulation = session.simulation
+    character = session.character
+    started = profiler.start()
+    background_info = simulation.background_info
+    if simulation.current_background == "map":
+        draw_background(canvas, simulation.background_image, simulation.camera.position,
+                        background_info.get_size(), background_info.get_center())
+    else:
+        draw_background(canvas, simulation.background_image, background_info.get_center(),
+                        background_info.get_size(), [WIDTH / 2, HEIGHT / 2])
+    profiler.stop("background", started)
+
+    #Draws the location and orientation of the character
+    started = profiler.start()
     character.draw(canvas)
-    character.update()
-    
-    if dialog:
-        current_dialog.dialog_handler(canvas)
-        text_timer.start()
-    
-    #Controls whether the character moves itself or the map scrolls
-    if moving_left and (latitude > background_info.center[0]) and (character.pos[0] == WIDTH / 2 or character.pos[0] == WIDTH / 2 - 1) and (current_background == "map"):
-        latitude -= 1
-        character.vel[0] = 0
-        character.row_number = 1
-    
-    elif moving_right and (latitude < (background_info.center[0] + background_info.size[0])) and (character.pos[0] == WIDTH / 2 or character.pos[0] == WIDTH / 2 - 1) and (current_background == "map"):
-        latitude += 1
-        character.row_number = 2
-        character.vel[0] = 0
-    
-    elif moving_left:
-        character.walk_left()
-    
-    elif moving_right:
-        character.walk_right()
-    
+    profiler.stop("character", started)
+
+    if session.dialog is not None:
+        started = profiler.start()
+        draw_dialog(canvas, session.dialog)
+        profiler.stop("dialog", started)
+
     #Controls the appearance of the inventory
-    if inventory_shown:
-		canvas.draw_polygon([(300, 20), (460, 20), (460, 460), (300, 460)], 6, "Black", "White")
-		canvas.draw_text("INVENTORY:", (310, 45), 20, "Black", 'monospace')
-		for i in range(len(character.inventory)):
-			canvas.draw_text(character.inventory[i][0], (310, 70 + 20 * i), 14, "Black", 'monospace')
-			canvas.draw_text(str(character.inventory[i][1]), (430, 70 + 20 * i), 14, "Black", 'monospace')
-	
-    if buying:
-		canvas.draw_polygon([(300, 20), (460, 20), (460, 460), (300, 460)], 6, "Black", "White")
-		canvas.draw_text("Mart:", (310, 45), 20, "Black", 'monospace')
-		for item in master_items:
-			canvas.draw_text(str(item), (310, 70 + 20 * mart_line_counter), 14, "Black", 'monospace')
-			canvas.draw_text(str(item.price), (415, 70 + 20 * mart_line_counter), 14, "Black", 'monospace')
-			mart_line_counter += 1
-		canvas.draw_polygon([(310, 55 + mart_scroll_position * 20), (450, 55 + mart_scroll_position * 20), (450, 75 + mart_scroll_position * 20), (310, 75 + mart_scroll_position * 20)], 4, "Black")
-    #Controls the borders of objects on screen
-    if current_background == "map":    
-        border_control(map_building_set)
-    elif current_background == "center":
-        border_control(center_building_set)
-    elif current_background == "mart":
-        border_control(mart_building_set)
-    elif current_background == "gym":
-		border_control(gym_building_set)
-    elif current_background == "house":
-        border_control(house_building_set)
+    started = profiler.start()
+    if session.inventory_shown:
+        draw_inventory(canvas, character.inventory, session.inventory_view)
+
+    if session.buying:
+        draw_mart(canvas, session.items, session.mart_view)
+    profiler.stop("panels", started)
+
+    #Position and timings, shown with the P key
+    if overlay_shown:
+        started = profiler.start()
+        height = 8 + 14 * len(overlay_lines)
+        canvas.draw_polygon([(0, 0), (WIDTH, 0), (WIDTH, height), (0, height)], 1, "Black", "Black")
+        for i in range(len(overlay_lines)):
+            text_cache.draw(canvas, overlay_lines[i], [6, 16 + 14 * i], 12, "White", 'monospace')
+        profiler.stop("overlay", started)
 
 def game_init():
-	"""
+    """
     Initializes the game itself after character creation
     """
-    #initialize globals 
-	global character, map_info, character_info, pkcmap_info, pokemart_info, current_volume, inventory_shown
-	global map_building_set, center_building_set, dialog, gym_building_set, house_building_set, buying
-	global mart_building_set, current_background, background_image, BORDERS, name, master_items
-	global background_info, current_sound, latitude, outside_location, timer, name, gymmap_info
-	
-	#initializes the master list of items
-	potion = Item("Potion", ("health", 20), 300, 0)
-	super_potion = Item("Super Potion", ("health", 50), 700, 12)
-	pokeball = Item("Pokeball", ("capture", 1), 200, 0)
-	great_ball = Item("Great Ball", ("capture", 2), 600, 12)
-	hyper_potion = Item("Hyper Potion", ("health", 70), 1200, 23)
-	revive = Item("Revive", ("revive", .5), 1500, 25)
-	max_revive = Item("Max Revive", ("revive", 1), 2000, 30)
-	master_items = [potion, super_potion, hyper_potion, revive, max_revive, pokeball, great_ball]
-						
+    #initialize globals
+    global session, master_items, last_frame_time, recorder, autosaver
+
+    #initializes the master list of items
+    potion = Item("Potion", ("health", 20), 300, 0)
+    super_potion = Item("Super Potion", ("health", 50), 700, 12)
+    pokeball = Item("Pokeball", ("capture", 1), 200, 0)
+    great_ball = Item("Great Ball", ("capture", 2), 600, 12)
+    hyper_potion = Item("Hyper Potion", ("health", 70), 1200, 23)
+    revive = Item("Revive", ("revive", .5), 1500, 25)
+    max_revive = Item("Max Revive", ("revive", 1), 2000, 30)
+    master_items = [potion, super_potion, hyper_potion, revive, max_revive, pokeball, great_ball]
+
     #initializes the ImageInfo classes of the images
-	map_info = ImageInfo([240, 240], [480, 480], game_loader.get_image("map_image"))
-	character_info = ImageInfo([32, 32], [64, 64], game_loader.get_image("character_image"))	
-	pkcmap_info = ImageInfo([325 / 2, 295 / 2], [325, 295], game_loader.get_image("pokecenter_map"))
-	pokemart_info = ImageInfo([352 / 2, 264 / 2], [352, 264], game_loader.get_image("pokemart_map"))
-	gymmap_info = ImageInfo([289 / 2, 256 / 2], [289, 256], game_loader.get_image("gym map"))
-	house_info = ImageInfo([354 / 2, 270 / 2], [354, 270], game_loader.get_image("house"))
-	
-	#Creates the character
-	character = Character(game_loader.get_image("character_image"), character_info, name)
-
-	#Buildings on the main map
-	four_trees = Building([BORDERS[0], 138, 375, 490])
-	pokecenter = Building([69, 172, 541, 658], False, [585, 593], None, [game_loader.get_image("pokecenter_map"), pkcmap_info, "center"])
-	house = Building([236, 348, 541, 661], False, [616, 625], None , [game_loader.get_image("house"), house_info, "house"])
-	gym = Building([247, 357, 265, 410], True, [342, 353], None, [game_loader.get_image("gym map"), gymmap_info, "gym"])
-	pokemart = Building([81, 178, 277, 397], True, [321, 331], None, [game_loader.get_image("pokemart_map"), pokemart_info, "mart"])
-	sign = Building([196, 236, 108, 157], True, [108, 157], ["Beware of the tall grass,", "it may be hiding wild pokemon!"])
-	map_building_set = set([four_trees, pokecenter, house, gym, pokemart, sign])
-
-	#Pokecenter Buildings
-	center_counter = Building([BORDERS[0], 214, 103, 345], True, [215, 232], ["Welcome to the Pokemon Center!", "Come back when you have pokemon,", "and I can help them!"])
-	center_exit = Building([370, 370, 203, 243], True, [203, 243], None, [game_loader.get_image("map_image"), map_info, "map"])
-	center_pc = Building([BORDERS[0], 174, 346, 361], True, [346, 361], ["Welcome to the Pokemon Center PC.", "Please come back when you have pokemon.", "Then I can store them!"])
-	center_building_set = set([center_counter, center_exit, center_pc])
-
-	#Pokemart Buildings
-	mart_table = Building([274, 323, 87, 169], True)
-	mart_counter = Building([BORDERS[0], 258, BORDERS[2], 203], True, [137, 151], ["What would you like to buy?", mart_buying])
-	mart_exit = Building([353, 353, 221, 259], True, [221, 259], None, [game_loader.get_image("map_image"), map_info, "map"])
-	mart_shelves = Building([204, 321, 376, BORDERS[3]], True)
-	mart_building_set = set([mart_table, mart_counter, mart_exit, mart_shelves])	
-	
-	#Gym buildings
-	gym_exit = Building([350, 350, 200, 278], True, [200, 259], None, [game_loader.get_image("map_image"), map_info, "map"])
-	gym_stair1 = Building([BORDERS[0], 230, 150, 200], True)
-	gym_stair2 = Building([BORDERS[0], 230, 280, 328], True)
-	norman = Building([193, 196, 234, 246], True, [234, 246], ["Hello " + name + ".", "Come back when you're stronger.", "Then you can battle me!"])
-	gym_building_set = [gym_exit, gym_stair1, gym_stair2, norman]	
-	
-	#House buildings
-	house_exit = Building([356, 356, 221, 264], True, [221, 264], None, [game_loader.get_image("map_image"), map_info, "map"])
-	ruby = Building([219, 276, 213, 266], True, [213, 266], ["Hi " + name + "! I'm Ruby!"])
-	house_table = Building([222, 301, 300, 378], True)
-	house_chairs = Building([220, 300, 383, 411], True)
-	house_building_set = [house_exit, ruby, house_table, house_chairs]
-		
-	#Creates the timer
-	timer = simplegui.create_timer(150, movement_timer)
-	
-	#initializes the background image/music
-	current_background = "map"
-	background_image = game_loader.get_image("map_image")
-	background_info = map_info
-	current_sound.pause()
-	current_sound = game_loader.get_sound("littleroot_theme")
-	current_sound.play()
-	current_sound.set_volume(current_volume)
-	
-	#Tracks the placement of the background image for map scrolling
-	latitude = background_info.center[0] + background_info.size[0]
-
-	#tracks location of the character while inside a building
-	outside_location = [latitude, WIDTH / 2, HEIGHT / 2]
-
-	#Asserts that a dialog box, inventory screen, buying screen, etc. will be shown at initialization
-	dialog = False
-	inventory_shown = False
-	buying = False
-	
-	#Sets the handlers
-	frame.set_draw_handler(game_draw)
-	frame.set_keydown_handler(game_key_down)
-	frame.set_keyup_handler(game_key_up)
-          
+    character_info = ImageInfo([32, 32], [64, 64], game_loader.get_image("character_image"))
+
+    #The session owns the character, its world and the menus; buildings, doors and dialogs are in scenes/*.json
+    session = GameSession(name, scene_manager, master_items, game_loader.get_image("character_image"), character_info,
+                          simplegui.KEY_MAP, create_timer(150, movement_timer), measure_dialog_text)
+    session.simulation.profiler = profiler
+    session.simulation.camera.smoothing = CAMERA_SMOOTHING
+    if resume is not None:
+        #Resuming skips the introduction, which sets up the dialog assets
+        dialog_assets_init(game_loader)
+        resume.apply(session)
+
+    #Fades the intro music out for the music of the first scene
+    update_music(session.simulation.current_background)
+
+    last_frame_time = time.time()
+    if record_path is not None:
+        recorder = InputRecorder(record_path, name, lambda: session.simulation.ticks)
+    if save_path is not None:
+        autosaver = Autosaver(save_path)
+        create_timer(AUTOSAVE_INTERVAL, autosave).start()
+
+    #Sets the handlers
+    frame.set_draw_handler(game_draw)
+    frame.set_keydown_handler(game_key_down)
+    frame.set_keyup_handler(game_key_up)
+
+def autosave():
+    #Only the copy of the state happens here, the file is written by the autosaver's thread
+    autosaver.save(Snapshot.capture(session))
+
 def name_inp_handler(input):
   #Controls name input during character creation
-	global name, dialog_place, l1_textscroller, l2_textscroller, name_choose
-	name = input
-	dialog_place += 2
-	l1_textscroller = 0
-	l2_textscroller = 0
-	name_choose = False
-
-def text_timer():
-    #every tick add another letter to animate the textboxes
-    global l1_textscroller, dialog_place, l2_textscroller
-    if dialog_place < len(current_dialog.dialog):
-		if type(current_dialog.dialog[dialog_place]) is str:
-			if l1_textscroller <= len(current_dialog.dialog[dialog_place]):
-				l1_textscroller += 1
-            
-    if dialog_place + 1 < len(current_dialog.dialog) and l1_textscroller >= len(current_dialog.dialog[dialog_place]):
-        if type(current_dialog.dialog[dialog_place + 1]) == str:
-            if l2_textscroller <= len(current_dialog.dialog[dialog_place + 1]):
-                l2_textscroller += 1
-
-def intro_keydown(key):	
+    global name, name_choose
+    name = input
+    current_dialog.next_lines()
+    name_choose = False
+
+def add_game_assets():
+    #Scenes belong to scene_manager: the map starts loading now, interiors when first entered
+    scene_manager.prefetch("map")
+    game_loader.add_image("http://i.imgur.com/X7rwD5S.png", "character_image")
+
+def intro_keydown(key):
     #Keydown Handler
-    global dialog_place, l1_textscroller, l2_textscroller, name_choose, name, intro_dialog, intro_end, current_volume
+    global name_choose, name, intro_end
     if name_choose:
         if key == simplegui.KEY_MAP['down']:
-            intro_dialog.append("NICE TO MEET YOU " + name + "!")
-            intro_dialog.append("GET READY TO ENTER THE WORLD OF POKEMON!")
-            dialog_place += 1
-            l1_textscroller = 0
-            l2_textscroller = 0
+            place = len(current_dialog.dialog)
+            current_dialog.extend(["NICE TO MEET YOU " + name + "!",
+                                   "GET READY TO ENTER THE WORLD OF POKEMON!"])
+            current_dialog.go_to(place)
             name_choose = False
             intro_end = True
         else:
-			name += chr(key).upper()
+            name += chr(key).upper()
     if key == simplegui.KEY_MAP['space']:
-		Abutton = intro_loader.get_sound("A-button")
-		Abutton.set_volume(current_volume)
-		Abutton.play()
-		if intro_end:
-		  #Stops the intro and loads the main game
-			game_loader.add_image("http://i.imgur.com/AOGtJXY.jpg", "map_image")
-			game_loader.add_image("http://i.imgur.com/X7rwD5S.png", "character_image")
-			game_loader.add_image("http://i.imgur.com/S55Faqx.jpg", "pokecenter_map")
-			game_loader.add_image("http://i.imgur.com/CAlO95H.png", "pokemart_map")
-			game_loader.add_image("http://i.imgur.com/TmLgJHG.png", "gym map")
-			game_loader.add_image("http://i.imgur.com/uo8KFqZ.png", "house")
-			game_loader.add_sound("https://www.dropbox.com/s/jus36w1y0sfjukr/Littleroot.ogg?dl=1", "littleroot_theme")
-			text_timer.stop()
-			game_loader.load()
-			game_loader.wait_loaded()
+        sounds.play("A-button")
+        if intro_end:
+            #Stops the intro and loads the main game
+            add_game_assets()
+            game_loader.load()
+            game_loader.wait_loaded()
         
-		else:
+        else:
 
-			if dialog_place + 1 < len(current_dialog.dialog):
-				if l1_textscroller < len(current_dialog.dialog[dialog_place]) or l2_textscroller <= len(current_dialog.dialog[dialog_place + 1]):
-					l1_textscroller = len(current_dialog.dialog[dialog_place]) - 1
-					l2_textscroller = len(current_dialog.dialog[dialog_place + 1]) - 1
-				else:
-					dialog_place += 2
-					l1_textscroller = 0
-					l2_textscroller = 0
+            if current_dialog.dialog_place + 1 < len(current_dialog.dialog):
+                if not current_dialog.is_revealed():
+                    current_dialog.reveal()
+                else:
+                    current_dialog.next_lines()
 
 def intro_draw(canvas):
     #Draw handler during the intro
     global background_info, introimg_info, textbox_info, explosion_info
+    scheduler.run_due()
+    sounds.update()
     background_info.draw(canvas, [WIDTH / 2, HEIGHT / 2])
-    current_dialog.dialog_handler(canvas)
+    current_dialog.update()
+    draw_dialog(canvas, current_dialog)
     if name_choose:
-		canvas.draw_text(name, [30, 390], 14, "black", "monospace")
+        text_cache.draw(canvas, name, [30, 390], 14, "black", "monospace")
 
 def intro_init():
     #Initializes the introduction
     global current_background,  background_image, background_info, introduction_image, intro_end, name, current_dialog
-    global introimg_info, textbox_info, explosion_info, dialog_place, l1_textscroller, l2_textscroller, name_choose
-    global text_timer, intro_dialog, current_sound, name, current_volume
+    global introimg_info, explosion_info, name_choose
+    global intro_dialog, name
     introimg_info = ImageInfo([WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT], intro_loader.get_image("introduction_image"))
-    textbox_info = ImageInfo([460 / 2, 83 / 2], [460, 83], intro_loader.get_image("textbox_image"))
     explosion_info = ImageInfo([64, 64], [128, 128], intro_loader.get_image("explosion_image"), True, 24)
     
     current_background = "intro"
     background_image = intro_loader.get_image("introduction_image")
     background_info = introimg_info
     
-    dialog_place = 0
-    l1_textscroller = 1
-    l2_textscroller = 0
     name_choose = False   
     name = ""
-    text_timer = simplegui.create_timer(20, text_timer)
-    text_timer.start()
     
     intro_dialog = ["hi! sorry to keep you waiting.",
                'welcome to the world of pokemon!',
@@ -884,12 +421,9 @@ def intro_init():
                choose_name]
     
     #Sets intial dialog and sounds          
-    current_dialog = Dialog(intro_dialog)
-    current_sound = intro_loader.get_sound("Welcome") 
-    current_sound.set_volume(current_volume)
-    current_sound.play()
-    #Adds a volume manager
-    frame.add_input("Change Volume (0 to 10):", change_volume, 50)
+    current_dialog = Dialog(intro_dialog, measure = measure_dialog_text)
+    dialog_assets_init(intro_loader)
+    sounds.play_music(intro_loader.get_sound("Welcome"), fade = 0)
         
     frame.set_draw_handler(intro_draw)
     frame.set_keydown_handler(intro_keydown)
@@ -897,24 +431,116 @@ def intro_init():
 #Creates the window
 frame = simplegui.create_frame("Pokemon Emerald", WIDTH, HEIGHT)
 
-title_screen = simplegui.load_image("http://i.imgur.com/9usiau1.jpg")
+#Adds a volume manager
+frame.add_input("Change Volume (0 to 10):", change_volume, 50)
+
+#Downloaded images and sounds are kept on disk between launches
+asset_cache = AssetCache.from_environment()
+
+title_screen = load_image("http://i.imgur.com/9usiau1.jpg", asset_cache)
 
 background_image = title_screen
 
 #loading screen
-game_loader = Loader(frame, WIDTH, game_init, background_image)
-intro_loader = Loader(frame, WIDTH, intro_init, background_image)
+game_loader = Loader(frame, WIDTH, game_init, background_image, cache=asset_cache, workers=8)
+intro_loader = Loader(frame, WIDTH, intro_init, background_image, cache=asset_cache, workers=8)
+game_loader.scheduler = scheduler
+intro_loader.scheduler = scheduler
+
+#Scenes are read from scenes/*.json and their images and music loaded on first entry
+scene_manager = SceneManager(load_scene_image, load_sound = load_scene_music)
 
 #Loads images for the Introduction
 intro_loader.add_image("http://i.imgur.com/t4qlRQW.jpg", "introduction_image")
-intro_loader.add_image("http://i.imgur.com/mCAOj2C.jpg", "textbox_image")
 intro_loader.add_image("http://commondatastorage.googleapis.com/codeskulptor-assets/lathrop/explosion_alpha.png", "explosion_image")
-intro_loader.add_sound("https://www.dropbox.com/s/i2rvb057eb0c3ed/A-Button.ogg?dl=1", "A-button")
 intro_loader.add_sound("https://www.dropbox.com/s/gy2q2egsc5n8m8e/Intro.ogg?dl=1", "Welcome")
+add_dialog_assets(intro_loader)
 
-#Start the loading sequence for the Introduction
-intro_loader.load()
-intro_loader.wait_loaded()
-
-#Starts the frame
-frame.start()
+def replay(path, realtime = False):
+    """
+    Replay the recording at `path` from the start of the game
+    and print how long it took and whether it ended in the recorded state.
+    :param path: str
+    :param realtime: bool, replay at the recorded speed in the window
+                     instead of as fast as possible
+    :return: bool, True if the final state matches
+    """
+    global replaying, replayer, replay_start, name
+    recording = Recording.load(path)
+    replaying = True
+    intro_loader.load()
+    add_game_assets()
+    game_loader.load()
+    intro_init()
+    name = recording.name
+    game_init()
+    replayer = Replayer(recording, session.simulation,
+                        {KEY_DOWN: game_key_down, KEY_UP: game_key_up,
+                         MOVEMENT_TIMER: movement_timer, DIALOG_UPDATE: update_dialog})
+
+    start = time.time()
+    if realtime:
+        frame.set_keydown_handler(lambda key: None)
+        frame.set_keyup_handler(lambda key: None)
+        replay_start = start
+        frame.start()
+    else:
+        replayer.run()
+    differences = compare(recording.final_state, session.final_state())
+    print(json.dumps({"recording": path,
+                      "events": len(recording.events),
+                      "ticks": session.simulation.ticks,
+                      "seconds": time.time() - start,
+                      "match": not differences,
+                      "differences": differences}))
+    return not differences
+
+def main(argv = None):
+    global record_path, profile_path, save_path, resume, name
+    parser = argparse.ArgumentParser(description = "Pokemon Emerald remake.")
+    parser.add_argument("--record", metavar = "FILE", help = "record the input of the game to FILE")
+    parser.add_argument("--replay", metavar = "FILE", help = "replay a recording and check its final state")
+    parser.add_argument("--realtime", action = "store_true", help = "replay at the recorded speed in the window")
+    parser.add_argument("--profile", metavar = "FILE", help = "profile every frame and write the timings to FILE on exit")
+    parser.add_argument("--save", metavar = "FILE",
+                        help = "resume the game saved in FILE, if any, and save to it regularly and on exit")
+    args = parser.parse_args(argv)
+
+    profile_path = args.profile
+    profiler.enabled = profile_path is not None
+    game_loader.profiler = profiler
+
+    if args.replay is not None:
+        return 0 if replay(args.replay, args.realtime) else 1
+
+    record_path = args.record
+    save_path = args.save
+
+    #A recording replays from the start of the game, so it never resumes a save
+    if (save_path is not None) and (record_path is None) and os.path.exists(save_path):
+        resume = Snapshot.load(save_path)
+        name = resume.name
+        add_game_assets()
+        add_dialog_assets(game_loader)
+        game_loader.load()
+        game_loader.wait_loaded()
+    else:
+        #Start the loading sequence for the Introduction
+        intro_loader.load()
+        intro_loader.wait_loaded()
+
+    #Starts the frame
+    frame.start()
+
+    if recorder is not None:
+        recorder.close(session.final_state())
+    if autosaver is not None:
+        autosaver.save(Snapshot.capture(session))
+        autosaver.close()
+    if (profile_path is not None) and profiler.frames:
+        profiler.dump(profile_path)
+        print("Frame timings written to " + profile_path)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
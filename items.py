@@ -0,0 +1,212 @@
+"""
+Items: what the mart sells, what the character carries and the scrolling
+lists they are shown in.
+
+A `Catalog` files its items by name and by category once, so looking one
+up does not depend on the size of the catalog; modded catalogs have
+thousands. An `Inventory` keeps a count per item name. A `ListView` is the
+scroll state of a panel: it knows which rows are visible, so a panel lays
+out and draws those rows only, however long its list is.
+"""
+
+class Item(object):
+    """
+    Something sold at the mart and carried in the inventory.
+    """
+    #An object rather than a classic class, for __slots__ to apply in Python 2
+    __slots__ = ("name", "effect", "price", "base_level", "category")
+
+    def __init__(self, name, effect, price, base_level):
+        """
+        :param name: str, unique in a catalog
+        :param effect: (str category, amount), e.g. ("health", 20)
+        :param price: int
+        :param base_level: int level needed to buy it
+        """
+        self.name = name
+        self.price = price
+        self.effect = effect
+        self.base_level = base_level
+        self.category = effect[0]
+
+    def __str__(self):
+        return self.name
+
+    def use(self, pokemon):
+        #Not implemented yet, will apply the effect: pokemon.effect[0] += effect[1]
+        pass
+
+class Catalog:
+    """
+    Items in their shop order, indexed by name and by category.
+    """
+    def __init__(self, items = ()):
+        """
+        :param items: iterable of Item
+        :raise: ValueError if two items have the same name
+        """
+        self.items = []
+        self.by_name = {}
+        self.by_category = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """
+        :param item: Item
+        :raise: ValueError if the catalog has an item of the same name
+        """
+        if item.name in self.by_name:
+            raise ValueError("Two items are named '%s'!" % item.name)
+        self.items.append(item)
+        self.by_name[item.name] = item
+        self.by_category.setdefault(item.category, []).append(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def get(self, name):
+        """
+        :param name: str
+        :return: None or the Item named `name`
+        """
+        return self.by_name.get(name)
+
+    def category(self, category):
+        """
+        :param category: str, e.g. "health"
+        :return: list of the items of `category`, in shop order
+        """
+        return self.by_category.get(category, [])
+
+class Inventory:
+    """
+    How many of each item the character carries.
+    Items are listed in the order they were first added; when the last one
+    of an item is removed, the last listed item takes its place, so every
+    operation takes the same time however much is carried.
+    """
+    def __init__(self, entries = ()):
+        """
+        :param entries: iterable of (str item name, int count > 0)
+        """
+        self.counts = {}
+        self.names = []
+        self._index = {}
+        #Changes whenever the content does, for the renderer
+        self.version = 0
+        for name, count in entries:
+            self.add(name, count)
+
+    @classmethod
+    def from_table(cls, names, counts):
+        """
+        Build an inventory in one go, e.g. from a saved game.
+        :param names: list of distinct str item names, in listed order
+        :param counts: list of int counts > 0, one per name
+        :return: Inventory
+        """
+        inventory = cls()
+        inventory.names = list(names)
+        inventory.counts = dict(zip(names, counts))
+        inventory._index = dict(zip(names, range(len(names))))
+        return inventory
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.counts
+
+    def count(self, name):
+        """
+        :param name: str item name
+        :return: int number carried, 0 if none
+        """
+        return self.counts.get(name, 0)
+
+    def add(self, name, count = 1):
+        """
+        :param name: str item name
+        :param count: int > 0
+        """
+        if name in self.counts:
+            self.counts[name] += count
+        else:
+            self.counts[name] = count
+            self._index[name] = len(self.names)
+            self.names.append(name)
+        self.version += 1
+
+    def remove(self, name, count = 1):
+        """
+        :param name: str item name
+        :param count: int > 0
+        :return: bool, False (and nothing removed) if fewer than `count` are carried
+        """
+        left = self.counts.get(name, 0) - count
+        if left < 0:
+            return False
+        if left > 0:
+            self.counts[name] = left
+        else:
+            del self.counts[name]
+            index = self._index.pop(name)
+            last = self.names.pop()
+            if last != name:
+                self.names[index] = last
+                self._index[last] = index
+        self.version += 1
+        return True
+
+    def entries(self, start = 0, stop = None):
+        """
+        :param start: int index of the first entry
+        :param stop: None or int index after the last entry
+        :return: list of [str item name, int count], in listed order
+        """
+        return [[name, self.counts[name]] for name in self.names[start:stop]]
+
+class ListView:
+    """
+    The visible window of a scrolling list and the row selected in it.
+    """
+    def __init__(self, rows):
+        """
+        :param rows: int > 0 rows that fit on screen
+        """
+        self.rows = rows
+        self.top = 0
+        self.cursor = 0
+
+    def reset(self):
+        #Back to the first row
+        self.top = 0
+        self.cursor = 0
+
+    def move(self, delta, length):
+        """
+        Move the selection by `delta` rows, staying in the list and
+        scrolling so it stays visible.
+        :param delta: int
+        :param length: int rows in the list
+        """
+        self.cursor = max(0, min(self.cursor + delta, length - 1))
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.rows:
+            self.top = self.cursor - self.rows + 1
+
+    def visible(self, length):
+        """
+        :param length: int rows in the list
+        :return: range of the indices of the visible rows
+        """
+        top = max(0, min(self.top, length - self.rows))
+        return range(top, min(top + self.rows, length))
@@ -0,0 +1,622 @@
+"""
+Image and sound loading with a progression bar, optionally served from
+an `asset_cache.AssetCache` instead of the network.
+"""
+import threading
+import time
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+from constants import WIDTH, HEIGHT
+
+def _backend():
+    #Returns (load_image, load_sound, load_local_image, load_local_sound, SIMPLEGUICS2PYGAME)
+    try:
+        from simplegui import load_image, load_sound
+
+        return load_image, load_sound, None, None, False
+    except ImportError:
+        from SimpleGUICS2Pygame.simpleguics2pygame import load_image, \
+            load_sound, _load_local_image, _load_local_sound
+
+        return load_image, load_sound, _load_local_image, _load_local_sound, True
+
+def load_image(url, cache=None):
+    """
+    Load the image at `url`, through `cache` when one is given
+    and the file system is available (not in CodeSkulptor).
+    :param url: str
+    :param cache: None or AssetCache
+    :return: simplegui.Image
+    """
+    load, _, load_local, _, SIMPLEGUICS2PYGAME = _backend()
+    if SIMPLEGUICS2PYGAME and (cache is not None):
+        return load_local(cache.fetch(url))
+    return load(url)
+
+def load_sound(url, cache=None):
+    """
+    Load the sound at `url`, through `cache` when one is given
+    and the file system is available (not in CodeSkulptor).
+    :param url: str
+    :param cache: None or AssetCache
+    :return: simplegui.Sound
+    """
+    _, load, _, load_local, SIMPLEGUICS2PYGAME = _backend()
+    if SIMPLEGUICS2PYGAME and (cache is not None):
+        return load_local(cache.fetch(url))
+    return load(url)
+
+class Loader:
+    """
+    Slightly modified version of simplegui_lib_loader (December 12, 2013)
+    Credit to Olivier Pirson for the base structure.
+    http://www.opimedia.be/
+    
+    Help to load images and sounds from Internet
+    and wait finished.
+    With SimpleGUICS2Pygame,
+    `SimpleGUICS2Pygame.load_image()` and `SimpleGUICS2Pygame.load_sound()`
+    wait automatically until loading is completed.
+    But in CodeSkulptor, the browser load images and sounds asynchronously.
+    (With SimpleGUI it is **impossible to verify that the sounds are loaded**.
+    So `Loader` begin load sounds, and next begin load images.
+    It wait each image is loaded,
+    and considers that all downloads are completed.)
+    """
+
+    _interval = 100
+    """
+    Interval in ms betweed two check.
+    """
+
+    profiler = None
+    """
+    None or profiler.FrameProfiler timing the checks of `wait_loaded()`.
+    """
+
+    scheduler = None
+    """
+    None or scheduler.Scheduler running the checks of `wait_loaded()`
+    from the draw handler instead of a simplegui timer.
+    """
+
+    def __init__(self, frame, progression_bar_width,
+                 after_function, background_screen = None, max_waiting=5000,
+                 cache=None, workers=1):
+        """
+        Set an empty loader.
+        :param frame: simplegui.Frame
+        :param progression_bar_width: (int or float) >= 0
+        :param after_function: function () -> *
+        :param max_waiting: (int or float) >= 0
+        :param cache: None or AssetCache
+        :param workers: int >= 1, number of assets loaded at the same time
+                        by `Loader.load()` with SimpleGUICS2Pygame
+        """
+        assert (isinstance(progression_bar_width, int)
+                or isinstance(progression_bar_width, float)), \
+            type(progression_bar_width)
+        assert progression_bar_width >= 0, progression_bar_width
+        assert isinstance(workers, int) and (workers >= 1), workers
+
+        # assert callable(after_function), type(after_function)
+
+        self._frame = frame
+        self._progression_bar_width = progression_bar_width
+        self._after_function = after_function
+        self._max_waiting = max_waiting
+        self._cache = cache
+        self._workers = workers
+        self.background_screen = background_screen
+        self._images = {}
+        self._sounds = {}
+
+        #Progress is counted as assets complete so queries never scan the dicts
+        self._images_loaded = set()
+        self._sounds_loaded = set()
+        self._failed = set()
+        self._pending_images = set()
+        #(is image, name) of the assets load() started and not finished yet
+        self._loading = set()
+        self._asset_callbacks = []
+        self._done_callbacks = []
+        self._done_fired = False
+        self._lock = threading.RLock()
+
+        self.__max_waiting_remain_started = False
+        self.__waiting_finished = False
+
+    def _draw_loading(self, canvas):
+        """
+        Draw waiting message on the canvas
+        when images and sounds loading.
+        :param canvas: simplegui.Canvas
+        """
+        nb = self.get_nb_images() + self.get_nb_sounds()
+
+        size = 30
+        
+        canvas.draw_image(self.background_screen, [WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT], [WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT])
+        if (self._progression_bar_width > 0) and (nb > 0):
+            percent = (self.get_nb_images_loaded()
+                       + self.get_nb_sounds_loaded())*100.0/nb
+
+            y = 450
+            canvas.draw_line((0, y),
+                             (self._progression_bar_width, y), 20, 'White')
+            if percent > 0:
+                canvas.draw_line((0, y),
+                                 (self._progression_bar_width*percent/100.0,
+                                  y),
+                                 20, 'Green')
+
+        canvas.draw_text('Loading... %d%%' % int(percent),
+                         (10, 430),
+                         size, 'White')
+
+        if self.__max_waiting_remain_started:
+            nb = int(round(self.__max_waiting_remain/1000.0))
+            canvas.draw_text('Abort after %d second%s...'
+                             % (nb, ('s' if nb > 1
+                                     else '')),
+                             (10, 50 + size*2*3.0/4),
+                             size, 'White')
+                             
+
+
+    def add_image(self, url, name=None):
+        """
+        Add an image from `url`
+        and give it a name.
+        **Execute `Loader.load()` before use images.**
+        If `name` == `None`
+        then "filename" of url is used.
+        Example:
+        If `url` == `'http://commondatastorage.googleapis.com/codeskulptor-assets/lathrop/asteroid_blue.png'`
+           and `name` == `None`
+        then `'asteroid_blue.png'` is used.
+        :param url: str
+        :param name: None or str
+        :param wait: bool
+        """
+        assert isinstance(url, str), type(url)
+        assert (name is None) or isinstance(name, str), type(name)
+
+        name = (url.split('/')[-1] if name is None
+                else name)
+        self._forget(self._images, name)
+        self._images[name] = url
+
+    def add_sound(self, url, name=None):
+        """
+        Add a sound from `url`
+        and give it a `name`.
+        **Execute `Loader.load()` before use sounds.**
+        If `name` == `None`
+        then "filename" of `url` is used.
+        Example:
+        If `url` == `'http://commondatastorage.googleapis.com/codeskulptor-assets/Epoq-Lepidoptera.ogg'`
+           and `name` == `None`
+        then `'Epoq-Lepidoptera.ogg'` is used.
+        :param url: str
+        :param name: None or str
+        :param wait: bool
+        """
+        assert isinstance(url, str), type(url)
+        assert (name is None) or isinstance(name, str), type(name)
+
+        name = (url.split('/')[-1] if name is None
+                else name)
+        self._forget(self._sounds, name)
+        self._sounds[name] = url
+
+    def get_image(self, name):
+        """
+        If an image named `name` exist
+        then return it,
+        else return `None`
+        (also while it is still loading after `wait_loaded()` gave up waiting,
+        and if its loading failed).
+        :param name: str
+        :raise: Exception if Loader.load() was not executed
+                since the addition of this image.
+        :return: None or simplegui.Image
+        """
+        assert isinstance(name, str), type(name)
+
+        image = self._images.get(name)
+
+        if isinstance(image, str):
+            if not self._started(True, name):
+                raise Exception(
+                    "load() not executed since the addition of the image '%s'!"
+                    % name)
+            return None
+
+        return image
+
+    def _started(self, is_image, name):
+        #True if load() was executed since the addition of `name`
+        key = (is_image, name)
+        with self._lock:
+            return (key in self._loading) or (key in self._failed)
+
+    def get_nb_images(self):
+        """
+        Return the number of images (loaded or not).
+        :return: int >= 0
+        """
+        return len(self._images)
+
+    def get_nb_images_loaded(self):
+        """
+        Return the number of loaded images.
+        It is the number of begin loading by `Loader.load()`
+        **and** fully completed.
+        :return: int >= 0
+        """
+        return len(self._images_loaded)
+
+    def get_nb_sounds(self):
+        """
+        Return the number of sounds (loaded or not).
+        :return: int >= 0
+        """
+        return len(self._sounds)
+
+    def get_nb_sounds_loaded(self):
+        """
+        Return the number of loaded sounds.
+        It is the number of begin loading by `Loader.load()`,
+        **but not necessarily completed**.
+        Because with SimpleGUI of CodeSkulptor
+        it is **impossible to verify that the sounds are loaded**.
+        :return: int >= 0
+        """
+        return len(self._sounds_loaded)
+
+    def get_nb_failed(self):
+        """
+        Return the number of images and sounds whose loading failed.
+        :return: int >= 0
+        """
+        return len(self._failed)
+
+    def is_done(self):
+        """
+        Return `True` if every image and sound is loaded or failed.
+        :return: bool
+        """
+        return (len(self._images_loaded) + len(self._sounds_loaded)
+                + len(self._failed)
+                == len(self._images) + len(self._sounds))
+
+    def add_asset_callback(self, callback):
+        """
+        Call `callback(name, loaded)` each time an image or sound
+        finishes loading (`loaded` == `True`) or fails (`loaded` == `False`).
+        With SimpleGUICS2Pygame and several workers
+        it is called from a worker thread.
+        :param callback: function (str, bool) -> *
+        """
+        self._asset_callbacks.append(callback)
+
+    def add_done_callback(self, callback):
+        """
+        Call `callback()` as soon as every image and sound added so far
+        is loaded or failed, from the thread that completed the last one.
+        Called again for the next batch after new `add_image()`/`add_sound()`.
+        :param callback: function () -> *
+        """
+        self._done_callbacks.append(callback)
+        if self.is_done() and self._done_fired:
+            callback()
+
+    def _forget(self, assets, name):
+        #Drops the progress recorded for `name` before it is added again
+        is_image = assets is self._images
+        with self._lock:
+            if is_image:
+                self._images_loaded.discard(name)
+                self._pending_images.discard(name)
+            else:
+                self._sounds_loaded.discard(name)
+            self._failed.discard((is_image, name))
+            self._loading.discard((is_image, name))
+            self._done_fired = False
+
+    def _asset_done(self, assets, name, media):
+        """
+        Record the result of loading `name` in `assets`.
+        `media` is `None` if the loading raised.
+        In CodeSkulptor an image still being downloaded by the browser
+        is kept pending and checked again by `_poll_pending_images()`.
+        :param assets: self._images or self._sounds
+        :param name: str
+        :param media: None or simplegui.Image or simplegui.Sound
+        """
+        is_image = assets is self._images
+        with self._lock:
+            self._loading.discard((is_image, name))
+            if media is None:
+                loaded = False
+            else:
+                assets[name] = media
+                if not is_image:
+                    loaded = True
+                elif media.get_width() > 0:
+                    loaded = True
+                elif self._SIMPLEGUICS2PYGAME:
+                    loaded = False
+                else:
+                    self._pending_images.add(name)
+                    return
+
+            self._pending_images.discard(name)
+            if not loaded:
+                self._failed.add((is_image, name))
+            elif is_image:
+                self._images_loaded.add(name)
+            else:
+                self._sounds_loaded.add(name)
+
+            fire_done = self.is_done() and not self._done_fired
+            if fire_done:
+                self._done_fired = True
+
+        for callback in self._asset_callbacks:
+            callback(name, loaded)
+        if fire_done:
+            for callback in list(self._done_callbacks):
+                callback()
+
+    def _poll_pending_images(self):
+        #Only the images the browser is still downloading are checked
+        for name in list(self._pending_images):
+            if self._images[name].get_width() > 0:
+                self._asset_done(self._images, name, self._images[name])
+
+    def get_sound(self, name):
+        """
+        If a sound named `name` exist
+        then return it,
+        else return `None`
+        (also while it is still loading after `wait_loaded()` gave up waiting,
+        and if its loading failed).
+        :param name: str
+        :raise: Exception if load() was not executed
+                since the addition of this sound.
+        :return: None or simplegui.Sound
+        """
+        assert isinstance(name, str), type(name)
+
+        sound = self._sounds.get(name)
+
+        if isinstance(sound, str):
+            if not self._started(False, name):
+                raise Exception(
+                    "load() not executed since the addition of the sound '%s'!"
+                    % name)
+            return None
+
+        return sound
+
+    def load(self):
+        """
+        **Start loading** of all images and sounds added
+        since last `Loader.load()` execution.
+        * In standard Python with SimpleGUICS2Pygame:
+        draw a progression bar on canvas
+        and wait until the loading is finished.
+        * In SimpleGUI of CodeSkulptor: *don't* wait.
+        """
+        SIMPLEGUICS2PYGAME = _backend()[-1]
+
+        self._SIMPLEGUICS2PYGAME = SIMPLEGUICS2PYGAME
+
+        with self._lock:
+            for is_image, assets in ((True, self._images), (False, self._sounds)):
+                self._loading.update((is_image, name) for name in assets
+                                     if isinstance(assets[name], str))
+
+        if SIMPLEGUICS2PYGAME:
+            handler_saved = self._frame._canvas._draw_handler
+            self._frame._canvas._draw_handler = self._draw_loading
+
+        #The draw handler is given back even if a loading raises
+        try:
+            if SIMPLEGUICS2PYGAME and (self._workers > 1):
+                self._load_concurrently(
+                    [(self._sounds, name, load_sound) for name in self._sounds
+                     if isinstance(self._sounds[name], str)]
+                    + [(self._images, name, load_image) for name in self._images
+                       if isinstance(self._images[name], str)])
+            else:
+                self._load_in_turn(SIMPLEGUICS2PYGAME)
+
+            if SIMPLEGUICS2PYGAME:
+                self._frame._canvas._draw()
+        finally:
+            if SIMPLEGUICS2PYGAME:
+                self._frame._canvas._draw_handler = handler_saved
+
+    def _load_in_turn(self, SIMPLEGUICS2PYGAME):
+        """
+        Load the sounds then the images one after the other,
+        redrawing the progression bar before each one.
+        The cache writes its index once, at the end.
+        :param SIMPLEGUICS2PYGAME: bool
+        :raise: the exception raised by a load function
+        """
+        if self._cache is not None:
+            self._cache.hold_index()
+        try:
+            for assets, load in ((self._sounds, load_sound),
+                                 (self._images, load_image)):
+                for name in list(assets):
+                    if SIMPLEGUICS2PYGAME:
+                        self._frame._canvas._draw()
+                    if isinstance(assets[name], str):
+                        try:
+                            media = load(assets[name], self._cache)
+                        except Exception:
+                            self._asset_done(assets, name, None)
+                            raise
+                        self._asset_done(assets, name, media)
+        finally:
+            if self._cache is not None:
+                self._cache.release_index()
+
+    def _load_concurrently(self, jobs):
+        """
+        Load `jobs` with a pool of `self._workers` threads
+        and redraw the progression bar each time one completes.
+        After `self._max_waiting` milliseconds stop waiting;
+        the remaining assets keep loading in the background:
+        `get_image()`/`get_sound()` return `None` for them until they are done.
+        The cache writes its index once, when the last worker is done.
+        :param jobs: list of (dict of assets, name, load function)
+        :raise: the first exception raised by a load function
+        """
+        tasks = Queue()
+        done = Queue()
+        for job in jobs:
+            tasks.put(job)
+
+        workers = min(self._workers, len(jobs))
+        running = [workers]
+        running_lock = threading.Lock()
+        if (self._cache is not None) and (workers > 0):
+            self._cache.hold_index()
+
+        def work():
+            while True:
+                try:
+                    assets, name, load = tasks.get_nowait()
+                except Empty:
+                    break
+                try:
+                    media = load(assets[name], self._cache)
+                except Exception as error:
+                    self._asset_done(assets, name, None)
+                    done.put(error)
+                else:
+                    self._asset_done(assets, name, media)
+                    done.put(None)
+
+            with running_lock:
+                running[0] -= 1
+                last = running[0] == 0
+            if last and (self._cache is not None):
+                self._cache.release_index()
+
+        for _ in range(workers):
+            thread = threading.Thread(target=work)
+            thread.daemon = True
+            thread.start()
+
+        deadline = (time.time() + self._max_waiting/1000.0
+                    if self._max_waiting > 0
+                    else None)
+        first_error = None
+        for _ in range(len(jobs)):
+            try:
+                error = done.get(timeout=(None if deadline is None
+                                          else max(0, deadline - time.time())))
+            except Empty:
+                break
+            if (error is not None) and (first_error is None):
+                first_error = error
+            self._frame._canvas._draw()
+
+        if first_error is not None:
+            raise first_error
+
+    def pause_sounds(self):
+        """
+        Pause all sounds.
+        """
+        for name in self._sounds:
+            if not isinstance(self._sounds[name], str):
+                self._sounds[name].pause()
+
+    def wait_loaded(self):
+        """
+        Draw a progression bar on canvas
+        and wait until all images and sounds are fully loaded.
+        Then execute `self._after_function`.
+        After `self._max_waiting` milliseconds,
+        abort and execute `self._after_function`.
+        `self._after_function` always runs in the draw handler,
+        never in a loading worker or a timer thread.
+        See details in `get_nb_sounds_loaded()` documentation.
+        """
+        if self.is_done() or (self._max_waiting <= 0):
+            self._after_function()
+            return
+
+        def request_finish():
+            #Called by the last worker or the countdown; the draw handler finishes
+            self.__finish_requested = True
+
+        def finish():
+            """
+            Stop waiting and execute `self._after_function`, only once.
+            """
+            if self.__waiting_finished:
+                return
+            self.__waiting_finished = True
+
+            self.__max_waiting_remain = 0
+            self.__timer.stop()
+            self._frame.set_draw_handler(lambda canvas: None)
+            self._done_callbacks.remove(request_finish)
+
+            self._after_function()
+
+        def check_if_loaded():
+            """
+            Count down to the abort
+            (and check the images the browser is still downloading).
+            Completion itself is signaled by `request_finish()` as a done callback.
+            """
+            self.__max_waiting_remain -= Loader._interval
+            self._poll_pending_images()
+
+            if self.__max_waiting_remain <= 0:
+                request_finish()
+
+        self.__max_waiting_remain_started = True
+        self.__max_waiting_remain = self._max_waiting
+        self.__waiting_finished = False
+        self.__finish_requested = False
+
+        if self.profiler is not None:
+            check_if_loaded = self.profiler.timed("loader_check")(check_if_loaded)
+
+        scheduler = self.scheduler
+
+        def draw(canvas):
+            if scheduler is not None:
+                scheduler.run_due()
+            if self.__finish_requested:
+                finish()
+            else:
+                self._draw_loading(canvas)
+
+        self._frame.set_draw_handler(draw)
+        if scheduler is not None:
+            self.__timer = scheduler.every(Loader._interval, check_if_loaded)
+        else:
+            try:
+                from simplegui import create_timer
+            except ImportError:
+                from SimpleGUICS2Pygame.simpleguics2pygame import create_timer
+
+            self.__timer = create_timer(Loader._interval, check_if_loaded)
+        self.__timer.start()
+        self.add_done_callback(request_finish)
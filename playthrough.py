@@ -0,0 +1,300 @@
+"""
+Scripted playthroughs of the headless game, run in parallel.
+
+A script is a JSON file naming the player and listing input steps:
+
+    {
+        "name": "ASH",
+        "steps": [
+            ["hold", "up", 40],
+            ["key_down", "z"], ["hold", "left", 45], ["key_up", "z"],
+            ["press", "space"],
+            ["wait", 60],
+            ["expect", "center"]
+        ]
+    }
+
+`key_down`/`key_up` press or release a key, `press` does both, `hold` keeps
+a key down for a number of ticks, `wait` lets ticks pass and `expect` checks
+the scene the character is in. Every step but `hold` and `wait` takes no
+time. A recording made with `game.py --record` can be given instead of a
+script; it is replayed and its final state checked.
+
+The title screen and the name input belong to the window, so a playthrough
+starts with the named player in town. Each run reports its final state,
+the ticks it took, the scenes it went through and the stalls: stretches of
+`STALL_TICKS` or more where keys were pressed or held but nothing changed.
+A run that ends stalled is soft-locked.
+
+    python playthrough.py playthroughs/*.json --workers 8 --report report.jsonl
+"""
+import json
+import multiprocessing
+import sys
+import time
+import traceback
+
+from scenes import SceneManager
+from session import GameSession, DEFAULT_KEY_MAP
+from simulation import TICKS_PER_SECOND
+from replay import MAGIC, Recording, Replayer, compare, KEY_DOWN, KEY_UP, \
+    MOVEMENT_TIMER, DIALOG_UPDATE
+
+#Ticks without any change, while keys are pressed, that count as a stall
+STALL_TICKS = 5 * TICKS_PER_SECOND
+
+#A script never runs longer than this many ticks
+MAX_TICKS = 60 * 60 * TICKS_PER_SECOND
+
+#SceneManager of a worker process, shared by the runs it does
+_scenes = None
+
+class Watchdog:
+    """
+    Finds stretches of ticks where input kept coming but the session did not change.
+    """
+    def __init__(self, limit = STALL_TICKS):
+        """
+        :param limit: int ticks
+        """
+        self.limit = limit
+        self.stalls = []
+        self._signature = None
+        self._since = 0
+        self._pushed = False
+
+    def update(self, tick, signature, pushing):
+        """
+        :param tick: int current tick
+        :param signature: hashable summary of what the player can see
+        :param pushing: bool, a key was pressed or is held
+        """
+        if signature != self._signature:
+            self._close(tick)
+            self._signature = signature
+            self._since = tick
+            self._pushed = False
+        self._pushed = self._pushed or pushing
+
+    def finish(self, tick):
+        """
+        :param tick: int last tick of the run
+        :return: bool, True if the run ended stalled
+        """
+        stalls = len(self.stalls)
+        self._close(tick)
+        return len(self.stalls) > stalls
+
+    def _close(self, tick):
+        if (self._signature is not None) and self._pushed and (tick - self._since >= self.limit):
+            self.stalls.append({"tick": self._since, "ticks": tick - self._since,
+                                "scene": self._signature[0], "pos": list(self._signature[1])})
+
+def signature(session):
+    #What the player can see change: where they are and which menu or dialog is up
+    dialog = session.dialog
+    return (session.simulation.current_background, tuple(session.simulation.world_pos()),
+            None if dialog is None else (id(dialog), dialog.dialog_place),
+            session.buying, session.inventory_shown, session.mart_view.cursor)
+
+def pushing(session):
+    #True while the player holds a walking key
+    simulation = session.simulation
+    return simulation.moving_left or simulation.moving_right or bool(session.character.vel[1])
+
+class Playthrough:
+    """
+    Runs one script against a headless GameSession.
+    """
+    def __init__(self, scenes, name, key_map = DEFAULT_KEY_MAP):
+        """
+        :param scenes: scenes.SceneManager
+        :param name: str player name
+        :param key_map: dict key name -> key code
+        """
+        self.key_map = key_map
+        self.session = GameSession(name, scenes, [], key_map = key_map)
+        self.watchdog = Watchdog()
+        self.scenes = [self.session.simulation.current_background]
+        self.failures = []
+        self._pressed = False
+
+    def ticks(self):
+        return self.session.simulation.ticks
+
+    def key_down(self, key):
+        self._pressed = True
+        self.session.key_down(key)
+
+    def key_up(self, key):
+        self._pressed = True
+        self.session.key_up(key)
+
+    def tick(self):
+        #One tick of the game as the window runs it: world, then dialog
+        self.session.tick()
+        self._observe()
+
+    def _observe(self):
+        #Called after every tick
+        session = self.session
+        scene = session.simulation.current_background
+        if scene != self.scenes[-1]:
+            self.scenes.append(scene)
+        self.watchdog.update(self.ticks(), signature(session), self._pressed or pushing(session))
+        self._pressed = False
+
+    def wait(self, ticks):
+        for _ in range(min(ticks, MAX_TICKS - self.ticks())):
+            self.tick()
+
+    def run_step(self, step):
+        """
+        :param step: list [action, arguments...]
+        :raise: ValueError on an unknown action
+        """
+        action = step[0]
+        if action == "key_down":
+            self.key_down(self.key_map[step[1]])
+        elif action == "key_up":
+            self.key_up(self.key_map[step[1]])
+        elif action == "press":
+            self.key_down(self.key_map[step[1]])
+            self.key_up(self.key_map[step[1]])
+        elif action == "hold":
+            self.key_down(self.key_map[step[1]])
+            self.wait(step[2])
+            self.key_up(self.key_map[step[1]])
+        elif action == "wait":
+            self.wait(step[1])
+        elif action == "expect":
+            scene = self.session.simulation.current_background
+            if scene != step[1]:
+                self.failures.append("tick %d: expected to be in %s, in %s" % (self.ticks(), step[1], scene))
+        else:
+            raise ValueError("Unknown step %r!" % (step,))
+
+    def replay(self, recording):
+        """
+        Feed a recording to the session; its timers fire as recorded.
+        :param recording: replay.Recording
+        """
+        session = self.session
+        replayer = Replayer(recording, _WatchedSimulation(self),
+                            {KEY_DOWN: self.key_down, KEY_UP: self.key_up,
+                             MOVEMENT_TIMER: session.animate_walk,
+                             DIALOG_UPDATE: session.update_dialog})
+        replayer.run()
+        self.failures.extend(compare(recording.final_state, session.final_state()))
+
+    def report(self):
+        ticks = self.ticks()
+        soft_locked = self.watchdog.finish(ticks)
+        return {"name": self.session.name,
+                "ticks": ticks,
+                "final_state": self.session.final_state(),
+                "scenes": self.scenes,
+                "stalls": self.watchdog.stalls,
+                "soft_locked": soft_locked,
+                "failures": self.failures,
+                "ok": not (soft_locked or self.failures)}
+
+class _WatchedSimulation:
+    #What a Replayer needs of a simulation, stepping the simulation alone as
+    #the game does between recorded events, under the watchdog
+    def __init__(self, playthrough):
+        self._playthrough = playthrough
+        self._simulation = playthrough.session.simulation
+
+    @property
+    def ticks(self):
+        return self._simulation.ticks
+
+    def step_n(self, n):
+        for _ in range(n):
+            self._simulation.tick()
+            self._playthrough._observe()
+
+def run_file(path, scenes = None):
+    """
+    Run the script or recording at `path`.
+    Errors are reported in the result instead of raised.
+    :param path: str
+    :param scenes: None or scenes.SceneManager, None for the worker's own
+    :return: dict result, see `Playthrough.report()`
+    """
+    global _scenes
+    if scenes is None:
+        if _scenes is None:
+            _scenes = SceneManager()
+        scenes = _scenes
+    start = time.time()
+    try:
+        with open(path, "rb") as source:
+            is_recording = source.read(len(MAGIC)) == MAGIC
+        if is_recording:
+            recording = Recording.load(path)
+            playthrough = Playthrough(scenes, recording.name)
+            playthrough.replay(recording)
+        else:
+            with open(path) as source:
+                script = json.load(source)
+            playthrough = Playthrough(scenes, str(script.get("name", "PLAYER")))
+            for step in script["steps"]:
+                playthrough.run_step(step)
+        result = playthrough.report()
+    except Exception:
+        result = {"error": traceback.format_exc(), "ok": False}
+    result["script"] = path
+    result["seconds"] = time.time() - start
+    return result
+
+def run_all(paths, workers = None, report = None):
+    """
+    Run every script in a pool of `workers` processes, writing each result
+    to `report` as one JSON line as soon as it is done, then a summary line.
+    :param paths: list of str
+    :param workers: None (one per CPU) or int > 0
+    :param report: None or file object, standard output by default
+    :return: list of dict results, in the order they finished
+    """
+    report = sys.stdout if report is None else report
+    workers = workers or multiprocessing.cpu_count()
+    start = time.time()
+    results = []
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(run_file, paths):
+            results.append(result)
+            report.write(json.dumps(result, sort_keys = True) + "\n")
+            report.flush()
+    finally:
+        pool.close()
+        pool.join()
+    summary = {"summary": True,
+               "runs": len(results),
+               "failed": sum(1 for result in results if not result["ok"]),
+               "workers": workers,
+               "seconds": time.time() - start}
+    report.write(json.dumps(summary, sort_keys = True) + "\n")
+    report.flush()
+    return results
+
+def main(argv = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description = "Run scripted playthroughs of the game in parallel.")
+    parser.add_argument("scripts", nargs = "+", help = "JSON scripts or recordings")
+    parser.add_argument("--workers", type = int, help = "worker processes (default: one per CPU)")
+    parser.add_argument("--report", help = "file to write the JSON lines to (default: standard output)")
+    args = parser.parse_args(argv)
+
+    if args.report is None:
+        results = run_all(args.scripts, args.workers)
+    else:
+        with open(args.report, "w") as report:
+            results = run_all(args.scripts, args.workers, report)
+    return 0 if all(result["ok"] for result in results) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+"""
+Loads the scene behind a door while the character walks up to it, so the
+transition usually finds the scene already loaded instead of stalling.
+"""
+import math
+
+#World pixels from a door at which its scene starts loading
+DEFAULT_DISTANCE = 48
+
+class DoorPrefetcher:
+    """
+    Watches the doors near the character and prefetches the scene of
+    any door it is heading toward.
+    """
+    def __init__(self, scenes, distance = DEFAULT_DISTANCE):
+        """
+        :param scenes: scenes.SceneManager
+        :param distance: (int or float) >= 0, how close the character
+                         has to get to a door for its scene to be prefetched
+        """
+        self.scenes = scenes
+        self.distance = distance
+
+    def update(self, simulation):
+        """
+        Prefetch the scenes of the doors of the current scene that the
+        character is near and moving toward.
+        :param simulation: simulation.Simulation
+        """
+        vx, vy = simulation.character.velocity()
+        if not vx and not vy:
+            return
+        index = simulation.building_sets.get(simulation.current_background)
+        if index is None:
+            return
+        pos = simulation.world_pos()
+        for building in index.near(pos, self.distance):
+            if (building.scene is None) or (building.door is None):
+                continue
+            #Vector to the closest point of the door, on the lower edge of the building
+            dx = min(max(pos[0], building.door[0]), building.door[1]) - pos[0]
+            dy = building.borders[1] - pos[1]
+            if (dx * vx + dy * vy >= 0) and (math.hypot(dx, dy) <= self.distance):
+                self.scenes.prefetch(building.scene)
+
+    def stats(self):
+        """
+        Counters to tune `distance`: scene entries that found the scene
+        loaded (hits), still loading (late) or not loaded (misses), and
+        the number of prefetches started.
+        :return: dict
+        """
+        return {"distance": self.distance,
+                "hits": self.scenes.hits,
+                "late": self.scenes.late,
+                "misses": self.scenes.misses,
+                "prefetches": self.scenes.prefetches}
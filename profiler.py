@@ -0,0 +1,166 @@
+"""
+Frame profiler: timings of each phase of a frame and of the timer
+callbacks, kept in ring buffers.
+
+Wrap a phase with
+
+    started = profiler.start()
+    ...
+    profiler.stop("character", started)
+
+between `begin_frame()` and `end_frame()`; a phase timed several times in a
+frame (the renderer draws once per dirty rectangle) adds up. Phases may
+nest, so "simulation" includes "border_control". Callbacks outside frames
+are wrapped with `timed()`. While disabled, `start()` returns None and the
+rest does nothing, so leaving the calls in costs next to nothing.
+"""
+import json
+import time
+from collections import deque
+
+#Best clock available (time.perf_counter does not exist in Python 2)
+_clock = getattr(time, 'perf_counter', time.time)
+
+#Frames and callback calls kept for the statistics
+DEFAULT_CAPACITY = 600
+
+def percentile(ordered, fraction):
+    """
+    Nearest-rank percentile.
+    :param ordered: non empty sorted list
+    :param fraction: float in [0, 1]
+    """
+    rank = int(round(fraction * (len(ordered) - 1)))
+    return ordered[rank]
+
+class FrameProfiler:
+    """
+    Records per-phase frame timings and callback timings.
+    """
+    def __init__(self, capacity = DEFAULT_CAPACITY):
+        """
+        :param capacity: int > 0, frames (and calls of each callback) kept
+        """
+        self.enabled = False
+        self.capacity = capacity
+        self.frames = deque(maxlen = capacity)
+        self.calls = {}
+        self.worst_frame = None
+        self._frame = None
+        self._frame_start = None
+
+    def start(self):
+        #Returns the start time of a phase, or None when disabled
+        if self.enabled:
+            return _clock()
+        return None
+
+    def stop(self, name, started):
+        """
+        Add the time since `started` to the phase `name` of the current frame.
+        :param name: str
+        :param started: value returned by `start()`
+        """
+        if (started is not None) and (self._frame is not None):
+            self._frame[name] = self._frame.get(name, 0.0) + _clock() - started
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame = {}
+            self._frame_start = _clock()
+
+    def end_frame(self):
+        if self._frame is None:
+            return
+        frame = self._frame
+        frame["frame"] = _clock() - self._frame_start
+        self._frame = None
+        self.frames.append(frame)
+        if (self.worst_frame is None) or (frame["frame"] > self.worst_frame["frame"]):
+            self.worst_frame = frame
+
+    def record(self, name, seconds):
+        #Adds one call of the callback `name`
+        calls = self.calls.get(name)
+        if calls is None:
+            calls = self.calls[name] = deque(maxlen = self.capacity)
+        calls.append(seconds)
+
+    def timed(self, name):
+        """
+        Decorator timing each call of a callback while enabled.
+        :param name: str
+        """
+        def decorator(function):
+            def call(*args):
+                if not self.enabled:
+                    return function(*args)
+                started = _clock()
+                try:
+                    return function(*args)
+                finally:
+                    self.record(name, _clock() - started)
+            return call
+        return decorator
+
+    def reset(self):
+        self.frames.clear()
+        self.calls = {}
+        self.worst_frame = None
+
+    def stats(self):
+        """
+        p50, p95, p99 and max in milliseconds of every phase and callback.
+        :return: dict name -> dict
+        """
+        samples = {}
+        for frame in self.frames:
+            for name, seconds in frame.items():
+                samples.setdefault(name, []).append(seconds)
+        for name, calls in self.calls.items():
+            samples[name] = list(calls)
+
+        stats = {}
+        for name, values in samples.items():
+            values.sort()
+            stats[name] = {"count": len(values),
+                           "p50": percentile(values, 0.50) * 1000,
+                           "p95": percentile(values, 0.95) * 1000,
+                           "p99": percentile(values, 0.99) * 1000,
+                           "max": values[-1] * 1000}
+        return stats
+
+    def overlay_lines(self, top = 4):
+        """
+        Text for the on-screen overlay: the frame time, then the `top`
+        slowest phases or callbacks by p95, in milliseconds.
+        :return: list of str
+        """
+        stats = self.stats()
+        if "frame" not in stats:
+            return ["profiling..."]
+        lines = []
+        names = sorted((name for name in stats if name != "frame"),
+                       key = lambda name: -stats[name]["p95"])
+        for name in ["frame"] + names[:top]:
+            line = stats[name]
+            lines.append("%-14s p50 %5.2f p95 %5.2f p99 %5.2f max %6.2f"
+                         % (name[:14], line["p50"], line["p95"], line["p99"], line["max"]))
+        return lines
+
+    def dump(self, path):
+        """
+        Write the statistics, the worst frame and the frames kept to `path` as JSON.
+        Times are in milliseconds.
+        :param path: str
+        """
+        def milliseconds(frame):
+            return dict((name, seconds * 1000) for name, seconds in frame.items())
+
+        trace = {"stats": self.stats(),
+                 "worst_frame": None if self.worst_frame is None else milliseconds(self.worst_frame),
+                 "frames": [milliseconds(frame) for frame in self.frames],
+                 "calls": dict((name, [seconds * 1000 for seconds in calls])
+                               for name, calls in self.calls.items())}
+        with open(path, "w") as trace_file:
+            json.dump(trace, trace_file, indent = 1, sort_keys = True)
@@ -0,0 +1,120 @@
+"""
+Dirty-rectangle rendering: the last composed frame is kept and only the
+regions that changed since are drawn again.
+
+Each frame the game `track()`s what it shows (the view, the character
+sprite, text lines, panels) with a rectangle and a state value. Anything
+whose rectangle or state changed, appeared or disappeared marks its old and
+new rectangles dirty; the scene is then redrawn clipped to those rectangles
+into a back buffer, which is copied to the canvas. Tracking the view with
+the whole screen as its rectangle means scrolling or changing scene redraws
+everything.
+
+This needs the Pygame surfaces of SimpleGUICS2Pygame. With any other canvas
+the scene is simply drawn in full every frame.
+"""
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+class DirtyRenderer:
+    """
+    Redraws only the changed regions of a canvas-sized back buffer.
+    """
+    def __init__(self, width, height, max_rects = 4):
+        """
+        :param width: int
+        :param height: int
+        :param max_rects: int >= 1, above this many dirty rectangles
+                          they are merged into one
+        """
+        self.size = (width, height)
+        self.max_rects = max_rects
+        self.enabled = True
+        self._buffer = None
+        self._full = True
+        self._shown = {}
+        self._current = {}
+
+        #Frame counts, to check how much work is saved
+        self.full_redraws = 0
+        self.partial_redraws = 0
+        self.idle_frames = 0
+
+    def invalidate(self):
+        #Forces the next frame to be redrawn entirely
+        self._full = True
+
+    def track(self, key, rect, state = None):
+        """
+        Declare that the element `key` is shown in `rect` this frame.
+        It is redrawn when `rect` or `state` differ from the previous frame.
+        :param key: hashable
+        :param rect: (x, y, width, height), may use floats
+        :param state: hashable
+        """
+        x, y, width, height = rect
+        left, top = int(x), int(y)
+        rect = (left, top, int(x + width + 1) - left, int(y + height + 1) - top)
+        self._current[key] = (rect, state)
+
+    def _dirty_rects(self):
+        #Compares this frame's elements with the previous frame's
+        dirty = []
+        for key, shown in self._current.items():
+            previous = self._shown.get(key)
+            if previous != shown:
+                dirty.append(shown[0])
+                if previous is not None:
+                    dirty.append(previous[0])
+        for key, previous in self._shown.items():
+            if key not in self._current:
+                dirty.append(previous[0])
+        self._shown = self._current
+        self._current = {}
+        return dirty
+
+    def render(self, canvas, draw):
+        """
+        Bring the canvas up to date, calling `draw(canvas)` once per
+        dirty rectangle with drawing clipped to it.
+        `draw` must only draw: it can run several times per frame, or not at all.
+        :param canvas: simplegui.Canvas
+        :param draw: function (simplegui.Canvas) -> *
+        """
+        dirty = self._dirty_rects()
+        target = getattr(canvas, '_pygame_surface', None)
+        if (not self.enabled) or (pygame is None) or (target is None):
+            draw(canvas)
+            return
+
+        if (self._buffer is None) or (self._buffer.get_size() != target.get_size()):
+            self._buffer = pygame.Surface(target.get_size())
+            self._full = True
+
+        if self._full:
+            rects = [self._buffer.get_rect()]
+            self._full = False
+            self.full_redraws += 1
+        elif dirty:
+            rects = [pygame.Rect(rect) for rect in dirty]
+            if len(rects) > self.max_rects:
+                rects = [rects[0].unionall(rects[1:])]
+            self.partial_redraws += 1
+        else:
+            rects = []
+            self.idle_frames += 1
+
+        background = getattr(canvas, '_background_pygame_color', (0, 0, 0))
+        for rect in rects:
+            self._buffer.set_clip(rect)
+            self._buffer.fill(background)
+            canvas._pygame_surface = self._buffer
+            try:
+                draw(canvas)
+            finally:
+                canvas._pygame_surface = target
+        self._buffer.set_clip(None)
+
+        target.blit(self._buffer, (0, 0))
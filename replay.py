@@ -0,0 +1,173 @@
+"""
+Recording and deterministic replay of the game's input.
+
+Everything that changes the game from outside the simulation (key presses,
+the firing of the walk animation timer and the dialog updates done by the
+draw handler) is recorded with the simulation
+tick it landed on. Replaying steps the simulation to each event's tick and
+calls the same handler again, so the run ends in the same state however
+fast or slow it is replayed.
+
+A recording is a small binary file: a header with the player's name, one
+9 byte record per event, then the final state as JSON, which the replay
+compares against.
+"""
+import json
+import struct
+
+MAGIC = b"PKRP"
+#Version 2: dialogs come in with the simulation time, there are no text timer events
+#Version 3: the final state has the world position of the character, and no latitude
+VERSION = 3
+
+#Magic, version, length of the UTF-8 encoded player name
+_HEADER = struct.Struct("<4sHH")
+
+#Tick, event source, key code
+_EVENT = struct.Struct("<IBI")
+
+#Event sources
+KEY_DOWN = 0
+KEY_UP = 1
+TEXT_TIMER = 2 #Version 1 only
+MOVEMENT_TIMER = 3
+DIALOG_UPDATE = 4
+_END = 255
+
+class IdleTimer:
+    """
+    Stands in for a simplegui timer during a replay, where the recorded
+    timer events call the handler instead.
+    """
+    def __init__(self):
+        self.running = False
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def is_running(self):
+        return self.running
+
+class InputRecorder:
+    """
+    Writes the events of a game session to a file as they happen.
+    """
+    def __init__(self, path, name, clock):
+        """
+        :param path: str file to write
+        :param name: str player name, needed to replay the dialogs
+        :param clock: function () -> int current simulation tick
+        """
+        self._clock = clock
+        self._file = open(path, "wb")
+        encoded = name.encode("utf-8")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(encoded)) + encoded)
+        self.events = 0
+
+    def record(self, source, key = 0):
+        self._file.write(_EVENT.pack(self._clock(), source, key))
+        self.events += 1
+
+    def close(self, final_state):
+        """
+        Write the state the game ended in and close the file.
+        :param final_state: dict
+        """
+        self._file.write(_EVENT.pack(self._clock(), _END, 0))
+        self._file.write(json.dumps(final_state, sort_keys = True).encode("utf-8"))
+        self._file.close()
+
+class Recording:
+    """
+    The content of a recording file.
+    """
+    def __init__(self, name, events, final_state, end_tick):
+        self.name = name
+        self.events = events
+        self.final_state = final_state
+        self.end_tick = end_tick
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str
+        :raise: ValueError if the file is not a recording
+        :return: Recording
+        """
+        with open(path, "rb") as source:
+            data = source.read()
+        magic, version, name_length = _HEADER.unpack_from(data, 0)
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError("'%s' is not a version %d recording!" % (path, VERSION))
+        offset = _HEADER.size
+        name = data[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+
+        events = []
+        final_state = None
+        end_tick = 0
+        while offset + _EVENT.size <= len(data):
+            event = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            if event[1] == _END:
+                end_tick = event[0]
+                final_state = json.loads(data[offset:].decode("utf-8"))
+                break
+            events.append(event)
+        return cls(str(name), events, final_state, end_tick)
+
+class Replayer:
+    """
+    Feeds the events of a recording back to the game.
+    """
+    def __init__(self, recording, simulation, handlers):
+        """
+        :param recording: Recording
+        :param simulation: simulation.Simulation, at tick 0
+        :param handlers: dict event source -> handler
+        """
+        self.recording = recording
+        self.simulation = simulation
+        self.handlers = handlers
+        self._next = 0
+
+    def done(self):
+        return self._next >= len(self.recording.events)
+
+    def advance_to(self, tick):
+        """
+        Run the simulation up to `tick`, replaying the events on the way.
+        :param tick: int
+        """
+        events = self.recording.events
+        simulation = self.simulation
+        while (self._next < len(events)) and (events[self._next][0] <= tick):
+            event_tick, source, key = events[self._next]
+            self._next += 1
+            simulation.step_n(event_tick - simulation.ticks)
+            if source in (KEY_DOWN, KEY_UP):
+                self.handlers[source](key)
+            else:
+                self.handlers[source]()
+        if tick > simulation.ticks:
+            simulation.step_n(tick - simulation.ticks)
+
+    def run(self):
+        #Replays the whole recording as fast as possible
+        self.advance_to(self.recording.end_tick)
+
+def compare(expected, actual):
+    """
+    Return a description of every difference between two final states.
+    :param expected: dict
+    :param actual: dict
+    :return: list of str, empty when they match
+    """
+    #Round trip through JSON so tuples and lists compare equal
+    actual = json.loads(json.dumps(actual))
+    return ["%s: expected %r, got %r" % (key, expected.get(key), actual.get(key))
+            for key in sorted(set(expected) | set(actual))
+            if expected.get(key) != actual.get(key)]
@@ -0,0 +1,264 @@
+"""
+Saved games: snapshots of a session, written in the background and read
+back in an instant.
+
+A save file is a header, then the hot fields in a fixed layout, then the
+player and scene names, then tagged blocks:
+
+    header   magic, version
+    state    tick, facing, position, camera, outside location (doubles),
+             length of the name, length of the scene name
+    names    UTF-8 player name, UTF-8 scene name
+    blocks   tag, length, then `length` bytes of content
+
+The inventory and the flags are blocks; each is a table of its entry
+count, one 32 bit int per entry and the entry names joined by NUL bytes,
+so reading one is an unpack and a split rather than a parse per entry.
+Blocks of an unknown tag are skipped: a new kind of block does not break
+the loading of the rest.
+
+`Autosaver` writes snapshots from a thread of its own. The frame loop only
+captures a snapshot, copying what it needs from the session; encoding it
+and writing the file happen in the thread. Files are written to a
+temporary file and renamed over the save, so a crash mid-write leaves the
+previous save whole.
+
+    autosaver = Autosaver("save.bin")
+    autosaver.save(Snapshot.capture(session))
+    ...
+    Snapshot.load("save.bin").apply(session)
+"""
+import os
+import struct
+import tempfile
+import threading
+
+from asset_cache import _replace
+from items import Inventory
+
+MAGIC = b"PKSV"
+VERSION = 1
+
+#Magic, version
+_HEADER = struct.Struct("<4sH")
+
+#Tick, facing (sprite row), character x, y, camera x, y, outside location x, y,
+#length of the UTF-8 encoded player name, length of the scene name
+_STATE = struct.Struct("<IB6dHH")
+
+#Tag, length of the content
+_BLOCK = struct.Struct("<BI")
+
+#Number of entries of a table
+_COUNT = struct.Struct("<I")
+
+#Block tags
+INVENTORY = 1
+FLAGS = 2
+
+def _pack_table(names, values):
+    #A table block's content: entry count, int values, NUL separated names
+    return (_COUNT.pack(len(names)) + struct.pack("<%di" % len(values), *values)
+            + u"\0".join(names).encode("utf-8"))
+
+def _unpack_table(data, offset, end):
+    #Names and values of the table at data[offset:end]
+    count, = _COUNT.unpack_from(data, offset)
+    if count == 0:
+        return [], []
+    offset += _COUNT.size
+    values = list(struct.unpack_from("<%di" % count, data, offset))
+    names = data[offset + 4 * count:end].decode("utf-8").split(u"\0")
+    if len(names) != count:
+        raise ValueError("Corrupted table!")
+    return names, values
+
+class Snapshot:
+    """
+    What a saved game holds.
+    """
+    def __init__(self, name, scene, pos, camera, outside_location, facing = 0, ticks = 0,
+                 item_names = (), item_counts = (), flags = None):
+        """
+        :param name: str player name
+        :param scene: str name of the scene the character is in
+        :param pos: [x, y] world position of the character
+        :param camera: [x, y] position of the camera
+        :param outside_location: [x, y] world position to come back to on the map
+        :param facing: int row of the character sprite (0 down, 1 left, 2 right, 3 up)
+        :param ticks: int simulation tick
+        :param item_names: list of the str names of the items carried, in listed order
+        :param item_counts: list of int, how many of each item are carried
+        :param flags: None or dict str -> int
+        """
+        self.name = name
+        self.scene = scene
+        self.pos = pos
+        self.camera = camera
+        self.outside_location = outside_location
+        self.facing = facing
+        self.ticks = ticks
+        self.item_names = item_names
+        self.item_counts = item_counts
+        self.flags = flags if flags is not None else {}
+
+    @classmethod
+    def capture(cls, session):
+        """
+        Copy the state of `session`; cheap enough to call from the frame loop.
+        :param session: session.GameSession
+        :return: Snapshot
+        """
+        simulation = session.simulation
+        inventory = session.character.inventory
+        names = list(inventory.names)
+        return cls(session.name, simulation.current_background, simulation.world_pos(),
+                   list(simulation.camera.position), list(simulation.outside_location),
+                   session.character.row_number, simulation.ticks,
+                   names, list(map(inventory.counts.__getitem__, names)), dict(session.flags))
+
+    def apply(self, session):
+        """
+        Put `session` in the saved state.
+        :param session: session.GameSession of the same player, just created
+        """
+        session.simulation.restore(self.scene, self.pos, self.camera, self.outside_location)
+        session.simulation.ticks = self.ticks
+        session.character.row_number = self.facing
+        session.character.inventory = Inventory.from_table(self.item_names, self.item_counts)
+        session.flags = dict(self.flags)
+
+    def to_bytes(self):
+        name = self.name.encode("utf-8")
+        scene = self.scene.encode("utf-8")
+        inventory = _pack_table(self.item_names, self.item_counts)
+        flags = _pack_table(list(self.flags), list(self.flags.values()))
+        return b"".join([_HEADER.pack(MAGIC, VERSION),
+                         _STATE.pack(self.ticks, self.facing, self.pos[0], self.pos[1],
+                                     self.camera[0], self.camera[1],
+                                     self.outside_location[0], self.outside_location[1],
+                                     len(name), len(scene)),
+                         name, scene,
+                         _BLOCK.pack(INVENTORY, len(inventory)), inventory,
+                         _BLOCK.pack(FLAGS, len(flags)), flags])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        :param data: bytes of a save file
+        :raise: ValueError if `data` is not a save of this version
+        :return: Snapshot
+        """
+        if len(data) < _HEADER.size + _STATE.size:
+            raise ValueError("Too short for a save!")
+        magic, version = _HEADER.unpack_from(data, 0)
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError("Not a version %d save!" % VERSION)
+        (ticks, facing, x, y, camera_x, camera_y, outside_x, outside_y,
+         name_length, scene_length) = _STATE.unpack_from(data, _HEADER.size)
+        offset = _HEADER.size + _STATE.size
+        name = data[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+        scene = data[offset:offset + scene_length].decode("utf-8")
+        offset += scene_length
+
+        blocks = {}
+        while offset + _BLOCK.size <= len(data):
+            tag, length = _BLOCK.unpack_from(data, offset)
+            offset += _BLOCK.size
+            if offset + length > len(data):
+                raise ValueError("Truncated save!")
+            blocks[tag] = (offset, offset + length)
+            offset += length
+        item_names, item_counts = _unpack_table(data, *blocks[INVENTORY]) if INVENTORY in blocks else ([], [])
+        flags = dict(zip(*_unpack_table(data, *blocks[FLAGS]))) if FLAGS in blocks else {}
+        return cls(str(name), str(scene), [x, y], [camera_x, camera_y], [outside_x, outside_y],
+                   facing, ticks, item_names, item_counts, flags)
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: str
+        :raise: ValueError if the file is not a save
+        :return: Snapshot
+        """
+        with open(path, "rb") as source:
+            data = source.read()
+        try:
+            return cls.from_bytes(data)
+        except ValueError as error:
+            raise ValueError("'%s': %s" % (path, error))
+
+def write(path, snapshot):
+    """
+    Replace the save at `path` by `snapshot`, atomically.
+    :param path: str
+    :param snapshot: Snapshot
+    :raise: struct.error if a value does not fit its field,
+            IOError or OSError if the file cannot be written
+    """
+    data = snapshot.to_bytes()
+    handle, tmp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(path)), suffix = ".tmp")
+    try:
+        with os.fdopen(handle, "wb") as save:
+            save.write(data)
+            save.flush()
+            os.fsync(save.fileno())
+        _replace(tmp_path, path)
+    except (IOError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class Autosaver:
+    """
+    Writes snapshots to one save file from a background thread.
+    A snapshot handed over while the previous one is still being written
+    replaces any other one waiting: only the latest is worth writing.
+    """
+    def __init__(self, path):
+        """
+        :param path: str save file
+        """
+        self.path = path
+        self.saves = 0
+        #The last error encoding or writing a snapshot, if any; saving goes on
+        self.error = None
+        self._pending = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def save(self, snapshot):
+        """
+        Write `snapshot` in the background; returns at once.
+        :param snapshot: Snapshot
+        """
+        with self._condition:
+            self._pending = snapshot
+            self._condition.notify()
+
+    def close(self):
+        #Writes the snapshot still waiting, if any, and stops the thread
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while (self._pending is None) and not self._closed:
+                    self._condition.wait()
+                snapshot, self._pending = self._pending, None
+            if snapshot is None:
+                return
+            #A snapshot that cannot be encoded (e.g. a count beyond 32 bits)
+            #is lost, not the thread: the next ones are still written
+            try:
+                write(self.path, snapshot)
+                self.saves += 1
+            except (IOError, OSError, struct.error, ValueError) as error:
+                self.error = error
@@ -0,0 +1,231 @@
+"""
+Scenes described by JSON files, loaded when first entered and evicted
+under a memory budget.
+
+Every scene lives in `<directory>/<name>.json`:
+
+    {
+        "image": "http://i.imgur.com/S55Faqx.jpg",
+        "size": [325, 295],
+        "buildings": [
+            {"name": "counter", "borders": ["upper", 214, 103, 345],
+             "map_end": true, "door": [215, 232],
+             "dialog": ["Hello {name}!", {"action": "mart_buying"}]},
+            {"name": "exit", "borders": [370, 370, 203, 243],
+             "map_end": true, "door": [203, 243], "goto": "map"}
+        ]
+    }
+
+A scene can name a chunk pack instead of an image, `"chunks":
+"overworld.pack"` (relative to the scene directory): its world is then
+drawn from the chunks in view, and can be much larger than an image (see
+chunks.py). A scene with `"music"`, the url of a tune, has it cross-faded
+in when entered; in a scene without, the music keeps playing (see
+sounds.py). The tune is loaded with the scene and dropped with it.
+
+`borders` are `Building.borders`; "upper", "lower", "left" and "right" stand
+for the matching value of `constants.BORDERS`. A building with a `door`
+either starts its `dialog` or enters the scene named by `goto` when the
+character walks up to the door (see `triggers.py`). Dialogs are
+kept as written: the session showing one formats the lines with the player
+name, runs the `{"action": ...}` entries and sets the `{"flag": name}`
+ones (optionally with a `"value"`, 1 by default) in its flags, which are
+saved with the game (see `session.GameSession`), so one SceneManager can
+serve many sessions.
+
+`SceneManager.prefetch()` loads a scene in a background thread ahead of
+time, see `prefetch.DoorPrefetcher`.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from constants import BORDERS
+from simulation import ImageInfo, Building, building_triggers
+from spatial import BuildingIndex
+from chunks import ChunkedWorld
+
+SCENE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes")
+
+#Bytes of decoded images kept for scenes that are not shown
+DEFAULT_MEMORY_BUDGET = 8 * 1024 * 1024
+
+_BORDER_NAMES = {"upper": BORDERS[0], "lower": BORDERS[1], "left": BORDERS[2], "right": BORDERS[3]}
+
+class Scene:
+    """
+    A loaded scene: its background image, its music and its buildings.
+    """
+    def __init__(self, name, image, info, buildings, music = None):
+        self.name = name
+        self.image = image
+        self.info = info
+        self.music = music
+        self.buildings = BuildingIndex(buildings)
+        self.triggers = building_triggers(self.buildings)
+
+    def memory(self):
+        #Estimated bytes of the decoded background image (32 bits per pixel)
+        if self.image is None:
+            return 0
+        if isinstance(self.image, ChunkedWorld):
+            return self.image.memory()
+        try:
+            width, height = self.image.get_width(), self.image.get_height()
+        except AttributeError:
+            width, height = self.info.size
+        return width * height * 4
+
+class SceneManager:
+    """
+    Loads scenes on demand and keeps the most recently entered ones
+    while their images fit in `memory_budget`.
+    When sessions share it, the current scene is the one entered last; a
+    scene evicted while another session is in it stays alive through that
+    session until it leaves.
+    """
+    def __init__(self, load_image = None, directory = SCENE_DIR, memory_budget = DEFAULT_MEMORY_BUDGET,
+                 load_sound = None):
+        """
+        :param load_image: None or function (str url) -> simplegui.Image,
+                           None to run without images (headless)
+        :param directory: str directory of the scene files
+        :param memory_budget: int >= 0, bytes of images kept for scenes
+                              other than the current one
+        :param load_sound: None or function (str url) -> simplegui.Sound
+                           loading the music of scenes, None to run without
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self._load_image = load_image
+        self._load_sound = load_sound
+        self._descriptions = {}
+        self._loaded = OrderedDict()
+        self._prefetching = {}
+        self.current = None
+
+        #Prefetch threads finish while the game runs
+        self._lock = threading.Lock()
+
+        #Counters, to tune the memory budget and the prefetch distance.
+        #A scene entered while its prefetch is still running counts as late.
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetches = 0
+
+    def describe(self, name):
+        """
+        Return the parsed scene file of `name`, read once.
+        :param name: str
+        :raise: IOError if there is no such scene
+        :return: dict
+        """
+        description = self._descriptions.get(name)
+        if description is None:
+            with open(os.path.join(self.directory, name + ".json")) as scene_file:
+                description = json.load(scene_file)
+            self._descriptions[name] = description
+        return description
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def get(self, name):
+        #The scene `name` if it is loaded, else None; unlike load() it changes nothing
+        with self._lock:
+            return self._loaded.get(name)
+
+    def memory(self):
+        #Estimated bytes held by every loaded scene
+        return sum(scene.memory() for scene in self._loaded.values())
+
+    def load(self, name):
+        """
+        Return the scene `name`, loading it if needed, and make it the current one.
+        Least recently entered scenes are then evicted until the others fit
+        in the memory budget.
+        :param name: str
+        :return: Scene
+        """
+        thread = self._prefetching.get(name)
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            scene = self._loaded.pop(name, None)
+        if scene is None:
+            self.misses += 1
+            scene = self._build(name)
+        elif thread is not None:
+            self.late += 1
+        else:
+            self.hits += 1
+        with self._lock:
+            self._loaded[name] = scene
+            self.current = name
+            self._evict()
+        return scene
+
+    def prefetch(self, name):
+        """
+        Start loading the scene `name` in the background, unless it is
+        already loaded or loading. It does not become the current scene.
+        :param name: str
+        :return: bool, True if loading started
+        """
+        with self._lock:
+            if (name in self._loaded) or (name in self._prefetching):
+                return False
+            thread = threading.Thread(target = self._prefetch, args = (name,))
+            thread.daemon = True
+            self._prefetching[name] = thread
+        self.prefetches += 1
+        thread.start()
+        return True
+
+    def _prefetch(self, name):
+        #A failed prefetch is left for `load()` to retry and report
+        try:
+            scene = self._build(name)
+        except Exception:
+            scene = None
+        with self._lock:
+            if (scene is not None) and (name not in self._loaded):
+                self._loaded[name] = scene
+                self._evict()
+            del self._prefetching[name]
+
+    def _evict(self):
+        #Drops least recently used scenes, never the current one
+        kept = sum(scene.memory() for name, scene in self._loaded.items() if name != self.current)
+        for name in list(self._loaded.keys()):
+            if kept <= self.memory_budget:
+                break
+            if name != self.current:
+                kept -= self._loaded.pop(name).memory()
+                self.evictions += 1
+
+    def _build(self, name):
+        description = self.describe(name)
+        width, height = description["size"]
+        image = None
+        if "chunks" in description:
+            if self._load_image is not None:
+                image = ChunkedWorld.open(os.path.join(self.directory, description["chunks"]))
+        elif self._load_image is not None:
+            image = self._load_image(str(description["image"]))
+        music = None
+        if ("music" in description) and (self._load_sound is not None):
+            music = self._load_sound(str(description["music"]))
+        info = ImageInfo([width / 2, height / 2], [width, height], image)
+        buildings = [self._building(entry) for entry in description.get("buildings", [])]
+        return Scene(name, image, info, buildings, music)
+
+    def _building(self, entry):
+        borders = [_BORDER_NAMES[value] if value in _BORDER_NAMES else value
+                   for value in entry["borders"]]
+        scene = entry.get("goto")
+        return Building(borders, entry.get("map_end", False), entry.get("door"), entry.get("dialog"),
+                        scene = None if scene is None else str(scene))
@@ -0,0 +1,190 @@
+"""
+One scheduler for every timer of the game, run from the main loop.
+
+SimpleGUI timers each wake up on their own (SimpleGUICS2Pygame starts a
+thread per firing) and call their handler while the draw handler may be
+running. Tasks of a `Scheduler` run when the main loop calls `run_due()`,
+from the draw handler, so there is a single wakeup source and handlers
+never overlap.
+
+Tasks have the interface of a simplegui timer (`start()`, `stop()`,
+`is_running()`), so they can be handed to code written for one:
+
+    walk_timer = scheduler.every(150, animate_walk)
+    walk_timer.start()
+
+A periodic task that fell behind (a slow frame) runs once per missed
+period, up to `MAX_CATCH_UP` times, so walk cycles keep their pace under
+load. Tasks due within `COALESCE` seconds of each other
+run in the same wakeup.
+"""
+import heapq
+import time
+
+#Missed periods a task makes up for at once; beyond that they are dropped
+MAX_CATCH_UP = 5
+
+#Tasks due this close to now run in the current wakeup, in seconds
+COALESCE = 0.004
+
+class Task:
+    """
+    A handler run periodically or once, stopped until started.
+    """
+    def __init__(self, scheduler, interval, handler, repeat = True):
+        """
+        :param scheduler: Scheduler
+        :param interval: (int or float) > 0 milliseconds between runs, or before the run
+        :param handler: function () -> *
+        :param repeat: bool, False to run once
+        """
+        self.scheduler = scheduler
+        self.interval = interval
+        self.handler = handler
+        self.repeat = repeat
+        self.running = False
+        self._generation = 0
+
+    def start(self):
+        #Does nothing if already running, like a simplegui timer
+        if not self.running:
+            self.running = True
+            self._generation += 1
+            self.scheduler._push(self, self.scheduler.clock() + self.interval / 1000.0)
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self._generation += 1
+
+    def is_running(self):
+        return self.running
+
+class Scheduler:
+    """
+    Runs the due tasks whenever the main loop calls `run_due()`.
+    """
+    def __init__(self, clock = time.time, max_catch_up = MAX_CATCH_UP, coalesce = COALESCE):
+        """
+        :param clock: function () -> float seconds
+        :param max_catch_up: int > 0, see MAX_CATCH_UP
+        :param coalesce: float >= 0 seconds, see COALESCE
+        """
+        self.clock = clock
+        self.max_catch_up = max_catch_up
+        self.coalesce = coalesce
+        self.paused = False
+        self.wakeups = 0
+        self.runs = 0
+        self._queue = []
+        self._count = 0
+        self._paused_at = None
+
+    def every(self, interval, handler):
+        """
+        :param interval: (int or float) > 0 milliseconds
+        :param handler: function () -> *
+        :return: Task running `handler` every `interval` once started
+        """
+        return Task(self, interval, handler)
+
+    def after(self, delay, handler):
+        """
+        :param delay: (int or float) > 0 milliseconds
+        :param handler: function () -> *
+        :return: started Task running `handler` once, in `delay`
+        """
+        task = Task(self, delay, handler, repeat = False)
+        task.start()
+        return task
+
+    def _push(self, task, due):
+        #The generation tells apart entries left behind by stop() and start()
+        self._count += 1
+        heapq.heappush(self._queue, (due, self._count, task._generation, task))
+
+    def _drop_stale(self):
+        queue = self._queue
+        while queue and (queue[0][2] != queue[0][3]._generation):
+            heapq.heappop(queue)
+
+    def pause(self):
+        #Nothing runs until `resume()`; the time paused does not count
+        if not self.paused:
+            self.paused = True
+            self._paused_at = self.clock()
+
+    def resume(self):
+        if self.paused:
+            shift = self.clock() - self._paused_at
+            self._queue = [(due + shift, count, generation, task)
+                           for due, count, generation, task in self._queue]
+            heapq.heapify(self._queue)
+            self.paused = False
+
+    def next_due(self):
+        """
+        :return: None when no task is running, else the time the next one is due
+        """
+        self._drop_stale()
+        if self.paused or not self._queue:
+            return None
+        return self._queue[0][0]
+
+    def idle_time(self, now = None):
+        """
+        :return: None when no task is running, else seconds until the next one is due (0 if overdue)
+        """
+        due = self.next_due()
+        if due is None:
+            return None
+        return max(0.0, due - (self.clock() if now is None else now))
+
+    def sleep(self, longest):
+        """
+        For loops of their own: sleep until the next task is due, at most `longest` seconds.
+        :param longest: float seconds
+        """
+        idle = self.idle_time()
+        time.sleep(longest if idle is None else min(idle, longest))
+
+    def run_due(self, now = None):
+        """
+        Run every task due by `now`.
+        :param now: None for the clock, or float seconds
+        :return: int handler calls made
+        """
+        queue = self._queue
+        if self.paused or not queue:
+            return 0
+        now = self.clock() if now is None else now
+        horizon = now + self.coalesce
+        if queue[0][0] > horizon:
+            return 0
+        self.wakeups += 1
+        calls = 0
+        while queue and queue[0][0] <= horizon:
+            due, count, generation, task = heapq.heappop(queue)
+            if generation != task._generation:
+                continue
+            interval = task.interval / 1000.0
+            if not task.repeat:
+                runs = 1
+                task.running = False
+                task._generation += 1
+            else:
+                #Missed periods are made up for, but never pile up
+                runs = int(max(0.0, now - due) / interval) + 1
+                if runs > self.max_catch_up:
+                    runs = self.max_catch_up
+                    self._push(task, now + interval)
+                else:
+                    self._push(task, due + runs * interval)
+            for _ in range(runs):
+                task.handler()
+                calls += 1
+                if task._generation != generation:
+                    #Stopped (or restarted) by a handler
+                    break
+        self.runs += calls
+        return calls
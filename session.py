@@ -0,0 +1,328 @@
+"""
+The state of one game: the character and its world, the dialog being
+shown, the menus and the key handling.
+
+A `GameSession` does not draw and never touches SimpleGUI, so one process
+can run many of them side by side (bots, soak tests) sharing a
+`scenes.SceneManager`. The window in game.py drives a single session and
+draws it.
+"""
+import time
+
+from simulation import Character, ImageInfo, Simulation, TICK, WALK_SPEED, RUN_SPEED
+from prefetch import DoorPrefetcher
+from replay import IdleTimer
+from items import Catalog, ListView
+
+#Key codes of CodeSkulptor and SimpleGUICS2Pygame
+DEFAULT_KEY_MAP = dict([(chr(code).lower(), code) for code in range(ord('A'), ord('Z') + 1)]
+                       + [('space', 32), ('left', 37), ('up', 38), ('right', 39), ('down', 40)])
+
+#Typewriter speed of the dialogs
+CHARS_PER_SECOND = 50
+
+#Room for text in the textbox, in pixels
+TEXT_WIDTH = 420
+
+#Advance of a 14 pixel monospace glyph, when no font measures the text
+GLYPH_WIDTH = 8.4
+
+#Rows of items that fit in the mart and inventory panels
+PANEL_ROWS = 19
+
+class Dialog:
+    """
+    Implements the usage of messages and dialogue throughout the game.
+    Lines are shown two at a time with a typewriter effect; functions in the
+    list are actions, run once the text before them has been shown.
+
+    Lines too wide for the textbox are wrapped when the dialog is created,
+    so a page is always the two entries at `dialog_place`. How much of a
+    page is shown follows from the time it has been up, read on `clock`
+    by `update()`: the text comes in at CHARS_PER_SECOND however irregular
+    the calls are.
+    """
+    def __init__(self, dialog_list, clock = time.time, measure = None, width = TEXT_WIDTH):
+        """
+        :param dialog_list: list of str and functions () -> *, str are upper-cased
+        :param clock: function () -> float seconds
+        :param measure: None (GLYPH_WIDTH per character) or function (str) -> list of the x offset after each character
+        :param width: (int or float) > 0 pixels a line may take
+        """
+        self.clock = clock
+        self.measure = measure if measure is not None else _fixed_width
+        self.width = width
+        self.dialog = []
+        self.dialog_place = 0
+        self.l1_textscroller = 0
+        self.l2_textscroller = 0
+        self.actions_run = set()
+        self._shown_at = clock()
+        self.extend(dialog_list)
+
+    def extend(self, dialog_list):
+        """
+        Add lines and actions at the end of the dialog.
+        :param dialog_list: list of str and functions () -> *
+        """
+        for line in dialog_list:
+            if type(line) is str:
+                self.dialog.extend(wrap(line.upper(), self.measure, self.width))
+            else:
+                self.dialog.append(line)
+
+    def go_to(self, place):
+        """
+        Show the page starting at entry `place`, from its first character.
+        :param place: int
+        """
+        self.dialog_place = place
+        self._shown_at = self.clock()
+        self._reveal()
+
+    def next_lines(self):
+        #Moves on to the next two lines
+        self.go_to(self.dialog_place + 2)
+
+    def reveal(self):
+        #Shows the whole page at once
+        self._shown_at = None
+        self._reveal()
+
+    def is_revealed(self):
+        return (self.l1_textscroller >= self._length(self.dialog_place)
+                and self.l2_textscroller >= self._length(self.dialog_place + 1))
+
+    def _length(self, place):
+        #Characters of entry `place`, 0 for an action or past the end
+        if place < len(self.dialog) and type(self.dialog[place]) is str:
+            return len(self.dialog[place])
+        return 0
+
+    def _reveal(self):
+        #The second line starts once the first one is out
+        first = self._length(self.dialog_place)
+        second = self._length(self.dialog_place + 1)
+        if self._shown_at is None:
+            count = first + second
+        else:
+            count = int((self.clock() - self._shown_at) * CHARS_PER_SECOND) + 1
+        self.l1_textscroller = min(count, first)
+        self.l2_textscroller = max(0, min(count - first, second))
+
+    def update(self):
+        #Reveals the text for the time the page has been up, then runs the
+        #actions (functions) in the dialog list.
+        #An action runs once, when the text before it has been fully shown.
+        self._reveal()
+        dialog_place = self.dialog_place
+        for place in (dialog_place, dialog_place + 1):
+            if (place < len(self.dialog)) and callable(self.dialog[place]) and (place not in self.actions_run):
+                if place == dialog_place + 1 and type(self.dialog[dialog_place]) is str and self.l1_textscroller < len(self.dialog[dialog_place]):
+                    continue
+                self.actions_run.add(place)
+                self.dialog[place]()
+
+def _fixed_width(text):
+    return [GLYPH_WIDTH * (i + 1) for i in range(len(text))]
+
+def wrap(text, measure, width):
+    """
+    Split `text` into lines no wider than `width`, at spaces when possible.
+    :param text: str
+    :param measure: function (str) -> list of the x offset after each character
+    :param width: (int or float) > 0 pixels
+    :return: list of str, at least one
+    """
+    offsets = measure(text)
+    lines = []
+    start = 0
+    while offsets and offsets[-1] - (offsets[start - 1] if start else 0) > width:
+        left = offsets[start - 1] if start else 0
+        end = start
+        while end < len(text) and offsets[end] - left <= width:
+            end += 1
+        #Breaks at the last space that fits, or inside a word longer than a line
+        cut = text.rfind(" ", start, end + 1)
+        if cut <= start:
+            cut = max(end, start + 1)
+            lines.append(text[start:cut])
+            start = cut
+        else:
+            lines.append(text[start:cut])
+            start = cut + 1
+    lines.append(text[start:])
+    return lines
+
+class GameSession:
+    """
+    One player in the world, from the end of the introduction on.
+    """
+    def __init__(self, name, scenes, items, character_image = None, character_info = None,
+                 key_map = DEFAULT_KEY_MAP, walk_timer = None, measure_text = None):
+        """
+        :param name: str player name
+        :param scenes: scenes.SceneManager, may be shared between sessions
+        :param items: iterable of items.Item sold at the mart
+        :param character_image: None or simplegui.Image of the character (None when headless)
+        :param character_info: None or simulation.ImageInfo of one frame of the character (64x64 by default)
+        :param key_map: dict key name -> key code
+        :param walk_timer: None or timer calling `animate_walk()`
+        :param measure_text: None or function (str) -> list of x offsets, see `Dialog`
+        """
+        self.name = name
+        self.key_map = key_map
+        self.items = Catalog(items)
+        self.walk_timer = walk_timer if walk_timer is not None else IdleTimer()
+        self.measure_text = measure_text
+
+        #Functions that dialogs of the scene files can run, by name
+        self.actions = {"mart_buying": self.mart_buying}
+
+        #Creates the character
+        if character_info is None:
+            character_info = ImageInfo([32, 32], [64, 64], character_image)
+        self.character = Character(character_image, character_info, name)
+
+        #The simulation owns the character position, map scrolling and building collisions
+        self.simulation = Simulation.from_scenes(self.character, scenes, "map")
+        self.simulation.prefetcher = DoorPrefetcher(scenes)
+        self.simulation.on_dialog = self.start_dialog
+
+        #Asserts that a dialog box, inventory screen, buying screen, etc. will be shown at initialization
+        self.dialog = None
+        self._dialog_source = None
+        self.inventory_shown = False
+        self.buying = False
+        self.mart_view = ListView(PANEL_ROWS)
+        self.inventory_view = ListView(PANEL_ROWS)
+
+        #Story progress by name (badges, people met...), kept in saved games
+        self.flags = {}
+
+    def start_dialog(self, dialog_list):
+        """
+        Show the dialog of a scene file: lines are formatted with the
+        player name, {"action": name} entries become `actions` and
+        {"flag": name} entries set a flag.
+        Walking away from a person and back while they are still talking
+        keeps the dialog already shown for the same list.
+        :param dialog_list: list of str and dict
+        """
+        if (self.dialog is not None) and (self._dialog_source is dialog_list):
+            return
+        self._dialog_source = dialog_list
+        self.dialog = Dialog([self._dialog_entry(line) for line in dialog_list], self.clock, self.measure_text)
+
+    def _dialog_entry(self, line):
+        #An entry of a scene file's dialog as the Dialog shows or runs it
+        if not isinstance(line, dict):
+            return str(line.format(name = self.name))
+        if "flag" in line:
+            return lambda: self.set_flag(line["flag"], line.get("value", 1))
+        return self.actions[line["action"]]
+
+    def set_flag(self, name, value = 1):
+        """
+        :param name: str
+        :param value: int, fitting in 32 bits to be saved
+        """
+        self.flags[name] = value
+
+    def clock(self):
+        #Simulation time in seconds, so dialogs come in the same way in a replay
+        return self.simulation.ticks * TICK
+
+    def mart_buying(self):
+        self.mart_view.reset()
+        self.buying = True
+
+    def step(self, dt):
+        """
+        Advance the world by `dt` seconds, then run the dialog's actions.
+        :param dt: (int or float) >= 0
+        :return: int number of ticks run
+        """
+        ticks = self.simulation.step(dt)
+        if self.dialog is not None:
+            self.update_dialog()
+        return ticks
+
+    def tick(self):
+        #Runs one fixed tick of the world, then the dialog's actions
+        self.simulation.tick()
+        if self.dialog is not None:
+            self.update_dialog()
+
+    def update_dialog(self):
+        #Reveals the text and runs the actions of the dialog shown
+        self.dialog.update()
+
+    def animate_walk(self):
+        #Controls walking animation
+        character = self.character
+        character.col += 1
+        if character.col == 4:
+            character.col = 0
+
+    def key_down(self, key):
+        #Key down handler; primarily controls movement.
+        keys = self.key_map
+        character = self.character
+        if (self.dialog is not None) and key != keys['space']:
+            self.dialog = None
+        if key == keys['space']:
+            if self.dialog is not None:
+                self.dialog.next_lines()
+            elif not self.buying:
+                self.simulation.interact()
+        if self.buying:
+            if key == keys['x']:
+                self.buying = False
+            if key == keys['up']:
+                self.mart_view.move(-1, len(self.items))
+            if key == keys['down']:
+                self.mart_view.move(1, len(self.items))
+        else:
+            if key == keys['i']:
+                self.inventory_shown = True
+            if key == keys['z']:
+                character.speed = RUN_SPEED
+            if key == keys['left']:
+                self.simulation.moving_left = True
+                self.walk_timer.start()
+            elif key == keys['right']:
+                self.simulation.moving_right = True
+                self.walk_timer.start()
+            elif key == keys['up']:
+                character.walk_up()
+                self.walk_timer.start()
+            elif key == keys['down']:
+                character.walk_down()
+                self.walk_timer.start()
+
+    def key_up(self, key):
+        #Stops walking animation and stops movement.
+        keys = self.key_map
+        character = self.character
+        if key == keys['i']:
+            self.inventory_shown = False
+        if key == keys['z']:
+            character.speed = WALK_SPEED
+        if key == keys['left']:
+            self.simulation.moving_left = False
+            self.walk_timer.stop()
+            character.vel[0] = 0
+        if key == keys['right']:
+            self.simulation.moving_right = False
+            self.walk_timer.stop()
+            character.vel[0] = 0
+        if key == keys['up'] or key == keys['down']:
+            character.vel[1] = 0
+            self.walk_timer.stop()
+
+    def final_state(self):
+        #What a replay has to reproduce
+        return {"pos": self.simulation.world_pos(),
+                "current_background": self.simulation.current_background,
+                "inventory": self.character.inventory.entries()}
@@ -0,0 +1,381 @@
+"""
+Headless game state for the overworld and building interiors.
+
+Nothing in this module imports SimpleGUI, so the simulation can be stepped
+thousands of times per second for soak tests and AI playtesting. The game
+renders the same `Simulation` object read-only from its draw handler.
+"""
+from constants import WIDTH, HEIGHT, BORDERS
+from spatial import BuildingIndex
+from triggers import Trigger, TriggerIndex, TriggerWatch, NO_TRIGGERS
+from collision import sweep
+from sprites import SpriteSheet
+from items import Inventory
+from camera import Camera
+
+TICKS_PER_SECOND = 60
+TICK = 1.0 / TICKS_PER_SECOND
+
+#Upper bound on ticks run by a single `Simulation.step()` so a long stall
+#(window dragged, debugger pause) does not freeze the game catching up.
+MAX_CATCH_UP_TICKS = 10
+
+#Pixels per tick when walking and when running
+WALK_SPEED = 1
+RUN_SPEED = 3
+
+class ImageInfo:
+    """
+    Processes image information
+    """
+    def __init__(self, center, size, image, animated = False, lifespan = 0):
+        self.center = center
+        self.size = size
+        self.image = image
+
+    def get_center(self):
+        return self.center
+
+    def get_size(self):
+        return self.size
+
+    def draw(self, canvas, location):
+        canvas.draw_image(self.image, self.center, self.size, location, self.size)
+
+class Character:
+    """
+    Enables character movement and proper image display
+    """
+    def __init__(self, tiled_image, image_info, name, inventory = None):
+        self.tiled_image = tiled_image
+        self.image_info = image_info
+        self.row_number = 0
+        self.image_center = image_info.get_center()
+        self.image_size = image_info.get_size()
+        self.pos = [WIDTH / 2, HEIGHT / 2]
+        self.vel = [0, 0]
+        self.col = 0
+        self.speed = WALK_SPEED
+        self.name = name
+        self.inventory = inventory if inventory is not None else Inventory()
+
+        #Walk frames are sliced and scaled once, shared by every character using the image
+        self.sprites = SpriteSheet.get(tiled_image, self.image_size,
+                                       [self.image_size[0] / 1.5, self.image_size[1] / 1.5])
+
+    def walk_down(self):
+        self.row_number = 0
+        self.vel[1] = 1
+
+    def walk_left(self):
+        self.row_number = 1
+        self.vel[0] = -1
+
+    def walk_right(self):
+        self.row_number = 2
+        self.vel[0] = 1
+
+    def walk_up(self):
+        self.row_number = 3
+        self.vel[1] = -1
+
+    def draw(self, canvas):
+        #Ensures the proper subset of the tiled image is shown based on character direction
+        self.sprites.draw(canvas, self.col, self.row_number, self.pos)
+
+    def velocity(self):
+        #Displacement for one tick; `vel` only holds the walking direction
+        return [self.vel[0] * self.speed, self.vel[1] * self.speed]
+
+class Building:
+    """
+    Prevents the character from walking on top of buildings, trees, etc.
+    """
+    def __init__(self, borders, map_end = False, door = None, interactive = None, map_change_info = [], scene = None):
+        self.borders = borders #upper = self.borders[0], lower = self.borders[1], left = self.borders[2], right = self.borders[3]
+        self.interactive = interactive
+        self.map_end = map_end
+        self.door = door
+        self.map_change_info = map_change_info #map_change_info[0] = map ; map_change_info[1] = map_info ; map_change_info[2] = map_string
+        self.scene = scene #name of the scene entered through the door, loaded by the world's SceneManager
+
+    def trigger(self):
+        """
+        The door of the building as a trigger volume: within a pixel of the
+        lower edge, between the door's left and right.
+        :return: None or triggers.Trigger
+        """
+        if self.door is None:
+            return None
+        lower = self.borders[1]
+        return Trigger([lower - 1, lower + 1, self.door[0], self.door[1]], self.enter,
+                       on_interact = None if self.interactive is None else self.interact)
+
+    def enter(self, world):
+        #Walking to the door changes the map or initiates a dialogue sequence
+        if self.scene is not None:
+            world.enter_scene(self.scene)
+        elif self.interactive is None:
+            world.map_change(self.map_change_info[0], self.map_change_info[2], self.map_change_info[1])
+        else:
+            world.start_dialog(self.interactive)
+
+    def interact(self, world):
+        #Talking to the person again, or reading the sign again
+        world.start_dialog(self.interactive)
+
+def building_triggers(buildings):
+    #Compiles the doors of `buildings` into a TriggerIndex
+    triggers = [building.trigger() for building in buildings]
+    return TriggerIndex([trigger for trigger in triggers if trigger is not None])
+
+def interior_borders(map_info):
+    #Walkable area of a building interior in screen coordinates: upper, lower, left, right
+    center = map_info.get_center()
+    return [(HEIGHT / 2) - center[1] + 80, center[1] + (HEIGHT / 2),
+            (WIDTH / 2) - center[0] + 3, (WIDTH / 2) + center[0] - 3]
+
+def interior_entry(map_info):
+    #Screen position of the character when it walks into a building
+    return [WIDTH / 2, map_info.center[1] + (HEIGHT / 2) - 20]
+
+def view_bounds(scene, map_info, image = None):
+    """
+    Range of the camera position in `scene`: the overworld scrolls across
+    its image, interiors do not scroll.
+    :param scene: str scene name
+    :param map_info: ImageInfo of the scene, the size of the view
+    :param image: None or image of the scene, to scroll over its whole size
+                  (without it, the overworld image is taken as twice as wide as the view)
+    :return: [left, top, right, bottom]
+    """
+    if scene != "map":
+        return [WIDTH / 2, HEIGHT / 2, WIDTH / 2, HEIGHT / 2]
+    width, height = 2 * map_info.size[0], map_info.size[1]
+    if (image is not None) and (image.get_width() > 0):
+        width, height = image.get_width(), image.get_height()
+    center, size = map_info.center, map_info.size
+    return [center[0], center[1],
+            max(center[0], width - size[0] + center[0]), max(center[1], height - size[1] + center[1])]
+
+def world_bounds(borders, view):
+    """
+    The walkable area `borders` translated to world coordinates (see
+    `Simulation.world_pos`), for every camera position in `view`.
+    :param borders: [upper, lower, left, right] in screen coordinates
+    :param view: [left, top, right, bottom] range of the camera position, see `view_bounds`
+    :return: [upper, lower, left, right]
+    """
+    upper, lower, left, right = borders
+    return [upper + view[1] - HEIGHT / 2, lower + view[3] - HEIGHT / 2,
+            left + view[0] - WIDTH / 2, right + view[2] - WIDTH / 2]
+
+def border_control(building_set, world):
+    #Moves the character for one tick without entering any of the buildings
+    character = world.character
+    pos, blocked_x, blocked_y = sweep(world.world_pos(), character.velocity(),
+                                      [item.borders for item in building_set], world.world_bounds())
+    if blocked_x:
+        character.vel[0] = 0
+    if blocked_y:
+        character.vel[1] = 0
+    world.set_world_pos(pos)
+
+class Simulation:
+    """
+    Owns the character position, the camera and building collisions.
+    The game only reads from it when drawing.
+    """
+    def __init__(self, character, building_sets, background_image, background_info, current_background = "map"):
+        """
+        :param character: Character
+        :param building_sets: dict scene name -> iterable of Building
+        :param background_image: image of the starting scene (None when headless)
+        :param background_info: ImageInfo of the starting scene
+        :param current_background: str name of the starting scene
+        """
+        self.character = character
+
+        #Each scene's buildings are compiled into a spatial index once,
+        #and their doors into trigger volumes
+        self.building_sets = dict((scene, BuildingIndex(buildings))
+                                  for scene, buildings in building_sets.items())
+        self.trigger_sets = dict((scene, building_triggers(buildings))
+                                 for scene, buildings in self.building_sets.items())
+        self.current_background = current_background
+        self.background_image = background_image
+        self.background_info = background_info
+        self.borders = list(BORDERS)
+
+        #Scrolls the map with the character; starts at the right end of the map
+        self.camera = Camera([WIDTH, HEIGHT], view_bounds(current_background, background_info, background_image))
+
+        #World position of the character before it went inside a building
+        self.outside_location = self.world_pos()
+
+        self.moving_left = False
+        self.moving_right = False
+        self.ticks = 0
+
+        #Called with the dialog list whenever the character walks into a person or sign
+        self.on_dialog = None
+
+        #SceneManager loading the scenes entered through doors, see `from_scenes()`
+        self.scenes = None
+
+        #Optional prefetch.DoorPrefetcher, updated after every tick
+        self.prefetcher = None
+
+        #Optional profiler.FrameProfiler timing border_control and the triggers
+        self.profiler = None
+
+        self._accumulator = 0.0
+
+        #The trigger volumes the character is in
+        self.triggers = TriggerWatch(self.trigger_sets.get(current_background, NO_TRIGGERS), self.world_pos())
+
+    @classmethod
+    def from_scenes(cls, character, scenes, start = "map"):
+        """
+        Build a simulation whose scenes are loaded by `scenes` as they are entered.
+        :param character: Character
+        :param scenes: scenes.SceneManager
+        :param start: str name of the starting scene
+        :return: Simulation
+        """
+        scene = scenes.load(start)
+        simulation = cls(character, {}, scene.image, scene.info, start)
+        simulation.scenes = scenes
+        simulation.building_sets[start] = scene.buildings
+        simulation.trigger_sets[start] = scene.triggers
+        simulation.triggers = TriggerWatch(scene.triggers, simulation.world_pos())
+        return simulation
+
+    def step(self, dt):
+        """
+        Advance by `dt` seconds of wall time, running as many fixed ticks as fit.
+        The remainder is carried over to the next call.
+        :param dt: (int or float) >= 0
+        :return: int number of ticks run
+        """
+        self._accumulator += dt
+        ticks = int(self._accumulator / TICK)
+        self._accumulator -= ticks * TICK
+        if ticks > MAX_CATCH_UP_TICKS:
+            ticks = MAX_CATCH_UP_TICKS
+        self.step_n(ticks)
+        return ticks
+
+    def step_n(self, n):
+        """
+        Run exactly `n` fixed ticks.
+        :param n: int >= 0
+        """
+        for _ in range(n):
+            self.tick()
+
+    def tick(self):
+        #Moves the character; the map scrolls whenever the character is in the middle of it
+        character = self.character
+        if self.moving_left:
+            character.walk_left()
+        elif self.moving_right:
+            character.walk_right()
+
+        #Controls the borders of the objects near the character
+        started = self.profiler.start() if self.profiler is not None else None
+        index = self.building_sets.get(self.current_background)
+        if index is not None:
+            border_control(index.along(self.world_pos(), character.velocity()), self)
+        else:
+            border_control((), self)
+        if started is not None:
+            self.profiler.stop("border_control", started)
+
+        #Doors, people and signs react when the character walks into them
+        started = self.profiler.start() if self.profiler is not None else None
+        self.triggers.update(self, self.world_pos())
+        if started is not None:
+            self.profiler.stop("triggers", started)
+        if self.prefetcher is not None:
+            self.prefetcher.update(self)
+        self.ticks += 1
+
+    def world_pos(self):
+        """
+        Position of the character in world coordinates, the frame every
+        `Building.borders` box is given in. On the overworld that is the
+        position in the map image (buildings at the top left of the map,
+        where the camera stops, line up with the screen); inside buildings
+        it is the screen position.
+        :return: [x, y]
+        """
+        return self.camera.to_world(self.character.pos)
+
+    def set_world_pos(self, pos):
+        #Moves the character, then the camera follows it for one tick
+        self.camera.follow(pos, TICK)
+        screen = self.camera.to_screen(pos)
+        self.character.pos[0] = screen[0]
+        self.character.pos[1] = screen[1]
+
+    def world_bounds(self):
+        """
+        `borders` translated to world coordinates.
+        :return: [upper, lower, left, right]
+        """
+        return world_bounds(self.borders, self.camera.bounds)
+
+    def start_dialog(self, dialog_list):
+        if self.on_dialog is not None:
+            self.on_dialog(dialog_list)
+
+    def interact(self):
+        #The interact key was pressed: talk to whoever the character is in front of
+        self.triggers.interact(self)
+
+    def enter_scene(self, name):
+        #Loads the scene `name` if needed and moves the character into it
+        scene = self.scenes.load(name)
+        self.building_sets = {name: scene.buildings}
+        self.trigger_sets = {name: scene.triggers}
+        self.map_change(scene.image, name, scene.info)
+
+    def map_change(self, map, map_string, map_info):
+        #Changes the background map
+        moving_object = self.character
+        if map_string != "map":
+            self.outside_location = self.world_pos()
+        self.current_background = map_string
+        self.background_image = map
+        self.background_info = map_info
+        camera = self.camera
+        camera.bounds = view_bounds(map_string, map_info, map)
+        if map_string == "map":
+            #Back where the character left, with the camera on it
+            camera.center_on(self.outside_location)
+            moving_object.pos = camera.to_screen(self.outside_location)
+            self.borders = list(BORDERS)
+        else:
+            camera.center_on([WIDTH / 2, HEIGHT / 2])
+            self.borders = interior_borders(map_info)
+            moving_object.pos = interior_entry(map_info)
+
+        #The character arrives standing in the scene's triggers, not entering them
+        self.triggers = TriggerWatch(self.trigger_sets.get(map_string, NO_TRIGGERS), self.world_pos())
+
+    def restore(self, scene, pos, camera_position, outside_location):
+        """
+        Put the character back where a saved game left it.
+        :param scene: str name of the scene, loaded by `scenes` if needed
+        :param pos: [x, y] world position of the character
+        :param camera_position: [x, y] of the camera
+        :param outside_location: [x, y] world position to come back to on the map
+        """
+        if scene != self.current_background:
+            self.enter_scene(scene)
+        self.camera.position = self.camera.clamp(camera_position)
+        self.camera.velocity = [0.0, 0.0]
+        self.character.pos = self.camera.to_screen(pos)
+        self.outside_location = list(outside_location)
+        self.triggers = TriggerWatch(self.trigger_sets.get(scene, NO_TRIGGERS), self.world_pos())
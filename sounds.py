@@ -0,0 +1,193 @@
+"""
+Sound effects and music, played through channels with their own volume
+and their own limit of sounds playing at once.
+
+An effect is added once, with the number of voices it may play on: the
+voices are copies of the loaded sound sharing its decoded data (with
+SimpleGUICS2Pygame), so playing it again and again, like the A button
+while mashing through a dialog, reuses them instead of loading or
+creating anything. An effect played while its channel already has as many
+voices playing as it allows is dropped.
+
+Music plays on its own channel. `play_music()` cross-fades from the tune
+playing to the new one over `MUSIC_FADE` seconds; `update()`, called every
+frame, moves the fades along.
+
+    sounds = SoundManager()
+    sounds.add_effect("A-button", loader.get_sound("A-button"), "ui")
+    sounds.play("A-button")
+    sounds.play_music(loader.get_sound("Welcome"))
+"""
+import copy
+import time
+
+#Effects playing at once on each channel
+CHANNEL_LIMITS = {"sfx": 4, "ui": 2}
+
+#Seconds a cross-fade between two tunes takes
+MUSIC_FADE = 1.0
+
+#Seconds an effect is taken to last when its length cannot be read
+DEFAULT_EFFECT_LENGTH = 0.5
+
+def _length(sound):
+    #Seconds `sound` lasts, when the backend tells (SimpleGUICS2Pygame)
+    try:
+        length = sound._get_length()
+    except AttributeError:
+        return None
+    return length if length > 0 else None
+
+class _Voice:
+    #One playable copy of an effect
+    def __init__(self, sound):
+        self.sound = sound
+        self.ends = 0
+        self.volume = None
+
+    def set_volume(self, volume):
+        #Only calls the backend when the volume changes
+        if volume != self.volume:
+            self.volume = volume
+            self.sound.set_volume(volume)
+
+class _Effect:
+    def __init__(self, channel, voices, length):
+        self.channel = channel
+        self.voices = voices
+        self.length = length
+
+class SoundManager:
+    """
+    The game's effects and music, and the volume of each channel.
+    """
+    def __init__(self, clock = time.time, limits = CHANNEL_LIMITS, fade = MUSIC_FADE):
+        """
+        :param clock: function () -> float seconds
+        :param limits: dict effect channel name -> int > 0 voices playing at once
+        :param fade: (int or float) >= 0 seconds of a music cross-fade
+        """
+        self.clock = clock
+        self.limits = dict(limits)
+        self.fade = fade
+        self.master_volume = 1.0
+        self.volumes = dict((channel, 1.0) for channel in list(limits) + ["music"])
+        self.music = None
+        self.played = 0
+        self.dropped = 0
+        self._effects = {}
+        self._playing = dict((channel, []) for channel in limits)
+
+        #Tunes fading in or out: [voice, start volume, end volume, start time, seconds]
+        self._fades = []
+
+    def add_effect(self, name, sound, channel = "sfx", voices = 2, length = None):
+        """
+        :param name: str the effect is played by
+        :param sound: simplegui.Sound, loaded
+        :param channel: str, a key of `limits`
+        :param voices: int > 0 times the effect can play at once
+        :param length: None to read it from the sound, or seconds the effect lasts
+        """
+        if length is None:
+            length = _length(sound) or DEFAULT_EFFECT_LENGTH
+        pool = [_Voice(sound)] + [_Voice(copy.copy(sound)) for _ in range(voices - 1)]
+        self._effects[name] = _Effect(channel, pool, length)
+
+    def channel_volume(self, channel):
+        return self.master_volume * self.volumes[channel]
+
+    def set_volume(self, channel, volume):
+        """
+        :param channel: str, "music" or a key of `limits`
+        :param volume: float, 0 to 1
+        """
+        self.volumes[channel] = volume
+        self._apply_volumes()
+
+    def set_master_volume(self, volume):
+        #Scales every channel; volume: float, 0 to 1
+        self.master_volume = volume
+        self._apply_volumes()
+
+    def _apply_volumes(self):
+        #Voices get the new volume when played; the music right away
+        music = self.channel_volume("music")
+        for fade in self._fades:
+            fade[2] = music if fade[2] > 0 else 0
+        if (self.music is not None) and not self._fading(self.music):
+            self.music.set_volume(music)
+
+    def _busy(self, channel, now):
+        #Voices of `channel` still playing, forgetting the ones that ended
+        playing = [voice for voice in self._playing[channel] if voice.ends > now]
+        self._playing[channel] = playing
+        return playing
+
+    def play(self, name):
+        """
+        Play the effect `name` on a free voice.
+        :param name: str
+        :return: bool, False if the effect was dropped, its voices or its channel being all busy
+        """
+        effect = self._effects[name]
+        now = self.clock()
+        busy = self._busy(effect.channel, now)
+        if len(busy) < self.limits[effect.channel]:
+            for voice in effect.voices:
+                if voice.ends <= now:
+                    voice.set_volume(self.channel_volume(effect.channel))
+                    voice.sound.play()
+                    voice.ends = now + effect.length
+                    busy.append(voice)
+                    self.played += 1
+                    return True
+        self.dropped += 1
+        return False
+
+    def play_music(self, sound, fade = None):
+        """
+        Cross-fade to `sound`, unless it is already the music playing.
+        :param sound: simplegui.Sound
+        :param fade: None for `fade`, or seconds
+        """
+        if (self.music is not None) and (self.music.sound is sound):
+            return
+        fade = self.fade if fade is None else fade
+        now = self.clock()
+        #A tune taken back while it fades out fades in again from where it got
+        volume = 0
+        for entry in self._fades:
+            if entry[0].sound is sound:
+                volume = entry[0].volume
+        self._fades = [entry for entry in self._fades
+                       if (entry[0] is not self.music) and (entry[0].sound is not sound)]
+        if self.music is not None:
+            self._fades.append([self.music, self.music.volume, 0, now, fade])
+        self.music = _Voice(sound)
+        self.music.set_volume(volume)
+        sound.play()
+        self._fades.append([self.music, volume, self.channel_volume("music"), now, fade])
+        self.update(now)
+
+    def _fading(self, voice):
+        return any(entry[0] is voice for entry in self._fades)
+
+    def update(self, now = None):
+        """
+        Move the music fades along; call it every frame.
+        :param now: None for the clock, or float seconds
+        """
+        if not self._fades:
+            return
+        now = self.clock() if now is None else now
+        fades = []
+        for entry in self._fades:
+            voice, start, end, started, duration = entry
+            progress = 1.0 if duration <= 0 else min(1.0, (now - started) / float(duration))
+            voice.set_volume(start + (end - start) * progress)
+            if progress < 1.0:
+                fades.append(entry)
+            elif end == 0:
+                voice.sound.pause()
+        self._fades = fades
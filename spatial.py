@@ -0,0 +1,111 @@
+"""
+Uniform grid over `Building.borders` boxes so collision only looks at the
+obstacles near the character instead of every building in the scene.
+"""
+
+#Size in pixels of one grid cell. Most obstacles span one or two cells.
+CELL_SIZE = 64
+
+#Boxes are grown by this many pixels before being filed into cells. The
+#character stops one pixel outside a box and doors open from there, so the
+#box has to be found from just outside its edges too.
+MARGIN = 2
+
+class SpatialGrid:
+    """
+    Maps grid cells to the items whose box overlaps them.
+    Boxes use the same layout as `Building.borders`: [upper, lower, left, right].
+    """
+    def __init__(self, cell_size = CELL_SIZE, margin = MARGIN):
+        self.cell_size = cell_size
+        self.margin = margin
+        self._cells = {}
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def _cell_range(self, low, high):
+        return range(int(low // self.cell_size), int(high // self.cell_size) + 1)
+
+    def insert(self, item, box):
+        """
+        File `item` under every cell touched by `box`.
+        :param item: any
+        :param box: [upper, lower, left, right]
+        """
+        index = len(self._items)
+        self._items.append(item)
+        rows = self._cell_range(box[0] - self.margin, box[1] + self.margin)
+        cols = self._cell_range(box[2] - self.margin, box[3] + self.margin)
+        for row in rows:
+            for col in cols:
+                self._cells.setdefault((col, row), []).append(index)
+
+    def query(self, x, y):
+        """
+        Return the items whose grown box may contain the point (`x`, `y`),
+        in insertion order.
+        :return: list
+        """
+        indexes = self._cells.get((int(x // self.cell_size), int(y // self.cell_size)))
+        if not indexes:
+            return []
+        return [self._items[i] for i in indexes]
+
+    def query_box(self, box):
+        """
+        Return the items whose grown box may overlap `box`, in insertion order.
+        :param box: [upper, lower, left, right]
+        :return: list
+        """
+        rows = self._cell_range(box[0], box[1])
+        cols = self._cell_range(box[2], box[3])
+        if len(rows) == 1 and len(cols) == 1:
+            return self.query(box[2], box[0])
+        found = set()
+        for row in rows:
+            for col in cols:
+                found.update(self._cells.get((col, row), ()))
+        return [self._items[i] for i in sorted(found)]
+
+class BuildingIndex:
+    """
+    A scene's building set compiled into a grid over world coordinates
+    (see `Simulation.world_pos`).
+    """
+    def __init__(self, buildings, cell_size = CELL_SIZE):
+        self.buildings = list(buildings)
+        self._grid = SpatialGrid(cell_size)
+        for building in self.buildings:
+            self._grid.insert(building, building.borders)
+
+    def __len__(self):
+        return len(self.buildings)
+
+    def __iter__(self):
+        return iter(self.buildings)
+
+    def along(self, pos, vel):
+        """
+        Return the buildings that a point moving from `pos` by `vel` this tick
+        can collide with or open.
+        :param pos: [x, y] world position
+        :param vel: [dx, dy]
+        :return: list of Building
+        """
+        x, y = pos
+        if not vel[0] and not vel[1]:
+            return self._grid.query(x, y)
+        return self._grid.query_box([min(y, y + vel[1]), max(y, y + vel[1]),
+                                     min(x, x + vel[0]), max(x, x + vel[0])])
+
+    def near(self, pos, distance):
+        """
+        Return the buildings that may be within `distance` of `pos`.
+        :param pos: [x, y] world position
+        :param distance: (int or float) >= 0
+        :return: list of Building
+        """
+        x, y = pos
+        return self._grid.query_box([y - distance, y + distance, x - distance, x + distance])
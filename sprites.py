@@ -0,0 +1,76 @@
+"""
+Sprite sheets sliced into frames once and kept at display size.
+
+With SimpleGUICS2Pygame each frame is cut out of the tiled image and scaled
+a single time, and drawing a frame is a plain Pygame blit onto the canvas.
+Anywhere else (CodeSkulptor, headless runs) `canvas.draw_image` is used
+with source rectangles that were also computed once.
+"""
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+class SpriteSheet:
+    """
+    A tiled image cut into `cols` x `rows` frames of `tile_size`,
+    each one drawn at `display_size`.
+    Use `SpriteSheet.get()` so characters sharing an image share the frames.
+    """
+    _sheets = {}
+
+    @classmethod
+    def get(cls, image, tile_size, display_size, cols = 4, rows = 4):
+        """
+        Return the cached sheet for these parameters, building it the first time.
+        :param image: simplegui.Image
+        :param tile_size: [width, height] of one frame in `image`
+        :param display_size: [width, height] of one frame on screen
+        :return: SpriteSheet
+        """
+        key = (id(image), tuple(tile_size), tuple(display_size), cols, rows)
+        sheet = cls._sheets.get(key)
+        if (sheet is None) or (sheet.image is not image):
+            sheet = cls(image, tile_size, display_size, cols, rows)
+            cls._sheets[key] = sheet
+        return sheet
+
+    def __init__(self, image, tile_size, display_size, cols = 4, rows = 4):
+        self.image = image
+        self.tile_size = list(tile_size)
+        self.display_size = list(display_size)
+
+        #Center of every frame in the tiled image, indexed [row][col]
+        self._centers = [[[tile_size[0] * (col + 0.5), tile_size[1] * (row + 0.5)]
+                          for col in range(cols)]
+                         for row in range(rows)]
+        self._surfaces = self._slice(cols, rows)
+
+    def _slice(self, cols, rows):
+        #Cuts and scales every frame; None when the image has no Pygame surface
+        source = getattr(self.image, '_pygame_surface', None)
+        if (pygame is None) or (source is None):
+            return None
+
+        width, height = [int(round(side)) for side in self.tile_size]
+        size = (int(round(self.display_size[0])), int(round(self.display_size[1])))
+        frames = []
+        for row in range(rows):
+            frames.append([pygame.transform.scale(
+                source.subsurface((col * width, row * height, width, height)), size)
+                           for col in range(cols)])
+        return frames
+
+    def draw(self, canvas, col, row, pos):
+        """
+        Draw the frame at (`col`, `row`) centered on `pos`.
+        :param canvas: simplegui.Canvas
+        """
+        target = getattr(canvas, '_pygame_surface', None)
+        if (self._surfaces is not None) and (target is not None):
+            frame = self._surfaces[row][col]
+            target.blit(frame, (int(round(pos[0] - frame.get_width() / 2.0)),
+                                int(round(pos[1] - frame.get_height() / 2.0))))
+        else:
+            canvas.draw_image(self.image, self._centers[row][col], self.tile_size,
+                              pos, self.display_size)
@@ -0,0 +1,106 @@
+"""
+Tests that `BatchSimulation` moves agents exactly as one `Simulation` each.
+
+    python -m pytest test_batch.py
+"""
+import random
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from scenes import SceneManager
+from simulation import Character, ImageInfo, Simulation, WALK_SPEED, RUN_SPEED
+
+AGENTS = 40
+TICKS = 400
+
+def drive_scalar(simulation, change):
+    moving, vertical, speed = change
+    simulation.moving_left = moving < 0
+    simulation.moving_right = moving > 0
+    if moving == 0:
+        simulation.character.vel[0] = 0
+    simulation.character.vel[1] = vertical
+    simulation.character.speed = speed
+
+def drive_batch(batch, i, change):
+    moving, vertical, speed = change
+    batch.moving[i] = moving
+    if moving == 0:
+        batch.vel[i, 0] = 0
+    batch.vel[i, 1] = vertical
+    batch.speed[i] = speed
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class BatchSimulationTest(unittest.TestCase):
+    def setUp(self):
+        self.scenes = SceneManager()
+
+    def agents(self, name):
+        #One headless Simulation per agent, standing where a character enters `name`
+        agents = []
+        for i in range(AGENTS):
+            character = Character(None, ImageInfo([32, 32], [64, 64], None), "agent%d" % i)
+            simulation = Simulation.from_scenes(character, self.scenes, "map")
+            if name != "map":
+                simulation.enter_scene(name)
+            agents.append(simulation)
+        return agents
+
+    def assertSameWalk(self, name):
+        from batch import BatchSimulation
+
+        agents = self.agents(name)
+        batch = BatchSimulation(self.scenes.load(name), AGENTS)
+        buildings = batch.buildings
+        dialogs = dict((id(building.interactive), i) for i, building in enumerate(buildings))
+        opened = []
+        for i, simulation in enumerate(agents):
+            simulation.on_dialog = lambda dialog, i = i: opened.append((i, dialogs[id(dialog)]))
+
+        #Agents walk in through the door, as the player does, then at random
+        for i, simulation in enumerate(agents):
+            drive_scalar(simulation, (0, -1, WALK_SPEED))
+            drive_batch(batch, i, (0, -1, WALK_SPEED))
+        rng = random.Random(name)
+        inside = [True] * AGENTS
+        for tick in range(TICKS):
+            for i in range(AGENTS):
+                if inside[i] and rng.random() < 0.05:
+                    change = (rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1]),
+                              rng.choice([WALK_SPEED, RUN_SPEED]))
+                    drive_scalar(agents[i], change)
+                    drive_batch(batch, i, change)
+
+            del opened[:]
+            for i, simulation in enumerate(agents):
+                if inside[i]:
+                    simulation.tick()
+                    if simulation.current_background != name:
+                        inside[i] = False
+                        opened.append((i, [building.scene for building in buildings]
+                                       .index(simulation.current_background)))
+            hit_agents, hit_buildings = batch.tick()
+            self.assertEqual(sorted(zip(hit_agents.tolist(), hit_buildings.tolist())), sorted(opened),
+                             "doors at tick %d" % tick)
+
+            x, y = batch.world_pos()
+            for i, simulation in enumerate(agents):
+                if inside[i]:
+                    self.assertEqual([x[i], y[i]], simulation.world_pos(), "agent %d at tick %d" % (i, tick))
+                    self.assertEqual(batch.vel[i].tolist(), simulation.character.vel)
+                    self.assertEqual(batch.latitude[i], simulation.camera.position[0])
+            self.assertEqual(batch.active.tolist(), inside)
+
+    def test_map(self):
+        self.assertSameWalk("map")
+
+    def test_interiors(self):
+        for name in ("center", "mart", "gym", "house"):
+            self.assertSameWalk(name)
+
+if __name__ == "__main__":
+    unittest.main()
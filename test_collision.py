@@ -0,0 +1,55 @@
+"""
+Tests of collision.sweep: where the point stops against boxes and bounds.
+
+    python -m pytest test_collision.py
+"""
+import unittest
+
+from collision import sweep
+
+#upper, lower, left, right
+BOX = [100, 200, 300, 400]
+
+class SweepTest(unittest.TestCase):
+    def test_free_move(self):
+        self.assertEqual(sweep([10, 10], [5, -3], [BOX]), ([15, 7], False, False))
+
+    def test_stops_one_pixel_short_moving_right(self):
+        self.assertEqual(sweep([290, 150], [20, 0], [BOX]), ([299, 150], True, False))
+
+    def test_stops_one_pixel_short_moving_left(self):
+        self.assertEqual(sweep([410, 150], [-20, 0], [BOX]), ([401, 150], True, False))
+
+    def test_stops_one_pixel_short_moving_down_and_up(self):
+        self.assertEqual(sweep([350, 90], [0, 20], [BOX]), ([350, 99], False, True))
+        self.assertEqual(sweep([350, 210], [0, -20], [BOX]), ([350, 201], False, True))
+
+    def test_large_step_does_not_tunnel(self):
+        self.assertEqual(sweep([0, 150], [10000, 0], [BOX]), ([299, 150], True, False))
+
+    def test_touching_box_does_not_move_into_it(self):
+        self.assertEqual(sweep([299, 150], [5, 0], [BOX]), ([299, 150], True, False))
+
+    def test_edges_are_part_of_the_box(self):
+        #Level with the upper and lower edges still collides
+        self.assertTrue(sweep([290, 100], [20, 0], [BOX])[1])
+        self.assertTrue(sweep([290, 200], [20, 0], [BOX])[1])
+        self.assertFalse(sweep([290, 99], [20, 0], [BOX])[1])
+
+    def test_moving_away_is_free(self):
+        self.assertEqual(sweep([299, 150], [-5, 0], [BOX]), ([294, 150], False, False))
+
+    def test_nearest_box_stops_first(self):
+        near = [100, 200, 250, 260]
+        self.assertEqual(sweep([200, 150], [500, 0], [BOX, near])[0], [249, 150])
+
+    def test_axes_are_resolved_separately(self):
+        #Blocked on x, the point still slides along y
+        self.assertEqual(sweep([290, 150], [20, 10], [BOX]), ([299, 160], True, False))
+
+    def test_stays_strictly_inside_bounds(self):
+        bounds = [0, 480, 0, 480]
+        self.assertEqual(sweep([470, 5], [50, -50], [], bounds), ([479, 1], True, True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests of the item catalog, the inventory and the panel list view.
+
+    python -m pytest test_items.py
+"""
+import unittest
+
+from items import Item, Catalog, Inventory, ListView
+
+class CatalogTest(unittest.TestCase):
+    def test_indexes(self):
+        potion = Item("Potion", ("health", 20), 300, 0)
+        ball = Item("Pokeball", ("capture", 1), 200, 0)
+        revive = Item("Revive", ("revive", .5), 1500, 25)
+        super_potion = Item("Super Potion", ("health", 50), 700, 12)
+        catalog = Catalog([potion, ball, revive, super_potion])
+        self.assertEqual(len(catalog), 4)
+        self.assertIs(catalog[1], ball)
+        self.assertIs(catalog.get("Revive"), revive)
+        self.assertIsNone(catalog.get("Master Ball"))
+        self.assertEqual(catalog.category("health"), [potion, super_potion])
+        self.assertEqual(catalog.category("berry"), [])
+
+    def test_duplicate_name(self):
+        catalog = Catalog([Item("Potion", ("health", 20), 300, 0)])
+        self.assertRaises(ValueError, catalog.add, Item("Potion", ("health", 50), 700, 12))
+
+class InventoryTest(unittest.TestCase):
+    def test_add_and_count(self):
+        inventory = Inventory([("Potion", 2)])
+        inventory.add("Potion")
+        inventory.add("Pokeball", 5)
+        self.assertEqual(inventory.count("Potion"), 3)
+        self.assertEqual(inventory.count("Revive"), 0)
+        self.assertEqual(inventory.entries(), [["Potion", 3], ["Pokeball", 5]])
+
+    def test_remove_part(self):
+        inventory = Inventory([("Potion", 3)])
+        self.assertTrue(inventory.remove("Potion", 2))
+        self.assertEqual(inventory.entries(), [["Potion", 1]])
+
+    def test_remove_more_than_carried(self):
+        inventory = Inventory([("Potion", 1)])
+        version = inventory.version
+        self.assertFalse(inventory.remove("Potion", 2))
+        self.assertFalse(inventory.remove("Revive"))
+        self.assertEqual(inventory.entries(), [["Potion", 1]])
+        self.assertEqual(inventory.version, version)
+
+    def test_remove_last_swaps_the_last_entry_in(self):
+        inventory = Inventory([("A", 1), ("B", 1), ("C", 1), ("D", 1)])
+        self.assertTrue(inventory.remove("B"))
+        self.assertEqual(inventory.names, ["A", "D", "C"])
+        #The moved entry is still found where it now is
+        self.assertTrue(inventory.remove("D"))
+        self.assertEqual(inventory.names, ["A", "C"])
+        self.assertTrue(inventory.remove("C"))
+        self.assertTrue(inventory.remove("A"))
+        self.assertEqual(inventory.names, [])
+        self.assertEqual(inventory.counts, {})
+
+    def test_version_changes(self):
+        inventory = Inventory()
+        versions = [inventory.version]
+        inventory.add("Potion")
+        versions.append(inventory.version)
+        inventory.remove("Potion")
+        versions.append(inventory.version)
+        self.assertEqual(len(set(versions)), 3)
+
+    def test_from_table(self):
+        built = Inventory([("A", 1), ("B", 2), ("C", 3)])
+        table = Inventory.from_table(["A", "B", "C"], [1, 2, 3])
+        self.assertEqual(table.entries(), built.entries())
+        table.remove("A")
+        built.remove("A")
+        self.assertEqual(table.entries(), built.entries())
+
+    def test_entries_window(self):
+        inventory = Inventory(("Item %d" % i, i + 1) for i in range(10))
+        self.assertEqual(inventory.entries(3, 5), [["Item 3", 4], ["Item 4", 5]])
+
+class ListViewTest(unittest.TestCase):
+    def test_scrolls_to_keep_the_cursor_visible(self):
+        view = ListView(3)
+        view.move(4, 10)
+        self.assertEqual((view.cursor, view.top), (4, 2))
+        self.assertEqual(list(view.visible(10)), [2, 3, 4])
+        view.move(-3, 10)
+        self.assertEqual((view.cursor, view.top), (1, 1))
+
+    def test_stays_in_the_list(self):
+        view = ListView(3)
+        view.move(-5, 10)
+        self.assertEqual(view.cursor, 0)
+        view.move(50, 10)
+        self.assertEqual(view.cursor, 9)
+        self.assertEqual(list(view.visible(10)), [7, 8, 9])
+
+    def test_visible_when_the_list_shrinks(self):
+        view = ListView(3)
+        view.move(9, 10)
+        self.assertEqual(list(view.visible(2)), [0, 1])
+        view.reset()
+        self.assertEqual((view.cursor, view.top), (0, 0))
+
+if __name__ == "__main__":
+    unittest.main()
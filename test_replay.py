@@ -0,0 +1,47 @@
+"""
+Tests of the recording file format.
+
+    python -m pytest test_replay.py
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from replay import InputRecorder, Recording, KEY_DOWN, KEY_UP, MOVEMENT_TIMER
+
+class RecordingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "game.rec")
+        self.tick = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        recorder = InputRecorder(self.path, "ASH", lambda: self.tick)
+        recorder.record(KEY_DOWN, 32)
+        self.tick = 5
+        #Key codes of pygame's arrow keys do not fit 16 bits
+        recorder.record(KEY_DOWN, 1073741904)
+        recorder.record(MOVEMENT_TIMER)
+        self.tick = 9
+        recorder.record(KEY_UP, 1073741904)
+        recorder.close({"pos": [130.0, 237.0]})
+        self.assertEqual(recorder.events, 4)
+
+        recording = Recording.load(self.path)
+        self.assertEqual(recording.name, "ASH")
+        self.assertEqual(recording.events, [(0, KEY_DOWN, 32), (5, KEY_DOWN, 1073741904),
+                                            (5, MOVEMENT_TIMER, 0), (9, KEY_UP, 1073741904)])
+        self.assertEqual(recording.final_state, {"pos": [130.0, 237.0]})
+        self.assertEqual(recording.end_tick, 9)
+
+    def test_not_a_recording(self):
+        with open(self.path, "wb") as source:
+            source.write(b"PKSV\x01\x00\x00\x00")
+        self.assertRaises(ValueError, Recording.load, self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests of saved games: the file format, the atomic write and the autosaver.
+
+    python -m pytest test_saves.py
+"""
+import os
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+
+from scenes import SceneManager
+from session import GameSession
+from saves import Snapshot, Autosaver, write, _HEADER, _STATE, _BLOCK, INVENTORY
+
+def example():
+    return Snapshot("ASH", "house", [130.0, 237.5], [0.0, 12.0], [1200.0, 800.0], 3, 7171,
+                    ["Potion", "Pokeball"], [2, 10], {"met_ruby": 1, "badges": 0})
+
+class SnapshotTest(unittest.TestCase):
+    def assertSame(self, loaded, snapshot):
+        for field in ("name", "scene", "pos", "camera", "outside_location", "facing", "ticks", "flags"):
+            self.assertEqual(getattr(loaded, field), getattr(snapshot, field), field)
+        self.assertEqual(list(loaded.item_names), list(snapshot.item_names))
+        self.assertEqual(list(loaded.item_counts), list(snapshot.item_counts))
+
+    def test_round_trip(self):
+        snapshot = example()
+        self.assertSame(Snapshot.from_bytes(snapshot.to_bytes()), snapshot)
+
+    def test_empty_tables(self):
+        snapshot = Snapshot("ASH", "map", [0.0, 0.0], [0.0, 0.0], [0.0, 0.0])
+        self.assertSame(Snapshot.from_bytes(snapshot.to_bytes()), snapshot)
+
+    def test_not_a_save(self):
+        data = example().to_bytes()
+        self.assertRaises(ValueError, Snapshot.from_bytes, b"XXXX" + data[4:])
+        self.assertRaises(ValueError, Snapshot.from_bytes, data[:10])
+        self.assertRaises(ValueError, Snapshot.from_bytes, data[:-3])
+
+    def test_unknown_blocks_are_skipped(self):
+        snapshot = example()
+        data = snapshot.to_bytes()
+        #Blocks start after the name and the scene
+        at = _HEADER.size + _STATE.size + len("ASH") + len("house")
+        self.assertEqual(data[at], _BLOCK.pack(INVENTORY, 0)[0])
+        unknown = _BLOCK.pack(99, 3) + b"new"
+        self.assertSame(Snapshot.from_bytes(data[:at] + unknown + data[at:]), snapshot)
+        self.assertSame(Snapshot.from_bytes(data + unknown), snapshot)
+
+    def test_values_too_wide(self):
+        snapshot = example()
+        snapshot.flags["money"] = 2 ** 40
+        self.assertRaises(struct.error, snapshot.to_bytes)
+
+class SessionTest(unittest.TestCase):
+    def test_capture_and_apply(self):
+        scenes = SceneManager()
+        session = GameSession("ASH", scenes, [])
+        session.simulation.enter_scene("house")
+        session.simulation.ticks = 1234
+        session.character.row_number = 2
+        session.character.inventory.add("Revive", 3)
+        session.set_flag("met_ruby")
+        snapshot = Snapshot.from_bytes(Snapshot.capture(session).to_bytes())
+
+        resumed = GameSession("ASH", scenes, [])
+        snapshot.apply(resumed)
+        self.assertEqual(resumed.final_state(), session.final_state())
+        self.assertEqual(resumed.simulation.ticks, 1234)
+        self.assertEqual(resumed.character.row_number, 2)
+        self.assertEqual(resumed.flags, {"met_ruby": 1})
+        #Not shared with the snapshot
+        resumed.set_flag("met_norman")
+        self.assertEqual(snapshot.flags, {"met_ruby": 1})
+
+class FileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "save.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_and_load(self):
+        snapshot = example()
+        write(self.path, snapshot)
+        snapshot.ticks += 1
+        write(self.path, snapshot)
+        self.assertEqual(Snapshot.load(self.path).ticks, 7172)
+        self.assertEqual(os.listdir(self.directory), ["save.bin"])
+
+    def test_load_names_the_file(self):
+        with open(self.path, "wb") as save:
+            save.write(b"not a save at all, not at all")
+        try:
+            Snapshot.load(self.path)
+        except ValueError as error:
+            self.assertIn(self.path, str(error))
+        else:
+            self.fail("ValueError not raised")
+
+    def test_autosaver_survives_a_bad_snapshot(self):
+        autosaver = Autosaver(self.path)
+        bad = example()
+        bad.flags["money"] = 2 ** 40
+        autosaver.save(bad)
+        deadline = time.time() + 5
+        while (autosaver.error is None) and time.time() < deadline:
+            time.sleep(.01)
+        self.assertIsInstance(autosaver.error, struct.error)
+        self.assertFalse(os.path.exists(self.path))
+        #The thread is still there for the next one
+        autosaver.save(example())
+        autosaver.close()
+        self.assertEqual(autosaver.saves, 1)
+        self.assertEqual(Snapshot.load(self.path).flags, example().flags)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests of the scene manager: loading on first entry and eviction.
+
+    python -m pytest test_scenes.py
+"""
+import gc
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+
+from scenes import SceneManager
+
+#Bytes of the decoded image of every test scene
+IMAGE_MEMORY = 100 * 100 * 4
+
+class Media(object):
+    #Stands for a loaded simplegui image or sound
+    def __init__(self, url):
+        self.url = url
+
+    def get_width(self):
+        return 100
+
+    def get_height(self):
+        return 100
+
+class SceneManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ("a", "b", "c"):
+            with open(os.path.join(self.directory, name + ".json"), "w") as scene_file:
+                json.dump({"image": "http://example.com/%s.png" % name, "size": [100, 100],
+                           "music": "http://example.com/%s.ogg" % name, "buildings": []}, scene_file)
+        self.loads = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self, url):
+        self.loads.append(url)
+        return Media(url)
+
+    def manager(self, memory_budget = IMAGE_MEMORY):
+        return SceneManager(self.load, self.directory, memory_budget, load_sound = self.load)
+
+    def test_headless(self):
+        scene = SceneManager(directory = self.directory).load("a")
+        self.assertIsNone(scene.image)
+        self.assertIsNone(scene.music)
+
+    def test_loads_image_and_music_once(self):
+        scenes = self.manager()
+        scene = scenes.load("a")
+        self.assertEqual(scene.image.url, "http://example.com/a.png")
+        self.assertEqual(scene.music.url, "http://example.com/a.ogg")
+        self.assertIs(scenes.load("a"), scene)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_get_changes_nothing(self):
+        scenes = self.manager()
+        self.assertIsNone(scenes.get("a"))
+        scene = scenes.load("a")
+        scenes.load("b")
+        self.assertIs(scenes.get("a"), scene)
+        self.assertEqual(scenes.current, "b")
+        self.assertEqual(scenes.hits, 0)
+
+    def test_eviction_frees_image_and_music(self):
+        scenes = self.manager()
+        scene = scenes.load("a")
+        image, music = weakref.ref(scene.image), weakref.ref(scene.music)
+        del scene
+        scenes.load("b")
+        scenes.load("c")
+        self.assertFalse(scenes.is_loaded("a"))
+        self.assertEqual(scenes.evictions, 1)
+        gc.collect()
+        self.assertIsNone(image())
+        self.assertIsNone(music())
+
+    def test_current_scene_is_kept(self):
+        scenes = self.manager(memory_budget = 0)
+        scenes.load("a")
+        scene = scenes.load("b")
+        self.assertFalse(scenes.is_loaded("a"))
+        self.assertIs(scenes.get("b"), scene)
+
+if __name__ == "__main__":
+    unittest.main()
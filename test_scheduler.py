@@ -0,0 +1,85 @@
+"""
+Tests of the scheduler on a fake clock: periods, catch-up and coalescing.
+
+    python -m pytest test_scheduler.py
+"""
+import unittest
+
+from scheduler import Scheduler
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.scheduler = Scheduler(lambda: self.now)
+        self.calls = []
+
+    def task(self, name, interval = 100):
+        return self.scheduler.every(interval, lambda: self.calls.append(name))
+
+    def test_stopped_until_started(self):
+        self.task("a")
+        self.assertEqual(self.scheduler.run_due(1.0), 0)
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_runs_every_period(self):
+        self.task("a").start()
+        self.assertEqual(self.scheduler.run_due(0.05), 0)
+        self.assertEqual(self.scheduler.run_due(0.1), 1)
+        self.assertEqual(self.scheduler.run_due(0.15), 0)
+        self.assertEqual(self.scheduler.run_due(0.2), 1)
+
+    def test_catches_up_missed_periods(self):
+        self.task("a").start()
+        #Due at 0.1, 0.2, 0.3 and 0.4
+        self.assertEqual(self.scheduler.run_due(0.45), 4)
+        self.assertAlmostEqual(self.scheduler.next_due(), 0.5)
+
+    def test_catch_up_is_bounded(self):
+        self.task("a").start()
+        self.assertEqual(self.scheduler.run_due(10.0), self.scheduler.max_catch_up)
+        #The rest is dropped, the next run is a period away
+        self.assertAlmostEqual(self.scheduler.next_due(), 10.1)
+
+    def test_close_tasks_share_a_wakeup(self):
+        self.task("a", 100).start()
+        self.now = 0.003
+        self.task("b", 100).start()
+        self.now = 0.02
+        self.task("c", 100).start()
+        self.assertEqual(self.scheduler.run_due(0.1), 2)
+        self.assertEqual(self.calls, ["a", "b"])
+        self.assertEqual(self.scheduler.wakeups, 1)
+
+    def test_stop_and_restart(self):
+        task = self.task("a")
+        task.start()
+        task.stop()
+        self.assertEqual(self.scheduler.run_due(0.5), 0)
+        self.now = 0.5
+        task.start()
+        self.assertEqual(self.scheduler.run_due(0.6), 1)
+
+    def test_handler_stopping_its_task(self):
+        task = self.scheduler.every(100, lambda: (self.calls.append("a"), task.stop()))
+        task.start()
+        self.assertEqual(self.scheduler.run_due(0.45), 1)
+        self.assertFalse(task.is_running())
+
+    def test_after_runs_once(self):
+        task = self.scheduler.after(100, lambda: self.calls.append("a"))
+        self.assertEqual(self.scheduler.run_due(1.0), 1)
+        self.assertEqual(self.scheduler.run_due(2.0), 0)
+        self.assertFalse(task.is_running())
+
+    def test_pause_does_not_count(self):
+        self.task("a").start()
+        self.now = 0.05
+        self.scheduler.pause()
+        self.assertEqual(self.scheduler.run_due(1.0), 0)
+        self.now = 1.05
+        self.scheduler.resume()
+        self.assertEqual(self.scheduler.run_due(1.09), 0)
+        self.assertEqual(self.scheduler.run_due(1.1), 1)
+
+if __name__ == "__main__":
+    unittest.main()
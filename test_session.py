@@ -0,0 +1,121 @@
+"""
+Tests of line wrapping, the typewriter dialog and the flags set by dialogs.
+
+    python -m pytest test_session.py
+"""
+import json
+import os
+import unittest
+
+from scenes import SceneManager, SCENE_DIR
+from session import Dialog, GameSession, GLYPH_WIDTH, CHARS_PER_SECOND, _fixed_width, wrap
+
+#Ten characters a line, with room for rounding
+WIDTH = GLYPH_WIDTH * 10.5
+
+class WrapTest(unittest.TestCase):
+    def test_fits(self):
+        self.assertEqual(wrap("HELLO", _fixed_width, WIDTH), ["HELLO"])
+        self.assertEqual(wrap("0123456789", _fixed_width, WIDTH), ["0123456789"])
+
+    def test_empty(self):
+        self.assertEqual(wrap("", _fixed_width, WIDTH), [""])
+
+    def test_breaks_at_the_last_space(self):
+        self.assertEqual(wrap("ONE TWO THREE FOUR", _fixed_width, WIDTH), ["ONE TWO", "THREE FOUR"])
+
+    def test_breaks_inside_a_long_word(self):
+        self.assertEqual(wrap("ABCDEFGHIJKLMNO XY", _fixed_width, WIDTH), ["ABCDEFGHIJ", "KLMNO XY"])
+
+    def test_lines_fit(self):
+        text = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG AGAIN AND AGAIN"
+        lines = wrap(text, _fixed_width, WIDTH)
+        self.assertEqual(" ".join(lines), text)
+        for line in lines:
+            self.assertLessEqual(len(line), 10)
+
+    def test_proportional_measure(self):
+        #"I" is narrow, so more of them fit
+        def measure(text):
+            offsets, x = [], 0
+            for char in text:
+                x += 2 if char == "I" else 10
+                offsets.append(x)
+            return offsets
+        self.assertEqual(wrap("IIIIIIIIII WW", measure, 30), ["IIIIIIIIII", "WW"])
+
+class DialogTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.runs = []
+
+    def dialog(self, dialog_list):
+        return Dialog(dialog_list, lambda: self.now, width = WIDTH)
+
+    def test_wraps_and_upper_cases(self):
+        dialog = self.dialog(["one two three four"])
+        self.assertEqual(dialog.dialog, ["ONE TWO", "THREE FOUR"])
+
+    def test_typewriter_follows_the_clock(self):
+        dialog = self.dialog(["ABCD", "EFGH"])
+        self.now = 2.5 / CHARS_PER_SECOND
+        dialog.update()
+        self.assertEqual((dialog.l1_textscroller, dialog.l2_textscroller), (3, 0))
+        self.now = 5.5 / CHARS_PER_SECOND
+        dialog.update()
+        self.assertEqual((dialog.l1_textscroller, dialog.l2_textscroller), (4, 2))
+        self.assertFalse(dialog.is_revealed())
+        dialog.reveal()
+        self.assertTrue(dialog.is_revealed())
+
+    def test_action_runs_once_after_its_line(self):
+        dialog = self.dialog(["ABCD", lambda: self.runs.append(self.now)])
+        dialog.update()
+        self.assertEqual(self.runs, [])
+        self.now = 1.0
+        dialog.update()
+        dialog.update()
+        self.assertEqual(self.runs, [1.0])
+
+    def test_next_lines_starts_over(self):
+        dialog = self.dialog(["A", "B", "CDEF", "G"])
+        self.now = 1.0
+        dialog.update()
+        dialog.next_lines()
+        self.assertEqual(dialog.dialog_place, 2)
+        self.assertEqual(dialog.l1_textscroller, 1)
+
+class DialogFlagTest(unittest.TestCase):
+    def setUp(self):
+        self.session = GameSession("ASH", SceneManager(), [])
+
+    def building_dialog(self, scene, name):
+        with open(os.path.join(SCENE_DIR, scene + ".json")) as source:
+            buildings = json.load(source)["buildings"]
+        return [building for building in buildings if building["name"] == name][0]["dialog"]
+
+    def test_scene_dialog_sets_its_flag(self):
+        session = self.session
+        session.start_dialog(self.building_dialog("house", "ruby"))
+        self.assertEqual(session.dialog.dialog[0], "HI ASH! I'M RUBY!")
+        self.assertEqual(session.flags, {})
+        for _ in range(200):
+            session.tick()
+        self.assertEqual(session.flags, {"met_ruby": 1})
+
+    def test_flag_value(self):
+        session = self.session
+        session.start_dialog(["Here is a badge.", {"flag": "badges", "value": 3}])
+        session.dialog.reveal()
+        session.update_dialog()
+        self.assertEqual(session.flags, {"badges": 3})
+
+    def test_action_entry(self):
+        session = self.session
+        session.start_dialog(["Welcome!", {"action": "mart_buying"}])
+        session.dialog.reveal()
+        session.update_dialog()
+        self.assertTrue(session.buying)
+
+if __name__ == "__main__":
+    unittest.main()
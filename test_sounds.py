@@ -0,0 +1,120 @@
+"""
+Tests of the sound manager on a fake clock: voices, channels and music fades.
+
+    python -m pytest test_sounds.py
+"""
+import unittest
+
+from sounds import SoundManager, DEFAULT_EFFECT_LENGTH, _length
+
+class Sound:
+    #Records what the manager asks of a simplegui.Sound
+    def __init__(self, length = None):
+        self.length = length
+        self.plays = 0
+        self.paused = False
+        self.volume = None
+
+    def play(self):
+        self.plays += 1
+        self.paused = False
+
+    def pause(self):
+        self.paused = True
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def _get_length(self):
+        #Seconds, like SimpleGUICS2Pygame; 0 when unknown
+        return self.length or 0
+
+class LengthTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(_length(Sound(0.2)), 0.2)
+        self.assertEqual(_length(Sound(3)), 3)
+
+    def test_unknown(self):
+        self.assertIsNone(_length(Sound()))
+        self.assertIsNone(_length(object()))
+
+class EffectTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sounds = SoundManager(lambda: self.now, {"sfx": 4, "ui": 2}, fade = 1.0)
+
+    def test_voices_busy_for_the_sound_length(self):
+        self.sounds.add_effect("bump", Sound(0.2), "sfx", voices = 2)
+        self.assertTrue(self.sounds.play("bump"))
+        self.assertTrue(self.sounds.play("bump"))
+        self.assertFalse(self.sounds.play("bump"))
+        self.now = 0.19
+        self.assertFalse(self.sounds.play("bump"))
+        self.now = 0.2
+        self.assertTrue(self.sounds.play("bump"))
+        self.assertEqual((self.sounds.played, self.sounds.dropped), (3, 2))
+
+    def test_given_length(self):
+        self.sounds.add_effect("bump", Sound(0.2), "sfx", voices = 1, length = 1.0)
+        self.assertTrue(self.sounds.play("bump"))
+        self.now = 0.5
+        self.assertFalse(self.sounds.play("bump"))
+
+    def test_default_length(self):
+        self.sounds.add_effect("bump", Sound(), "sfx", voices = 1)
+        self.sounds.play("bump")
+        self.now = DEFAULT_EFFECT_LENGTH - .01
+        self.assertFalse(self.sounds.play("bump"))
+        self.now = DEFAULT_EFFECT_LENGTH
+        self.assertTrue(self.sounds.play("bump"))
+
+    def test_channel_limit(self):
+        for name in ("a", "b", "c"):
+            self.sounds.add_effect(name, Sound(1.0), "ui", voices = 2)
+        self.assertTrue(self.sounds.play("a"))
+        self.assertTrue(self.sounds.play("b"))
+        self.assertFalse(self.sounds.play("c"))
+        self.sounds.add_effect("d", Sound(1.0), "sfx")
+        self.assertTrue(self.sounds.play("d"))
+
+    def test_volumes(self):
+        sound = Sound(0.2)
+        self.sounds.add_effect("bump", sound, "sfx", voices = 1)
+        self.sounds.set_volume("sfx", .5)
+        self.sounds.set_master_volume(.5)
+        self.sounds.play("bump")
+        self.assertEqual(sound.volume, .25)
+
+class MusicTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sounds = SoundManager(lambda: self.now, {"sfx": 4}, fade = 1.0)
+
+    def test_cross_fade(self):
+        first, second = Sound(), Sound()
+        self.sounds.play_music(first, fade = 0)
+        self.assertEqual(first.volume, 1.0)
+        self.now = 10.0
+        self.sounds.play_music(second)
+        self.sounds.update(10.5)
+        self.assertEqual((first.volume, second.volume), (.5, .5))
+        self.assertFalse(first.paused)
+        self.sounds.update(11.0)
+        self.assertEqual((first.volume, second.volume), (0, 1.0))
+        self.assertTrue(first.paused)
+        self.assertIs(self.sounds.music.sound, second)
+
+    def test_same_tune_goes_on(self):
+        tune = Sound()
+        self.sounds.play_music(tune, fade = 0)
+        self.sounds.play_music(tune)
+        self.assertEqual(tune.plays, 1)
+
+    def test_music_volume(self):
+        tune = Sound()
+        self.sounds.play_music(tune, fade = 0)
+        self.sounds.set_volume("music", .5)
+        self.assertEqual(tune.volume, .5)
+
+if __name__ == "__main__":
+    unittest.main()
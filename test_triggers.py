@@ -0,0 +1,83 @@
+"""
+Tests of trigger volumes: events fire once, on entering and leaving.
+
+    python -m pytest test_triggers.py
+"""
+import unittest
+
+from triggers import Trigger, TriggerIndex, TriggerWatch
+
+class World:
+    #What the triggers need of a simulation
+    def __init__(self):
+        self.current_background = "map"
+        self.events = []
+
+class TriggerWatchTest(unittest.TestCase):
+    def setUp(self):
+        self.world = World()
+        events = self.world.events
+        self.door = Trigger([100, 110, 200, 220],
+                            on_enter = lambda world: events.append("enter door"),
+                            on_exit = lambda world: events.append("exit door"),
+                            on_interact = lambda world: events.append("talk door"))
+        self.index = TriggerIndex([self.door])
+
+    def test_placed_inside_does_not_enter(self):
+        watch = TriggerWatch(self.index, [210, 105])
+        self.assertEqual(watch.inside, [self.door])
+        watch.update(self.world, [211, 105])
+        self.assertEqual(self.world.events, [])
+
+    def test_enter_and_exit_fire_once(self):
+        watch = TriggerWatch(self.index, [150, 105])
+        for pos in ([190, 105], [200, 105], [205, 105], [210, 105], [221, 105], [230, 105]):
+            watch.update(self.world, pos)
+        self.assertEqual(self.world.events, ["enter door", "exit door"])
+
+    def test_edges_are_inside(self):
+        watch = TriggerWatch(self.index, [150, 105])
+        watch.update(self.world, [220, 110])
+        self.assertEqual(self.world.events, ["enter door"])
+
+    def test_standing_still(self):
+        watch = TriggerWatch(self.index, [150, 105])
+        watch.update(self.world, [205, 105])
+        watch.update(self.world, [205, 105])
+        self.assertEqual(self.world.events, ["enter door"])
+
+    def test_interact_only_inside(self):
+        watch = TriggerWatch(self.index, [150, 105])
+        watch.interact(self.world)
+        watch.update(self.world, [205, 105])
+        watch.interact(self.world)
+        watch.interact(self.world)
+        self.assertEqual(self.world.events, ["enter door", "talk door", "talk door"])
+
+    def test_scene_change_ends_the_update(self):
+        world = self.world
+
+        def leave(world):
+            world.events.append("first")
+            world.current_background = "house"
+
+        first = Trigger([0, 10, 0, 10], on_enter = leave)
+        second = Trigger([0, 10, 0, 10], on_enter = lambda world: world.events.append("second"))
+        watch = TriggerWatch(TriggerIndex([first, second]), [50, 50])
+        watch.update(world, [5, 5])
+        self.assertEqual(world.events, ["first"])
+
+    def test_overlapping_in_registration_order(self):
+        events = self.world.events
+        outer = Trigger([0, 100, 0, 100], on_enter = lambda world: events.append("outer"),
+                        on_exit = lambda world: events.append("exit outer"))
+        inner = Trigger([40, 60, 40, 60], on_enter = lambda world: events.append("inner"),
+                        on_exit = lambda world: events.append("exit inner"))
+        watch = TriggerWatch(TriggerIndex([outer, inner]), [200, 200])
+        watch.update(self.world, [50, 50])
+        watch.update(self.world, [10, 10])
+        watch.update(self.world, [200, 200])
+        self.assertEqual(events, ["outer", "inner", "exit inner", "exit outer"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Rendered text kept between frames so unchanged lines are rasterized once.
+
+With SimpleGUICS2Pygame, `TextCache.draw()` renders a string with the same
+Pygame font the canvas would use, keeps the surface in an LRU keyed by
+(text, size, color, face) and blits it on later frames. Typewriter text
+reveals a prefix by blitting part of the full line, so it is never
+re-rendered while it scrolls in. Without Pygame surfaces (CodeSkulptor,
+headless canvases) it simply calls `canvas.draw_text`.
+
+`TextCache.offsets()` measures text with the same font, so dialogs can be
+wrapped to the width they will actually take.
+"""
+from collections import OrderedDict
+
+try:
+    from SimpleGUICS2Pygame.simpleguics2pygame._colors import _simpleguicolor_to_pygamecolor
+    from SimpleGUICS2Pygame.simpleguics2pygame._fonts import _simpleguifontface_to_pygamefont
+except ImportError:
+    _simpleguifontface_to_pygamefont = None
+
+#Same vertical adjustment as `Canvas.draw_text` of SimpleGUICS2Pygame:
+#the given point is the bottom left of the text
+_FONT_SIZE_COEF = 3 / 4.0
+
+#Advance of a glyph, in font sizes, when there is no font to measure it
+#(about that of a monospace font)
+_GLYPH_ADVANCE = 0.6
+
+class TextCache:
+    """
+    LRU of rendered lines of text.
+    """
+    def __init__(self, max_entries = 256):
+        """
+        :param max_entries: int > 0, lines kept before the least recently drawn is dropped
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lines = OrderedDict()
+
+    def __len__(self):
+        return len(self._lines)
+
+    def _line(self, text, size, color, face):
+        #Returns (surface, x offset after each character), rendering on a miss
+        key = (text, size, color, face)
+        line = self._lines.pop(key, None)
+        if line is None:
+            self.misses += 1
+            font = _simpleguifontface_to_pygamefont(face, int(round(size)))
+            surface = font.render(text, True, _simpleguicolor_to_pygamecolor(color))
+            line = (surface, _offsets(font, text))
+            if len(self._lines) >= self.max_entries:
+                self._lines.popitem(last = False)
+        else:
+            self.hits += 1
+        self._lines[key] = line
+        return line
+
+    def offsets(self, text, size, face = 'serif'):
+        """
+        :param text: str
+        :return: list of the x offset, in pixels, after each character of `text`
+        """
+        if _simpleguifontface_to_pygamefont is None:
+            return [size * _GLYPH_ADVANCE * (i + 1) for i in range(len(text))]
+        return _offsets(_simpleguifontface_to_pygamefont(face, int(round(size))), text)
+
+    def draw(self, canvas, text, point, size, color, face = 'serif'):
+        """
+        Draw `text` like `canvas.draw_text(text, point, size, color, face)`.
+        :param canvas: simplegui.Canvas
+        """
+        self.draw_prefix(canvas, text, len(text), point, size, color, face)
+
+    def draw_prefix(self, canvas, text, count, point, size, color, face = 'serif'):
+        """
+        Draw the first `count` characters of `text`.
+        The whole line is rendered once and only the revealed part is blitted,
+        so typewriter text costs one render per line instead of one per frame.
+        :param canvas: simplegui.Canvas
+        :param count: int >= 0
+        """
+        count = min(count, len(text))
+        if count <= 0:
+            return
+        target = getattr(canvas, '_pygame_surface', None)
+        if (target is None) or (_simpleguifontface_to_pygamefont is None):
+            canvas.draw_text(text[:count], point, size, color, face)
+            return
+
+        surface, offsets = self._line(text, size, color, face)
+        height = surface.get_height()
+        width = surface.get_width() if count == len(text) else offsets[count - 1]
+        target.blit(surface, (point[0], point[1] - height * _FONT_SIZE_COEF),
+                    (0, 0, width, height))
+
+def _offsets(font, text):
+    offsets = []
+    x = 0
+    for metrics in font.metrics(text):
+        x += metrics[4] if metrics is not None else 0
+        offsets.append(x)
+    return offsets
@@ -0,0 +1,114 @@
+"""
+Trigger volumes: boxes that run something when the character walks into
+or out of them, or presses the interact key inside them.
+
+Doors, people and signs each register one (see `Building.trigger`). A
+scene's triggers are compiled once into a `TriggerIndex`, shared by every
+simulation in the scene; each simulation follows which volumes its
+character is in with a `TriggerWatch`. Events fire once, on transitions,
+so standing still in front of someone costs nothing and the work per tick
+does not grow with the number of triggers in the scene.
+"""
+from spatial import SpatialGrid
+
+#Door volumes are a few pixels tall, so their grid has smaller cells than
+#the buildings' one
+CELL_SIZE = 16
+
+class Trigger:
+    """
+    A box, in world coordinates, and what happens at its edges.
+    """
+    def __init__(self, box, on_enter = None, on_exit = None, on_interact = None):
+        """
+        :param box: [upper, lower, left, right], the edges being part of the box
+        :param on_enter: None or function (world) -> *
+        :param on_exit: None or function (world) -> *
+        :param on_interact: None or function (world) -> *
+        """
+        self.box = box
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.on_interact = on_interact
+
+    def contains(self, x, y):
+        box = self.box
+        return (box[0] <= y <= box[1]) and (box[2] <= x <= box[3])
+
+class TriggerIndex:
+    """
+    The triggers of a scene, filed in a grid.
+    """
+    def __init__(self, triggers, cell_size = CELL_SIZE):
+        """
+        :param triggers: iterable of Trigger, in the order their events fire
+        :param cell_size: int size in pixels of a grid cell
+        """
+        self.triggers = list(triggers)
+        self._grid = SpatialGrid(cell_size, margin = 0)
+        for trigger in self.triggers:
+            self._grid.insert(trigger, trigger.box)
+
+    def __len__(self):
+        return len(self.triggers)
+
+    def at(self, pos):
+        """
+        :param pos: [x, y] world position
+        :return: list of the triggers containing `pos`, in registration order
+        """
+        x, y = pos
+        return [trigger for trigger in self._grid.query(x, y) if trigger.contains(x, y)]
+
+#Scenes without triggers
+NO_TRIGGERS = TriggerIndex(())
+
+class TriggerWatch:
+    """
+    The triggers one character is in, and the events of its moves.
+    """
+    def __init__(self, index, pos):
+        """
+        A character placed inside a volume is in it without entering it.
+        :param index: TriggerIndex of the scene
+        :param pos: [x, y] world position of the character
+        """
+        self.index = index
+        self._pos = list(pos)
+        self.inside = index.at(pos)
+
+    def update(self, world, pos):
+        """
+        Fire the exit then the enter events of the move to `pos`. An event
+        that moves the character to another scene ends the update.
+        :param world: simulation.Simulation, passed to the events
+        :param pos: [x, y] world position of the character
+        """
+        if pos == self._pos:
+            return
+        self._pos = list(pos)
+        before = self.inside
+        now = self.index.at(pos)
+        if not before and not now:
+            return
+        self.inside = now
+        scene = world.current_background
+        for trigger in before:
+            if (trigger.on_exit is not None) and (trigger not in now):
+                trigger.on_exit(world)
+                if world.current_background != scene:
+                    return
+        for trigger in now:
+            if (trigger.on_enter is not None) and (trigger not in before):
+                trigger.on_enter(world)
+                if world.current_background != scene:
+                    return
+
+    def interact(self, world):
+        #Fires the interact event of the triggers the character is in
+        scene = world.current_background
+        for trigger in self.inside:
+            if trigger.on_interact is not None:
+                trigger.on_interact(world)
+                if world.current_background != scene:
+                    return